@@ -65,10 +65,13 @@ In operational mode, all functions return values from the running config.
 
 import os
 import re
+import copy
 import json
 import subprocess
 
 import vyos.configtree
+import vyos.configsnapshot
+import vyos.configd_client
 
 
 class VyOSError(Exception):
@@ -88,7 +91,14 @@ class Config(object):
     the only state it keeps is relative *config path* for convenient access to config
     subtrees.
     """
-    def __init__(self, session_env=None):
+    def __init__(self, session_env=None, config_tree=None):
+        """
+        Args:
+            session_env (dict): environment of the config session to read
+            config_tree (ConfigTree): read the running and the session config
+                from this tree instead of the config backend, as in operational
+                mode. The tree must not be modified while the object is in use.
+        """
         self._cli_shell_api = "/bin/cli-shell-api"
         self._level = []
         if session_env:
@@ -96,6 +106,62 @@ class Config(object):
         else:
             self.__session_env = None
 
+        self._in_session = None
+        self._node_type_cache = {}
+
+        if config_tree is not None:
+            self._in_session = False
+            self._snapshot_key = None
+            self._session_config = config_tree
+            self._running_config = config_tree
+            return
+
+        snapshot_key = vyos.configsnapshot.key(self.__session_env)
+        self._snapshot_key = snapshot_key
+
+        # If vyos-configd is running, it keeps parsed trees for the whole commit
+        # and we only need to send it the config texts if we are the first to ask
+        if snapshot_key and vyos.configd_client.available():
+            try:
+                self._open_remote_trees(snapshot_key)
+                return
+            except vyos.configd_client.VyOSConfigdError:
+                pass
+
+        running_config_text, session_config_text = self._load_snapshot(snapshot_key)
+        self._session_config = vyos.configtree.ConfigTree(session_config_text)
+        self._running_config = vyos.configtree.ConfigTree(running_config_text)
+
+    def _load_snapshot(self, snapshot_key):
+        # All scripts of the same commit see the same configs,
+        # so the first one saves them for the rest of them
+        # to avoid forking cli-shell-api again
+        snapshot = vyos.configsnapshot.load(snapshot_key)
+        if snapshot:
+            # Snapshots are only created from within a session
+            self._in_session = True
+            return (snapshot['running'], snapshot['session'])
+
+        running_config_text, session_config_text = self._read_configs()
+        if self._in_session:
+            vyos.configsnapshot.store(snapshot_key, running_config_text, session_config_text)
+        return (running_config_text, session_config_text)
+
+    def _open_remote_trees(self, snapshot_key):
+        from vyos.configd_client import Client, RemoteConfigTree
+
+        client = Client()
+        loader = lambda: self._load_snapshot(snapshot_key)
+        if not client.has_snapshot(snapshot_key):
+            running_config_text, session_config_text = loader()
+            client.load_snapshot(snapshot_key, running_config_text, session_config_text)
+        # Snapshot keys only exist for config sessions
+        self._in_session = True
+
+        self._session_config = RemoteConfigTree(client, snapshot_key, 'session', loader)
+        self._running_config = RemoteConfigTree(client, snapshot_key, 'running', loader)
+
+    def _read_configs(self):
         # Running config can be obtained either from op or conf mode, it always succeeds
         # (if config system is initialized at all).
         if os.path.isfile('/tmp/vyos-config-status'):
@@ -111,8 +177,15 @@ class Config(object):
         else:
             session_config_text = running_config_text
 
-        self._session_config = vyos.configtree.ConfigTree(session_config_text)
-        self._running_config = vyos.configtree.ConfigTree(running_config_text)
+        return (running_config_text, session_config_text)
+
+    def get_snapshot_key(self):
+        """
+        Returns:
+            str: the key of the config snapshot this object was built from
+            (see vyos.configsnapshot), or None outside of config sessions
+        """
+        return self._snapshot_key
 
     def _make_command(self, op, path):
         args = path.split()
@@ -222,11 +295,14 @@ class Config(object):
         Returns:
             True if called from a configuration session, False otherwise.
         """
-        try:
-            self._run(self._make_command('inSession', ''))
-            return True
-        except VyOSError:
-            return False
+        # A process can't enter or leave a session, so it's safe to cache
+        if self._in_session is None:
+            try:
+                self._run(self._make_command('inSession', ''))
+                self._in_session = True
+            except VyOSError:
+                self._in_session = False
+        return self._in_session
 
     def show_config(self, path=[], default=None, effective=False):
         """
@@ -272,15 +348,59 @@ class Config(object):
             self.__session_env = save_env
             return(default)
 
+    def _check_node_type(self, op, path):
+        # Node types come from the templates and never change at runtime,
+        # so every script only needs to ask cli-shell-api once per path
+        if (op, path) not in self._node_type_cache:
+            try:
+                self._run(self._make_command(op, path))
+                self._node_type_cache[(op, path)] = True
+            except VyOSError:
+                self._node_type_cache[(op, path)] = False
+        return self._node_type_cache[(op, path)]
+
     def get_config_dict(self, path=[], effective=False):
         """
         Args: path (str list): Configuration tree path, can be empty
         Returns: a dict representation of the config
         """
-        res = self.show_config(self._make_path(path), effective=effective)
-        config_tree = vyos.configtree.ConfigTree(res)
-        config_dict = json.loads(config_tree.to_json())
-        return config_dict
+        config = self._running_config if effective else self._session_config
+        path = self._make_path(path)
+        try:
+            config_dict = config.get_subtree(path)
+        except vyos.configtree.ConfigTreeError:
+            return {}
+
+        # Like "cli-shell-api showConfig", keep the name of the tag node
+        if path and config.is_tag(path):
+            config_dict = {path[-1]: config_dict}
+        # The subtree is shared with other lookups, callers may modify the copy
+        return copy.deepcopy(config_dict)
+
+    def get_config_view(self, path):
+        """
+        Retrieve a subtree of both the proposed and the running config in bulk
+
+        Args:
+            path (str list): Configuration tree path
+
+        Returns:
+            ConfigView: read-only object with the lookup functions of this class,
+            whose edit level is set to path
+
+        Note:
+            Scripts that look up many nodes under the same path, like interface
+            scripts do, should use the view: every lookup is a dict access
+            instead of a call into the config library.
+        """
+        path = self._make_path(path)
+        subtrees = []
+        for config in [self._session_config, self._running_config]:
+            try:
+                subtrees.append(config.get_subtree(path))
+            except vyos.configtree.ConfigTreeError:
+                subtrees.append({})
+        return ConfigView(path, subtrees[0], subtrees[1])
 
     def is_multi(self, path):
         """
@@ -293,12 +413,8 @@ class Config(object):
         Note:
             It also returns False if node doesn't exist.
         """
-        try:
-            path = " ".join(self._level) + " " + path
-            self._run(self._make_command('isMulti', path))
-            return True
-        except VyOSError:
-            return False
+        path = " ".join(self._level) + " " + path
+        return self._check_node_type('isMulti', path)
 
     def is_tag(self, path):
         """
@@ -311,12 +427,8 @@ class Config(object):
         Note:
             It also returns False if node doesn't exist.
         """
-        try:
-            path = " ".join(self._level) + " " + path
-            self._run(self._make_command('isTag', path))
-            return True
-        except VyOSError:
-            return False
+        path = " ".join(self._level) + " " + path
+        return self._check_node_type('isTag', path)
 
     def is_leaf(self, path):
         """
@@ -329,12 +441,8 @@ class Config(object):
         Note:
             It also returns False if node doesn't exist.
         """
-        try:
-            path = " ".join(self._level) + " " + path
-            self._run(self._make_command('isLeaf', path))
-            return True
-        except VyOSError:
-            return False
+        path = " ".join(self._level) + " " + path
+        return self._check_node_type('isLeaf', path)
 
     def return_value(self, path, default=None):
         """
@@ -491,3 +599,109 @@ class Config(object):
             return(default)
         else:
             return(nodes)
+
+
+class ConfigView(object):
+    """
+    A read-only view of a config subtree, created by ``Config.get_config_view``
+
+    It implements the lookup functions of ``Config`` on plain dicts,
+    all paths (including levels) must be within the subtree of the view.
+    """
+    _missing = object()
+
+    def __init__(self, base, session_dict, running_dict):
+        self._base = list(base)
+        self._session_dict = session_dict
+        self._running_dict = running_dict
+        self.set_level(self._base)
+
+    def _split(self, path):
+        if isinstance(path, str):
+            return path.split()
+        elif isinstance(path, list):
+            # Tolerate list items with spaces, like Config does
+            return [n for item in path for n in str(item).split()]
+        else:
+            raise TypeError("Path must be a whitespace-separated string or a list")
+
+    def _walk(self, node, path):
+        for name in path:
+            if not isinstance(node, dict) or name not in node:
+                return self._missing
+            node = node[name]
+        return node
+
+    def _lookup(self, level_node, path):
+        return self._walk(level_node, self._split(path))
+
+    def _exists(self, level_node, path):
+        path = self._split(path)
+        if self._walk(level_node, path) is not self._missing:
+            return True
+        # Like Config.exists(), emulate value lookups
+        if not path:
+            return False
+        value = self._walk(level_node, path[:-1])
+        if isinstance(value, list):
+            return path[-1] in value
+        return value == path[-1]
+
+    def _value(self, level_node, path, default):
+        value = self._lookup(level_node, path)
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if value is self._missing or not value or isinstance(value, dict):
+            return default
+        return value
+
+    def _values(self, level_node, path, default):
+        values = self._lookup(level_node, path)
+        if isinstance(values, str):
+            values = [values]
+        if values is self._missing or not values or isinstance(values, dict):
+            return default
+        return list(values)
+
+    def _nodes(self, level_node, path, default):
+        nodes = self._lookup(level_node, path)
+        if not isinstance(nodes, dict) or not nodes:
+            return default
+        return list(nodes)
+
+    def set_level(self, path):
+        path = self._split(path)
+        if path[:len(self._base)] != self._base:
+            raise ValueError("Path {0} is outside of config view {1}".format(path, self._base))
+        self._level = path
+        # All lookups start from the nodes at the current level
+        relative = path[len(self._base):]
+        self._session_level = self._walk(self._session_dict, relative)
+        self._running_level = self._walk(self._running_dict, relative)
+
+    def get_level(self):
+        return self._level
+
+    def exists(self, path):
+        return self._exists(self._session_level, path)
+
+    def return_value(self, path, default=None):
+        return self._value(self._session_level, path, default)
+
+    def return_values(self, path, default=[]):
+        return self._values(self._session_level, path, default)
+
+    def list_nodes(self, path, default=[]):
+        return self._nodes(self._session_level, path, default)
+
+    def exists_effective(self, path):
+        return self._exists(self._running_level, path)
+
+    def return_effective_value(self, path, default=None):
+        return self._value(self._running_level, path, default)
+
+    def return_effective_values(self, path, default=[]):
+        return self._values(self._running_level, path, default)
+
+    def list_effective_nodes(self, path, default=[]):
+        return self._nodes(self._running_level, path, default)
@@ -0,0 +1,167 @@
+# Copyright 2020 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Client side of vyos-configd, the commit-time config daemon.
+
+vyos-configd keeps parsed running and proposed config trees for every
+config snapshot (see ``vyos.configsnapshot``), so that the config is parsed
+once per commit rather than once per conf_mode script.
+``vyos.config.Config`` uses it transparently when the daemon is running.
+"""
+
+import os
+import json
+
+from vyos.configtree import ConfigTree
+from vyos.configtree import ConfigTreeError
+
+
+SOCKET_FILE = '/run/vyos-configd.sock'
+SOCKET_PATH = f'ipc://{SOCKET_FILE}'
+
+
+class VyOSConfigdError(Exception):
+    pass
+
+
+class VyOSConfigdUnknownSnapshot(VyOSConfigdError):
+    pass
+
+
+def available():
+    """ Check if vyos-configd is running and can be used """
+    return os.path.exists(SOCKET_FILE)
+
+
+class Client(object):
+    def __init__(self):
+        # zmq is only needed if the daemon is actually used,
+        # don't make every Config() user pay for the import
+        import zmq
+        self.__zmq = zmq
+        try:
+            context = zmq.Context.instance()
+            self.__socket = context.socket(zmq.REQ)
+            self.__socket.RCVTIMEO = 10000 #ms
+            self.__socket.setsockopt(zmq.LINGER, 0)
+            self.__socket.connect(SOCKET_PATH)
+        except zmq.error.ZMQError:
+            raise VyOSConfigdError("Could not connect to vyos-configd")
+
+    def _communicate(self, msg):
+        try:
+            request = json.dumps(msg).encode()
+            self.__socket.send(request)
+
+            reply_msg = self.__socket.recv().decode()
+            reply = json.loads(reply_msg)
+        except self.__zmq.error.ZMQError:
+            raise VyOSConfigdError("Could not connect to vyos-configd")
+
+        if 'unknown_snapshot' in reply:
+            raise VyOSConfigdUnknownSnapshot(reply['error'])
+        if 'error' in reply:
+            raise VyOSConfigdError(reply['error'])
+        return reply['data']
+
+    def has_snapshot(self, key):
+        msg = {'op': 'has_snapshot', 'key': key}
+        return self._communicate(msg)
+
+    def load_snapshot(self, key, running, session):
+        msg = {'op': 'load_snapshot', 'key': key,
+               'data': {'running': running, 'session': session}}
+        self._communicate(msg)
+
+    def query(self, key, tree, op, path):
+        msg = {'op': op, 'key': key, 'tree': tree, 'path': path}
+        return self._communicate(msg)
+
+
+class RemoteConfigTree(object):
+    """
+    A read-only stand-in for vyos.configtree.ConfigTree whose data lives in vyos-configd
+
+    Args:
+        client (Client): connected client
+        key (str): config snapshot key
+        tree (str): 'running' or 'session'
+        loader (function): called without arguments when the daemon has lost
+            the snapshot (e.g. it was restarted), must return a tuple
+            of running and session config texts to load it again
+    """
+    def __init__(self, client, key, tree, loader):
+        self.__client = client
+        self.__key = key
+        self.__tree = tree
+        self.__loader = loader
+        self.__local = None
+
+    def _query(self, op, path):
+        if not isinstance(path, list):
+            raise TypeError("Expected a list, got a {}".format(type(path)))
+        if self.__local is None:
+            try:
+                try:
+                    return self.__client.query(self.__key, self.__tree, op, path)
+                except VyOSConfigdUnknownSnapshot:
+                    running, session = self.__loader()
+                    self.__client.load_snapshot(self.__key, running, session)
+                    return self.__client.query(self.__key, self.__tree, op, path)
+            except VyOSConfigdError:
+                # The daemon went away in the middle of a script,
+                # parse the config ourselves from now on
+                running, session = self.__loader()
+                self.__local = ConfigTree(running if self.__tree == 'running' else session)
+        return self._query_local(op, path)
+
+    def _query_local(self, op, path):
+        if op in ['to_string', 'to_commands']:
+            return getattr(self.__local, op)()
+        try:
+            return getattr(self.__local, op)(path)
+        except ConfigTreeError:
+            return None
+
+    def _query_existing(self, op, path):
+        res = self._query(op, path)
+        if res is None:
+            raise ConfigTreeError("Path [{}] doesn't exist".format(" ".join(path)))
+        return res
+
+    def exists(self, path):
+        return self._query('exists', path)
+
+    def is_tag(self, path):
+        return self._query('is_tag', path)
+
+    def list_nodes(self, path):
+        return self._query_existing('list_nodes', path)
+
+    def return_value(self, path):
+        return self._query_existing('return_value', path)
+
+    def return_values(self, path):
+        return self._query_existing('return_values', path)
+
+    def get_subtree(self, path):
+        return self._query_existing('get_subtree', path)
+
+    def to_string(self):
+        return self._query('to_string', [])
+
+    def to_commands(self):
+        return self._query('to_commands', [])
@@ -0,0 +1,184 @@
+# Copyright 2020 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Changes between the running and the proposed config.
+
+``ConfigDiff`` walks both configs once and records every leaf that was
+added, removed, or whose values were modified. Scripts can then ask whether
+anything under a path changed, and skip generating configs and restarting
+services of subsystems that were not touched::
+
+    conf = Config()
+    diff = ConfigDiff(conf)
+    if not diff.is_node_changed('service snmp'):
+        return None
+
+The change set is the same for all scripts of a commit,
+so it's stored along with the config snapshot (see ``vyos.configsnapshot``)
+and computed only by the first script that asks for it.
+
+Outside of config sessions, and at boot time when the running config is
+being loaded from scratch, there is nothing to compare with: every
+node is reported as changed.
+"""
+
+import os
+import re
+
+import vyos.configsnapshot
+
+
+def _split(path):
+    if isinstance(path, str):
+        return re.split(r'\s+', path) if path else []
+    return list(path)
+
+
+def _values(node):
+    if isinstance(node, list):
+        return node
+    if isinstance(node, str):
+        return [node]
+    # Valueless leaf node
+    return []
+
+
+def _is_leaf(node):
+    return not isinstance(node, dict) or not node
+
+
+def _leaves(node, path, result):
+    if _is_leaf(node):
+        result.append((path, _values(node)))
+    else:
+        for name, child in node.items():
+            _leaves(child, path + [name], result)
+    return result
+
+
+def diff_dicts(old, new, path=[]):
+    """
+    Compare two config dicts as returned by Config.get_config_dict()
+
+    Returns:
+        list: of [path, old_values, new_values] lists for every leaf
+        node that differs, old_values is None for added nodes and
+        new_values is None for removed nodes
+    """
+    changes = []
+    if _is_leaf(old) and _is_leaf(new):
+        if _values(old) != _values(new):
+            changes.append([path, _values(old), _values(new)])
+        return changes
+
+    if _is_leaf(old) or _is_leaf(new):
+        # A leaf has become a subtree or the other way around
+        changes.extend([p, v, None] for p, v in _leaves(old, path, []))
+        changes.extend([p, None, v] for p, v in _leaves(new, path, []))
+        return changes
+
+    for name, old_child in old.items():
+        if name in new:
+            changes.extend(diff_dicts(old_child, new[name], path + [name]))
+        else:
+            changes.extend([p, v, None] for p, v in _leaves(old_child, path + [name], []))
+    for name, new_child in new.items():
+        if name not in old:
+            changes.extend([p, None, v] for p, v in _leaves(new_child, path + [name], []))
+    return changes
+
+
+class ConfigDiff(object):
+    """
+    Args:
+        config (vyos.config.Config): config object, paths given to the
+            methods of this class are relative to its current edit level
+    """
+    def __init__(self, config):
+        self._level = list(config.get_level())
+        self._everything_changed = \
+            not config.in_session() or not os.path.isfile('/tmp/vyos-config-status')
+
+        snapshot_key = config.get_snapshot_key()
+        self._changes = vyos.configsnapshot.load_data(snapshot_key, 'diff')
+        if self._changes is None:
+            self._changes = self._compute(config)
+            vyos.configsnapshot.store_data(snapshot_key, 'diff', self._changes)
+
+        # Every changed leaf and every node above it, so that
+        # is_node_changed() is a set lookup for any depth
+        self._changed_paths = set()
+        self._changed_leaves = set()
+        for path, _, _ in self._changes:
+            path = tuple(path)
+            self._changed_leaves.add(path)
+            for i in range(len(path) + 1):
+                self._changed_paths.add(path[:i])
+
+    def _compute(self, config):
+        level = config.get_level()
+        try:
+            config.set_level([])
+            session = config.get_config_dict([])
+            running = {} if self._everything_changed else config.get_config_dict([], effective=True)
+        finally:
+            config.set_level(level)
+        return diff_dicts(running, session)
+
+    def _make_path(self, path):
+        return tuple(self._level + _split(path))
+
+    def is_node_changed(self, path=[]):
+        """
+        Args:
+            path (str list): Configuration tree path
+
+        Returns:
+            True if any node at or under the path was added, removed,
+            or modified, or if the path is under a changed leaf node
+            (a value path such as "system host-name vyos")
+        """
+        if self._everything_changed:
+            return True
+        path = self._make_path(path)
+        if path in self._changed_paths:
+            return True
+        return any(path[:i] in self._changed_leaves for i in range(len(path)))
+
+    def get_changes(self, path=[]):
+        """
+        Args:
+            path (str list): Configuration tree path
+
+        Returns:
+            dict: with 'added', 'removed', and 'modified' keys, each a list of
+            (path, values) tuples of changed leaf nodes under the path,
+            where values of modified nodes are (old_values, new_values) tuples.
+            Paths are relative to the path argument.
+        """
+        path = list(self._make_path(path))
+        changes = {'added': [], 'removed': [], 'modified': []}
+        for leaf, old_values, new_values in self._changes:
+            if leaf[:len(path)] != path:
+                continue
+            relative = leaf[len(path):]
+            if old_values is None:
+                changes['added'].append((relative, new_values))
+            elif new_values is None:
+                changes['removed'].append((relative, old_values))
+            else:
+                changes['modified'].append((relative, (old_values, new_values)))
+        return changes
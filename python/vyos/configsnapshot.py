@@ -0,0 +1,209 @@
+# Copyright 2020 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Shared config snapshots for config sessions.
+
+During a commit, every conf_mode script constructs its own ``vyos.config.Config``,
+and each of them used to fork ``cli-shell-api showConfig`` twice to get the running
+and the proposed config. All of them get exactly the same text, unless the session
+changes in between.
+
+This module stores the config texts obtained by the first script on tmpfs,
+keyed by the session identifier and a *generation* of that session,
+so that all subsequent scripts of the same commit can read them back
+instead of forking. The texts hold keys and password hashes, so they are
+only readable by root and the config group.
+
+The generation is computed from the session's change set (the "changes only"
+directory of the unionfs-based config backend) and the matching nodes of the active
+config. Whenever a node is set or deleted in the session, or a part of the change set
+is committed to the active config, the generation changes and the snapshot is rebuilt.
+
+The cache can be disabled by setting the ``VYOS_CONFIG_SNAPSHOT`` environment
+variable to ``off``.
+"""
+
+import os
+import json
+import hashlib
+
+from vyos.defaults import directories
+
+
+def enabled(env=None):
+    """ Check if snapshots were not disabled by the user """
+    env = env if env is not None else os.environ
+    return env.get('VYOS_CONFIG_SNAPSHOT', 'on') != 'off'
+
+
+def session_dirs(env=None):
+    """
+    Returns a tuple (changes_dir, active_dir) for the config session
+    found in the environment, or None when not called from a session
+    """
+    env = env if env is not None else os.environ
+    changes_dir = env.get('VYATTA_CHANGES_ONLY_DIR')
+    active_dir = env.get('VYATTA_ACTIVE_CONFIGURATION_DIR', '/opt/vyatta/config/active')
+    if not changes_dir or not os.path.isdir(changes_dir):
+        return None
+    return (changes_dir, active_dir)
+
+
+def _mtime(path):
+    try:
+        return os.lstat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def generation(changes_dir, active_dir):
+    """
+    Compute a generation tag of a config session
+
+    The change set only contains nodes modified in the session, so walking it
+    is cheap even for very large configs. For every changed node we also stat
+    its counterpart in the active config, which is how partial commits
+    (one priority subtree after another) become visible.
+    """
+    digest = hashlib.sha1()
+    digest.update(str(_mtime(changes_dir)).encode())
+    digest.update(str(_mtime(active_dir)).encode())
+    for root, dirs, files in os.walk(changes_dir):
+        dirs.sort()
+        relative = os.path.relpath(root, changes_dir)
+        for name in sorted(dirs + files):
+            path = os.path.join(relative, name)
+            digest.update(path.encode())
+            digest.update(str(_mtime(os.path.join(root, name))).encode())
+            digest.update(str(_mtime(os.path.join(active_dir, path))).encode())
+    return digest.hexdigest()
+
+
+def active_generation(active_dir='/opt/vyatta/config/active'):
+    """
+    Compute a generation tag of the active config, which changes with every
+    commit that modifies it. Unlike generation(), this walks the whole active
+    config, so callers should not run it for every config access.
+    """
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(active_dir):
+        dirs.sort()
+        relative = os.path.relpath(root, active_dir)
+        digest.update(str(_mtime(root)).encode())
+        for name in sorted(files):
+            digest.update(os.path.join(relative, name).encode())
+            digest.update(str(_mtime(os.path.join(root, name))).encode())
+    return digest.hexdigest()
+
+
+def _session_id(changes_dir):
+    return hashlib.sha1(changes_dir.encode()).hexdigest()[:16]
+
+
+def key(env=None):
+    """
+    Returns the snapshot key for the current session,
+    or None if snapshots can't be used
+    """
+    if not enabled(env):
+        return None
+    dirs = session_dirs(env)
+    if not dirs:
+        return None
+    changes_dir, active_dir = dirs
+    return '{0}-{1}'.format(_session_id(changes_dir), generation(changes_dir, active_dir))
+
+
+def _snapshot_file(snapshot_key, name):
+    return os.path.join(directories['config_snapshot'], f'{snapshot_key}.{name}.json')
+
+
+def load_data(snapshot_key, name):
+    """
+    Returns the data stored under name for the given snapshot,
+    or None if there is none
+    """
+    if not snapshot_key:
+        return None
+    try:
+        with open(_snapshot_file(snapshot_key, name), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _snapshot_dir():
+    """
+    Return the snapshot directory, created for root and the config group
+    if needed, or None if it is not ours
+    """
+    snapshot_dir = directories['config_snapshot']
+    try:
+        os.mkdir(snapshot_dir, 0o750)
+        try:
+            from vyos.util import get_cfg_group_id
+            os.chown(snapshot_dir, -1, get_cfg_group_id())
+        except KeyError:
+            # no config group, root only
+            pass
+        # files created in it get the group of the directory
+        os.chmod(snapshot_dir, 0o2750)
+    except FileExistsError:
+        pass
+    if os.lstat(snapshot_dir).st_uid not in (0, os.geteuid()):
+        return None
+    return snapshot_dir
+
+
+def store_data(snapshot_key, name, data):
+    """
+    Save JSON-serializable data derived from a snapshot, such as the
+    config texts or the config diff. Data of older generations of the same
+    session is removed. Failure to store is not an error, the next
+    script will simply compute the data again.
+    """
+    if not snapshot_key:
+        return
+    session_prefix = snapshot_key.split('-')[0] + '-'
+    try:
+        snapshot_dir = _snapshot_dir()
+        if not snapshot_dir:
+            return
+        path = _snapshot_file(snapshot_key, name)
+        tmp_path = f'{path}.{os.getpid()}'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_NOFOLLOW, 0o640)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+        for filename in os.listdir(snapshot_dir):
+            if filename.startswith(session_prefix) and not filename.startswith(snapshot_key + '.'):
+                os.unlink(os.path.join(snapshot_dir, filename))
+    except OSError:
+        pass
+
+
+def load(snapshot_key):
+    """
+    Returns the snapshot dict stored for the given key, or None if there is none.
+    The dict has 'running' and 'session' keys with config texts.
+    """
+    return load_data(snapshot_key, 'config')
+
+
+def store(snapshot_key, running, session):
+    """ Save config texts for the given key """
+    store_data(snapshot_key, 'config', {'running': running, 'session': session})
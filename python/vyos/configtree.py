@@ -12,8 +12,11 @@
 # You should have received a copy of the GNU Lesser General Public License along with this library;
 # if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA 
 
+import os
 import re
 import json
+import warnings
+import threading
 
 from ctypes import cdll, c_char_p, c_void_p, c_int
 
@@ -41,96 +44,98 @@ class ConfigTreeError(Exception):
     pass
 
 
-class ConfigTree(object):
-    def __init__(self, config_string, libpath='/usr/lib/libvyosconfig.so.0'):
-        self.__config = None
-        self.__lib = cdll.LoadLibrary(libpath)
-
-        # Import functions
-        self.__from_string = self.__lib.from_string
-        self.__from_string.argtypes = [c_char_p]
-        self.__from_string.restype = c_void_p
-
-        self.__get_error = self.__lib.get_error
-        self.__get_error.argtypes = []
-        self.__get_error.restype = c_char_p
-
-        self.__to_string = self.__lib.to_string
-        self.__to_string.argtypes = [c_void_p]
-        self.__to_string.restype = c_char_p
-
-        self.__to_commands = self.__lib.to_commands
-        self.__to_commands.argtypes = [c_void_p]
-        self.__to_commands.restype = c_char_p
-
-        self.__to_json = self.__lib.to_json
-        self.__to_json.argtypes = [c_void_p]
-        self.__to_json.restype = c_char_p
-
-        self.__to_json_ast = self.__lib.to_json_ast
-        self.__to_json_ast.argtypes = [c_void_p]
-        self.__to_json_ast.restype = c_char_p
-
-        self.__set_add_value = self.__lib.set_add_value
-        self.__set_add_value.argtypes = [c_void_p, c_char_p, c_char_p]
-        self.__set_add_value.restype = c_int
-
-        self.__delete_value = self.__lib.delete_value
-        self.__delete_value.argtypes = [c_void_p, c_char_p, c_char_p]
-        self.__delete_value.restype = c_int
-
-        self.__delete = self.__lib.delete_node
-        self.__delete.argtypes = [c_void_p, c_char_p]
-        self.__delete.restype = c_int
-
-        self.__rename = self.__lib.rename_node
-        self.__rename.argtypes = [c_void_p, c_char_p, c_char_p]
-        self.__rename.restype = c_int
-
-        self.__copy = self.__lib.copy_node
-        self.__copy.argtypes = [c_void_p, c_char_p, c_char_p]
-        self.__copy.restype = c_int
-
-        self.__set_replace_value = self.__lib.set_replace_value
-        self.__set_replace_value.argtypes = [c_void_p, c_char_p, c_char_p]
-        self.__set_replace_value.restype = c_int
-
-        self.__set_valueless = self.__lib.set_valueless
-        self.__set_valueless.argtypes = [c_void_p, c_char_p]
-        self.__set_valueless.restype = c_int
+LIBPATH = '/usr/lib/libvyosconfig.so.0'
+
+# Function name, argument types, return type
+_prototypes = [
+    ('from_string', [c_char_p], c_void_p),
+    ('get_error', [], c_char_p),
+    ('to_string', [c_void_p], c_char_p),
+    ('to_commands', [c_void_p], c_char_p),
+    ('to_json', [c_void_p], c_char_p),
+    ('to_json_ast', [c_void_p], c_char_p),
+    ('set_add_value', [c_void_p, c_char_p, c_char_p], c_int),
+    ('delete_value', [c_void_p, c_char_p, c_char_p], c_int),
+    ('delete_node', [c_void_p, c_char_p], c_int),
+    ('rename_node', [c_void_p, c_char_p, c_char_p], c_int),
+    ('copy_node', [c_void_p, c_char_p, c_char_p], c_int),
+    ('set_replace_value', [c_void_p, c_char_p, c_char_p], c_int),
+    ('set_valueless', [c_void_p, c_char_p], c_int),
+    ('exists', [c_void_p, c_char_p], c_int),
+    ('list_nodes', [c_void_p, c_char_p], c_char_p),
+    ('return_value', [c_void_p, c_char_p], c_char_p),
+    ('return_values', [c_void_p, c_char_p], c_char_p),
+    ('is_tag', [c_void_p, c_char_p], c_int),
+    ('set_tag', [c_void_p, c_char_p], c_int),
+    ('destroy', [c_void_p], None),
+]
+
+
+class LibVyOSConfig(object):
+    """ libvyosconfig functions with their ctypes prototypes set up """
+    def __init__(self, libpath=LIBPATH):
+        lib = cdll.LoadLibrary(libpath)
+        for name, argtypes, restype in _prototypes:
+            function = getattr(lib, name)
+            function.argtypes = argtypes
+            function.restype = restype
+            setattr(self, name, function)
+
+
+_libraries = {}
+_libraries_lock = threading.Lock()
+
+def get_library(libpath=LIBPATH):
+    """
+    Returns the LibVyOSConfig binding for libpath, shared by all trees.
+    The library is loaded and its prototypes are set up on first use only.
+    """
+    lib = _libraries.get(libpath)
+    if lib is None:
+        with _libraries_lock:
+            lib = _libraries.get(libpath)
+            if lib is None:
+                lib = LibVyOSConfig(libpath)
+                _libraries[libpath] = lib
+    return lib
+
+
+def _use_python_backend():
+    """
+    Whether ConfigTree uses the pure Python implementation: when asked to
+    with VYOS_CONFIGTREE=python, or where libvyosconfig is not available,
+    which is expected on build and test hosts only
+    """
+    if os.environ.get('VYOS_CONFIGTREE') == 'python':
+        return True
+    if not os.path.exists(LIBPATH):
+        warnings.warn("{0} not found, using the pure Python config tree, "
+                      "set VYOS_CONFIGTREE=python to choose it".format(LIBPATH), RuntimeWarning)
+        return True
+    return False
+
+# resolved once, not for every tree
+_python_backend = _use_python_backend()
 
-        self.__exists = self.__lib.exists
-        self.__exists.argtypes = [c_void_p, c_char_p]
-        self.__exists.restype = c_int
 
-        self.__list_nodes = self.__lib.list_nodes
-        self.__list_nodes.argtypes = [c_void_p, c_char_p]
-        self.__list_nodes.restype = c_char_p
-
-        self.__return_value = self.__lib.return_value
-        self.__return_value.argtypes = [c_void_p, c_char_p]
-        self.__return_value.restype = c_char_p
-
-        self.__return_values = self.__lib.return_values
-        self.__return_values.argtypes = [c_void_p, c_char_p]
-        self.__return_values.restype = c_char_p
-
-        self.__is_tag = self.__lib.is_tag
-        self.__is_tag.argtypes = [c_void_p, c_char_p]
-        self.__is_tag.restype = c_int
-
-        self.__set_tag = self.__lib.set_tag
-        self.__set_tag.argtypes = [c_void_p, c_char_p]
-        self.__set_tag.restype = c_int
-
-        self.__destroy = self.__lib.destroy
-        self.__destroy.argtypes = [c_void_p]
+class ConfigTree(object):
+    def __new__(cls, config_string=None, libpath=LIBPATH):
+        # a tree of another library than the default one always uses it
+        if cls is ConfigTree and _python_backend and libpath == LIBPATH:
+            from vyos.pyconfigtree import PyConfigTree
+            return object.__new__(PyConfigTree)
+        return object.__new__(cls)
+
+    def __init__(self, config_string, libpath=LIBPATH):
+        self.__config = None
+        self.__dict_cache = None
+        self.__lib = get_library(libpath)
 
         config_section, version_section = extract_version(config_string)
         config_section = escape_backslash(config_section)
-        config = self.__from_string(config_section.encode())
+        config = self.__lib.from_string(config_section.encode())
         if config is None:
-            msg = self.__get_error().decode()
+            msg = self.__lib.get_error().decode()
             raise ValueError("Failed to parse config: {0}".format(msg))
         else:
             self.__config = config
@@ -138,24 +143,24 @@ class ConfigTree(object):
 
     def __del__(self):
         if self.__config is not None:
-            self.__destroy(self.__config)
+            self.__lib.destroy(self.__config)
 
     def __str__(self):
         return self.to_string()
 
     def to_string(self):
-        config_string = self.__to_string(self.__config).decode()
+        config_string = self.__lib.to_string(self.__config).decode()
         config_string = "{0}\n{1}".format(config_string, self.__version)
         return config_string
 
     def to_commands(self):
-        return self.__to_commands(self.__config).decode()
+        return self.__lib.to_commands(self.__config).decode()
 
     def to_json(self):
-        return self.__to_json(self.__config).decode()
+        return self.__lib.to_json(self.__config).decode()
 
     def to_json_ast(self):
-        return self.__to_json_ast(self.__config).decode()
+        return self.__lib.to_json_ast(self.__config).decode()
 
     def set(self, path, value=None, replace=True):
         """Set new entry in VyOS configuration.
@@ -167,30 +172,34 @@ class ConfigTree(object):
         """
 
         check_path(path)
+        self.__dict_cache = None
         path_str = " ".join(map(str, path)).encode()
 
         if value is None:
-            self.__set_valueless(self.__config, path_str)
+            self.__lib.set_valueless(self.__config, path_str)
         else:
             if replace:
-                self.__set_replace_value(self.__config, path_str, str(value).encode())
+                self.__lib.set_replace_value(self.__config, path_str, str(value).encode())
             else:
-                self.__set_add_value(self.__config, path_str, str(value).encode())
+                self.__lib.set_add_value(self.__config, path_str, str(value).encode())
 
     def delete(self, path):
         check_path(path)
+        self.__dict_cache = None
         path_str = " ".join(map(str, path)).encode()
 
-        self.__delete(self.__config, path_str)
+        self.__lib.delete_node(self.__config, path_str)
 
     def delete_value(self, path, value):
         check_path(path)
+        self.__dict_cache = None
         path_str = " ".join(map(str, path)).encode()
 
-        self.__delete_value(self.__config, path_str, value.encode())
+        self.__lib.delete_value(self.__config, path_str, value.encode())
 
     def rename(self, path, new_name):
         check_path(path)
+        self.__dict_cache = None
         path_str = " ".join(map(str, path)).encode()
         newname_str = new_name.encode()
 
@@ -198,20 +207,21 @@ class ConfigTree(object):
         new_path = path[:-1] + [new_name]
         if self.exists(new_path):
             raise ConfigTreeError()
-        res = self.__rename(self.__config, path_str, newname_str)
+        res = self.__lib.rename_node(self.__config, path_str, newname_str)
         if (res != 0):
             raise ConfigTreeError("Path [{}] doesn't exist".format(oldpath))
 
     def copy(self, old_path, new_path):
         check_path(old_path)
         check_path(new_path)
+        self.__dict_cache = None
         oldpath_str = " ".join(map(str, old_path)).encode()
         newpath_str = " ".join(map(str, new_path)).encode()
 
         # Check if a node with intended new name already exists
         if self.exists(new_path):
             raise ConfigTreeError()
-        res = self.__copy(self.__config, oldpath_str, newpath_str)
+        res = self.__lib.copy_node(self.__config, oldpath_str, newpath_str)
         if (res != 0):
             raise ConfigTreeError("Path [{}] doesn't exist".format(oldpath))
 
@@ -219,7 +229,7 @@ class ConfigTree(object):
         check_path(path)
         path_str = " ".join(map(str, path)).encode()
 
-        res = self.__exists(self.__config, path_str)
+        res = self.__lib.exists(self.__config, path_str)
         if (res == 0):
             return False
         else:
@@ -229,7 +239,7 @@ class ConfigTree(object):
         check_path(path)
         path_str = " ".join(map(str, path)).encode()
 
-        res_json = self.__list_nodes(self.__config, path_str).decode()
+        res_json = self.__lib.list_nodes(self.__config, path_str).decode()
         res = json.loads(res_json)
 
         if res is None:
@@ -241,7 +251,7 @@ class ConfigTree(object):
         check_path(path)
         path_str = " ".join(map(str, path)).encode()
 
-        res_json = self.__return_value(self.__config, path_str).decode()
+        res_json = self.__lib.return_value(self.__config, path_str).decode()
         res = json.loads(res_json)
 
         if res is None:
@@ -253,7 +263,7 @@ class ConfigTree(object):
         check_path(path)
         path_str = " ".join(map(str, path)).encode()
 
-        res_json = self.__return_values(self.__config, path_str).decode()
+        res_json = self.__lib.return_values(self.__config, path_str).decode()
         res = json.loads(res_json)
 
         if res is None:
@@ -261,11 +271,39 @@ class ConfigTree(object):
         else:
             return res
 
+    def get_subtree(self, path):
+        """
+        Retrieve a whole subtree as a native Python dict in one go.
+
+        Instead of crossing into the library and decoding JSON once per node,
+        the complete tree is converted once and cached until it's modified,
+        so code that looks up many nodes should use this.
+
+        Args:
+            path (str list): Configuration tree path, can be empty
+
+        Returns:
+            dict: In the format of to_json(): tag nodes and other non-leaf nodes
+                  are dicts, valueless leaf nodes are empty dicts, single-value
+                  leaf nodes are strings and multi-value ones are lists.
+                  The dict is shared with other callers and must not be modified.
+        """
+        check_path(path)
+        if self.__dict_cache is None:
+            self.__dict_cache = json.loads(self.to_json())
+
+        res = self.__dict_cache
+        for node in path:
+            if not isinstance(res, dict) or node not in res:
+                raise ConfigTreeError("Path [{}] doesn't exist".format(" ".join(path)))
+            res = res[node]
+        return res
+
     def is_tag(self, path):
         check_path(path)
         path_str = " ".join(map(str, path)).encode()
 
-        res = self.__is_tag(self.__config, path_str)
+        res = self.__lib.is_tag(self.__config, path_str)
         if (res >= 1):
             return True
         else:
@@ -275,7 +313,7 @@ class ConfigTree(object):
         check_path(path)
         path_str = " ".join(map(str, path)).encode()
 
-        res = self.__set_tag(self.__config, path_str)
+        res = self.__lib.set_tag(self.__config, path_str)
         if (res == 0):
             return True
         else:
@@ -0,0 +1,283 @@
+# Copyright 2020 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Parallel run of conf_mode scripts ahead of a commit.
+
+A commit runs the owner script of every changed node one after another,
+in priority order, although most of them are independent: ntp.py does not
+need to wait for snmp.py. At boot, when every node of the config is new,
+the scripts of the config can be run in a pool of processes before the
+commit, in an order given by a dependency graph, the schedule:
+
+ - interfaces and vrf scripts keep their priority order among each other
+   and towards all other scripts: an interfaces script runs after every
+   script with a lower priority, any other script runs after the
+   interfaces scripts with a lower priority (interfaces before services)
+ - a script runs after the scripts of the nodes below its own node which
+   have no priority of their own, as a commit runs them in one go with
+   their parent, children first
+ - a script runs after the scripts of the config paths named in the
+   <depends> of its node in the interface definitions
+ - the instances of a tag node script (one per interface, ...) run one
+   after another, in the order of the tag values
+
+The owners, priorities and dependencies are taken from the interface
+definitions at build time (scripts/build-conf-mode-schedule). The output
+of every script which succeeded is saved in a results directory, where the
+commit finds it (src/helpers/vyos-run-scheduled) and does not run the
+script again. Scripts which failed, or whose dependencies failed, are left
+to the commit, which runs them in order as usual.
+
+The results directory is private to root and records the process which
+saved the results: only scripts started by that process, that is by the
+commit of the boot config loader, use them. Scripts run ahead of the commit
+are traced (see vyos.trace) as part of a commit of their own, 'boot-' and
+the ID of that process.
+
+With one worker, the scripts are run one after another in the order of
+their priorities and paths, which is always the same for a config.
+"""
+
+import os
+import json
+import stat
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait
+
+from vyos.defaults import directories
+from vyos.defaults import conf_mode_schedule
+
+# scripts are run ahead of the commit when their results are in this directory
+results_dir = '/run/vyos-commit-schedule'
+
+# in the results directory, the process the results are for
+owner_file = '.owner'
+
+# subtrees whose scripts keep their priority order towards all scripts
+ordered_subtrees = ['interfaces', 'vrf']
+
+# nodes without a priority (on them or above) are committed last
+last_priority = 10000
+
+
+class Job(object):
+    """ A run of a conf_mode script, for a tag value of tag node scripts """
+    def __init__(self, handler, tag_value=None):
+        self.path = handler['path']
+        self.script = handler['script']
+        self.priority = handler['priority']
+        if self.priority is None:
+            self.priority = last_priority
+        self.detached = handler['detached']
+        self.depends = handler['depends']
+        self.tag_value = tag_value
+        self.status = None
+        self.output = ''
+        self.start = None
+        self.duration = None
+
+    @property
+    def name(self):
+        """ Name of the results file, as derived by vyos-run-scheduled """
+        if self.tag_value is None:
+            return self.script
+        value = self.tag_value.replace('%', '%25').replace('/', '%2F')
+        return f'{self.script}@{value}'
+
+    def ordered(self):
+        return self.path[0] in ordered_subtrees
+
+    def sort_key(self):
+        return (self.priority, self.path, self.tag_value or '')
+
+    def __repr__(self):
+        return self.name
+
+
+def process_id(pid=None):
+    """ PID and start time of a process, which is unique across PID reuse """
+    pid = pid or os.getpid()
+    with open(f'/proc/{pid}/stat', 'r') as f:
+        stat = f.read()
+    return f'{pid}-{stat[stat.rindex(")") + 2:].split()[19]}'
+
+
+def load_handlers(path=conf_mode_schedule):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def plan(handlers, config):
+    """
+    Return the jobs for the nodes of the config that have owner scripts,
+    config is a vyos.config.Config of the session to commit
+    """
+    jobs = []
+    for handler in handlers:
+        path = handler['path']
+        if not config.exists(path):
+            continue
+        if handler['tag']:
+            for value in config.list_nodes(path):
+                jobs.append(Job(handler, value))
+        else:
+            jobs.append(Job(handler))
+    return sorted(jobs, key=Job.sort_key)
+
+
+def _below(path, parent):
+    return len(path) > len(parent) and path[:len(parent)] == parent
+
+
+def _must_follow(job, other):
+    """ Whether the script of job has to run after the one of other """
+    if other.priority < job.priority and (job.ordered() or other.ordered()):
+        return True
+    if _below(other.path, job.path) and not other.detached:
+        return True
+    return any(other.path[:len(d.split())] == d.split() for d in job.depends)
+
+
+def dependencies(jobs):
+    """ Return the set of jobs each job has to wait for (see above) """
+    deps = {job: set() for job in jobs}
+
+    # runs of the same script, instances of tag node scripts and scripts
+    # owning several nodes, one after another
+    previous = {}
+    for job in sorted(jobs, key=Job.sort_key):
+        if job.script in previous:
+            deps[job].add(previous[job.script])
+        previous[job.script] = job
+
+    # all jobs of a node share its priority and dependencies: the first job
+    # of a node waits for the last job of every node it has to follow
+    nodes = {}
+    for job in sorted(jobs, key=Job.sort_key):
+        nodes.setdefault((tuple(job.path), job.script), []).append(job)
+    for node_jobs in nodes.values():
+        first = node_jobs[0]
+        for other_jobs in nodes.values():
+            if other_jobs is not node_jobs and _must_follow(first, other_jobs[-1]):
+                deps[first].add(other_jobs[-1])
+    return deps
+
+
+def _run_job(job, env):
+    job.start = time.time()
+    started = time.monotonic()
+    job_env = dict(env)
+    if job.tag_value is not None:
+        job_env['VYOS_TAGNODE_VALUE'] = job.tag_value
+    script = os.path.join(directories['conf_mode'], job.script)
+    try:
+        p = subprocess.run([script], env=job_env, stdout=subprocess.PIPE,
+                           stderr=subprocess.STDOUT)
+        job.status = p.returncode
+        job.output = p.stdout.decode(errors='replace')
+    except OSError as e:
+        job.status = 127
+        job.output = f'{script}: {e.strerror}\n'
+    job.duration = time.monotonic() - started
+    return job
+
+
+def run(jobs, env=None, workers=1):
+    """
+    Run the jobs, at most workers of them at a time, with the environment
+    env (the one of the config session). Returns the jobs which were run,
+    in the order they were started; jobs whose dependencies failed are not.
+    """
+    env = dict(os.environ, **(env or {}))
+    # read by vyos.util._commit_id(), the scripts have no my_commit parent
+    env['VYOS_COMMIT_ID'] = f'boot-{process_id()}'
+    workers = max(1, workers)
+    deps = dependencies(jobs)
+
+    waiting = {job: len(deps[job]) for job in jobs}
+    dependents = {job: [] for job in jobs}
+    for job in jobs:
+        for dep in deps[job]:
+            dependents[dep].append(job)
+
+    # jobs whose dependencies succeeded are started in a fixed order
+    order = {job: i for i, job in enumerate(sorted(jobs, key=Job.sort_key))}
+    ready = [job for job in jobs if not waiting[job]]
+    started = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = set()
+        while ready or running:
+            ready.sort(key=order.get, reverse=True)
+            while ready and len(running) < workers:
+                job = ready.pop()
+                started.append(job)
+                running.add(pool.submit(_run_job, job, env))
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = future.result()
+                if job.status != 0:
+                    # left to the commit, with everything depending on it
+                    continue
+                for dependent in dependents[job]:
+                    waiting[dependent] -= 1
+                    if not waiting[dependent]:
+                        ready.append(dependent)
+
+    return started
+
+
+def save_results(jobs, directory=results_dir):
+    """
+    Leave the output of the jobs which succeeded to the commit run by this
+    process, raises FileExistsError if the directory was left by another run
+    """
+    os.mkdir(directory, 0o700)
+    for job in jobs:
+        if job.status == 0:
+            with open(os.path.join(directory, job.name), 'w') as f:
+                f.write(job.output)
+    # last, the results are complete
+    with open(os.path.join(directory, owner_file), 'w') as f:
+        f.write(process_id())
+
+
+def clear_results(directory=results_dir):
+    """ Remove the results directory, if it is ours """
+    try:
+        st = os.lstat(directory)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.geteuid():
+        return
+    for name in os.listdir(directory):
+        os.unlink(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+def report(jobs, elapsed, workers):
+    """ Timing summary of a run, for the boot log """
+    failed = [job for job in jobs if job.status != 0]
+    busy = sum(job.duration for job in jobs)
+    lines = [f'Ran {len(jobs)} conf_mode scripts with {workers} workers in '
+             f'{elapsed:.2f}s ({busy:.2f}s of script time), {len(failed)} failed']
+    for job in sorted(jobs, key=lambda j: j.duration, reverse=True):
+        status = '' if job.status == 0 else f'  exit {job.status}'
+        lines.append(f'{job.duration:8.3f}s  {job.priority:>5}  {job.name}{status}')
+    return '\n'.join(lines) + '\n'
@@ -21,7 +21,9 @@ directories = {
   "current": "/opt/vyatta/etc/config-migrate/current",
   "migrate": "/opt/vyatta/etc/config-migrate/migrate",
   "log": "/var/log/vyatta",
-  "templates": "/usr/share/vyos/templates/"
+  "templates": "/usr/share/vyos/templates/",
+  "templates_compiled": "/usr/share/vyos/templates-compiled/",
+  "config_snapshot": "/run/vyos-config-snapshot"
 }
 
 cfg_group = 'vyattacfg'
@@ -30,8 +32,16 @@ cfg_vintage = 'vyatta'
 
 commit_lock = '/opt/vyatta/config/.lock'
 
+ifconfig_backend_file = '/config/vyos-ifconfig-backend'
+
+command_log = '/var/log/vyatta/vyos-commands.log'
+
+commit_trace = '/var/log/vyatta/vyos-commit-trace.log'
+
 version_file = '/usr/share/vyos/component-versions.json'
 
+conf_mode_schedule = '/usr/share/vyos/conf-mode-schedule.json'
+
 https_data = {
     'listen_addresses' : { '*': ['_'] }
 }
@@ -10,31 +10,11 @@ class VyOSHostsdError(Exception):
     pass
 
 
-class Client(object):
-    def __init__(self):
-        try:
-            context = zmq.Context()
-            self.__socket = context.socket(zmq.REQ)
-            self.__socket.RCVTIMEO = 10000 #ms
-            self.__socket.setsockopt(zmq.LINGER, 0)
-            self.__socket.connect(SOCKET_PATH)
-        except zmq.error.Again:
-            raise VyOSHostsdError("Could not connect to vyos-hostsd")
-
-    def _communicate(self, msg):
-        try:
-            request = json.dumps(msg).encode()
-            self.__socket.send(request)
-
-            reply_msg = self.__socket.recv().decode()
-            reply = json.loads(reply_msg)
-            if 'error' in reply:
-                raise VyOSHostsdError(reply['error'])
-            else:
-                return reply["data"]
-        except zmq.error.Again:
-            raise VyOSHostsdError("Could not connect to vyos-hostsd")
-
+class _Operations(object):
+    """
+    Mixin of the operations vyos-hostsd supports, each is passed as a
+    message to the _communicate() method of the class using it
+    """
     def set_host_name(self, host_name, domain_name, search_domains):
         msg = {
             'type': 'host_name',
@@ -67,3 +47,78 @@ class Client(object):
         msg = {'type': 'name_servers', 'op': 'get', 'tag': tag}
         return self._communicate(msg)
 
+
+class Client(_Operations):
+    def __init__(self):
+        try:
+            context = zmq.Context()
+            self.__socket = context.socket(zmq.REQ)
+            self.__socket.RCVTIMEO = 10000 #ms
+            self.__socket.setsockopt(zmq.LINGER, 0)
+            self.__socket.connect(SOCKET_PATH)
+        except zmq.error.Again:
+            raise VyOSHostsdError("Could not connect to vyos-hostsd")
+
+    def _communicate(self, msg):
+        try:
+            request = json.dumps(msg).encode()
+            self.__socket.send(request)
+
+            reply_msg = self.__socket.recv().decode()
+            reply = json.loads(reply_msg)
+            if 'error' in reply:
+                raise VyOSHostsdError(reply['error'])
+            else:
+                return reply["data"]
+        except zmq.error.Again:
+            raise VyOSHostsdError("Could not connect to vyos-hostsd")
+
+    def transaction(self):
+        """
+        Collect operations and send them as one request, which vyos-hostsd
+        applies completely or not at all, with a single update of its files:
+
+        with client.transaction() as t:
+            t.delete_name_servers('static')
+            t.add_name_servers('static', ['192.0.2.1'])
+        """
+        return Transaction(self)
+
+    def replace_hosts(self, tag, hosts):
+        with self.transaction() as t:
+            t.delete_hosts(tag)
+            t.add_hosts(tag, hosts)
+
+    def replace_name_servers(self, tag, servers):
+        with self.transaction() as t:
+            t.delete_name_servers(tag)
+            t.add_name_servers(tag, servers)
+
+
+class Transaction(_Operations):
+    """
+    Operations collected by Client.transaction(), results of get operations
+    are returned by commit()
+    """
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def _communicate(self, msg):
+        self._ops.append(msg)
+
+    def commit(self):
+        """
+        Send the collected operations, returns the list of their results
+        """
+        ops, self._ops = self._ops, []
+        if not ops:
+            return []
+        return self._client._communicate({'op': 'batch', 'data': ops})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
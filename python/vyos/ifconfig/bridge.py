@@ -14,6 +14,7 @@
 # License along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
 
+from vyos.ifconfig import netlink
 from vyos.ifconfig.interface import Interface
 
 from vyos.validate import assert_boolean
@@ -81,9 +82,11 @@ class BridgeIf(Interface):
     _command_set = {**Interface._command_set, **{
         'add_port': {
             'shellcmd': 'ip link set dev {value} master {ifname}',
+            'netlink': lambda c: netlink.set_link_master(c['value'], c['ifname']),
         },
         'del_port': {
             'shellcmd': 'ip link set dev {value} nomaster',
+            'netlink': lambda c: netlink.set_link_master(c['value'], ''),
         },
     }}
 
@@ -18,10 +18,33 @@ import os
 
 from vyos.util import debug, debug_msg
 from vyos.util import popen, cmd
+from vyos.util import current_batch
 from vyos.ifconfig.section import Section
+from vyos.defaults import ifconfig_backend_file
+
+
+def backend():
+    """
+    Returns the backend used to run the commands of the _command_get and
+    _command_set tables: 'iproute2' (the default) runs ip(8) and friends,
+    'netlink' talks to the kernel directly when the table entry supports it.
+
+    It can be selected for a deployment by writing the backend name to
+    /config/vyos-ifconfig-backend, or for a process and its children with
+    the VYOS_IFCONFIG_BACKEND environment variable.
+    """
+    name = os.environ.get('VYOS_IFCONFIG_BACKEND', '')
+    if not name and os.path.isfile(ifconfig_backend_file):
+        with open(ifconfig_backend_file, 'r') as f:
+            name = f.read().strip()
+    return name if name in ['iproute2', 'netlink'] else 'iproute2'
 
 
 class Control(Section):
+    # Each entry has a 'shellcmd' to format and run, entries may also have
+    # a 'netlink' function doing the same through vyos.ifconfig.netlink.
+    # It is called with the interface config and the value to set, before
+    # any 'convert', and getters return the same as the command after 'format'
     _command_get = {}
     _command_set = {}
 
@@ -37,19 +60,36 @@ class Control(Section):
         if kargs.get('debug', True):
             self.debug = debug('ifconfig')
 
+        self.netlink = backend() == 'netlink'
+
     def _debug_msg (self, message):
         return debug_msg(message, self.debug)
 
+    def _flush(self):
+        # run the commands queued in a vyos.util.Batch before anything
+        # else touches the kernel state, to keep them in order
+        batch = current_batch()
+        if batch:
+            batch.flush()
+
     def _popen(self, command):
         return popen(command, self.debug)
 
     def _cmd(self, command):
         return cmd(command, self.debug)
 
+    def _netlink_command(self, function, config, name):
+        self._flush()
+        self._debug_msg(f"netlink '{name}' for {config}")
+        return function(config)
+
     def _get_command(self, config, name):
         """
         Using the defined names, set data write to sysfs.
         """
+        if self.netlink and 'netlink' in self._command_get[name]:
+            return self._netlink_command(self._command_get[name]['netlink'], config, name)
+
         cmd = self._command_get[name]['shellcmd'].format(**config)
         return self._command_get[name].get('format', lambda _: _)(self._cmd(cmd))
 
@@ -67,6 +107,10 @@ class Control(Section):
             except Exception as e:
                 raise e.__class__(f'Could not set {name}. {e}')
 
+        if self.netlink and 'netlink' in self._command_set[name]:
+            return self._netlink_command(self._command_set[name]['netlink'],
+                                         {**config, **{'value': value}}, name)
+
         convert = self._command_set[name].get('convert', None)
         if convert:
             value = convert(value)
@@ -78,6 +122,11 @@ class Control(Section):
         config = {**config, **{'value': value}}
 
         cmd = self._command_set[name]['shellcmd'].format(**config)
+        batch = current_batch()
+        if batch:
+            # run with the other commands of the batch
+            self._debug_msg(f"batch '{cmd}'")
+            return batch.add(cmd)
         return self._command_set[name].get('format', lambda _: _)(self._cmd(cmd))
 
     _sysfs_get = {}
@@ -87,6 +136,7 @@ class Control(Section):
         """
         Provide a single primitive w/ error checking for reading from sysfs.
         """
+        self._flush()
         value = None
         with open(filename, 'r') as f:
             value = f.read().rstrip('\n')
@@ -98,6 +148,7 @@ class Control(Section):
         """
         Provide a single primitive w/ error checking for writing to sysfs.
         """
+        self._flush()
         self._debug_msg("write '{}' > '{}'".format(value, filename))
         if os.path.isfile(filename):
             with open(filename, 'w') as f:
@@ -45,7 +45,7 @@ class EthernetIf(Interface):
 
     @staticmethod
     def feature(ifname, option, value):
-        run(f'/sbin/ethtool -K {ifname} {option} {value}','ifconfig')
+        run(['/sbin/ethtool', '-K', ifname, option, value], 'ifconfig')
         return False
 
     _command_set = {**Interface._command_set, **{
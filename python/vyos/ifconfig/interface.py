@@ -14,12 +14,9 @@
 # License along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import re
 import json
-import glob
 import time
 from time import sleep
-from os.path import isfile
 from copy import deepcopy
 from datetime import timedelta
 
@@ -34,6 +31,7 @@ from vyos.ifconfig.dhcp import DHCP
 from vyos.validate import is_ipv4
 from vyos.validate import is_ipv6
 from vyos.validate import is_intf_addr_assigned
+from vyos.validate import get_address_snapshot
 from vyos.validate import assert_boolean
 from vyos.validate import assert_list
 from vyos.validate import assert_mac
@@ -41,6 +39,8 @@ from vyos.validate import assert_mtu
 from vyos.validate import assert_positive
 from vyos.validate import assert_range
 
+from vyos.ifconfig import netlink
+from vyos.ifconfig import stats
 from vyos.ifconfig.control import Control
 
 
@@ -65,6 +65,7 @@ class Interface(Control):
         'admin_state': {
             'shellcmd': 'ip -json link show dev {ifname}',
             'format': lambda j: 'up' if 'UP' in json.loads(j)[0]['flags'] else 'down',
+            'netlink': lambda c: 'up' if netlink.get_link_flags(c['ifname']) & netlink.IFF_UP else 'down',
         }
     }
 
@@ -72,14 +73,25 @@ class Interface(Control):
         'admin_state': {
             'validate': lambda v: assert_list(v, ['up', 'down']),
             'shellcmd': 'ip link set dev {ifname} {value}',
+            'netlink': lambda c: netlink.set_link_flag(c['ifname'], netlink.IFF_UP, c['value'] == 'up'),
         },
         'mac': {
             'validate': assert_mac,
             'shellcmd': 'ip link set dev {ifname} address {value}',
+            'netlink': lambda c: netlink.set_link_address(c['ifname'], c['value']),
         },
         'vrf': {
             'convert': lambda v: f'master {v}' if v else 'nomaster',
             'shellcmd': 'ip link set dev {ifname} {value}',
+            'netlink': lambda c: netlink.set_link_master(c['ifname'], c['value']),
+        },
+        'add_addr': {
+            'shellcmd': 'ip addr add "{value}" dev "{ifname}"',
+            'netlink': lambda c: netlink.add_addr(c['ifname'], c['value']),
+        },
+        'del_addr': {
+            'shellcmd': 'ip addr del "{value}" dev "{ifname}"',
+            'netlink': lambda c: netlink.del_addr(c['ifname'], c['value']),
         },
     }
 
@@ -212,8 +224,10 @@ class Interface(Control):
         self._addr = []
 
     def _create(self):
-        cmd = 'ip link add dev {ifname} type {type}'.format(**self.config)
-        self._cmd(cmd)
+        if self.netlink:
+            return netlink.add_link(self.config['ifname'], self.config['type'])
+        self._cmd(['ip', 'link', 'add', 'dev', self.config['ifname'],
+                   'type', self.config['type']])
 
     def remove(self):
         """
@@ -259,13 +273,15 @@ class Interface(Control):
         # ---------------------------------------------------------------------
 
         self._delete()
+        get_address_snapshot().remove_interface(self.config['ifname'])
 
     def _delete(self):
         # NOTE (Improvement):
         # after interface removal no other commands should be allowed
         # to be called and instead should raise an Exception:
-        cmd = 'ip link del dev {}'.format(self.config['ifname'])
-        return self._cmd(cmd)
+        if self.netlink:
+            return netlink.del_link(self.config['ifname'])
+        return self._cmd(['ip', 'link', 'del', 'dev', self.config['ifname']])
 
     def get_mtu(self):
         """
@@ -288,7 +304,10 @@ class Interface(Control):
         >>> Interface('eth0').get_mtu()
         '1400'
         """
-        return self.set_interface('mtu', mtu)
+        result = self.set_interface('mtu', mtu)
+        # the kernel removes all IPv6 addresses below an MTU of 1280
+        self._refresh_addr()
+        return result
 
     def get_mac(self):
         """
@@ -331,6 +350,8 @@ class Interface(Control):
         >>> Interface('eth0').set_vrf()
         """
         self.set_interface('vrf', vrf)
+        # enslaving the interface flushes its non-permanent addresses
+        self._refresh_addr()
 
     def set_arp_cache_tmo(self, tmo):
         """
@@ -417,7 +438,9 @@ class Interface(Control):
         Autoconfigure addresses using Prefix Information in Router
         Advertisements.
         """
-        return self.set_interface('ipv6_autoconf', autoconf)
+        result = self.set_interface('ipv6_autoconf', autoconf)
+        self._refresh_addr()
+        return result
 
     def set_ipv6_eui64_address(self, prefix):
         """
@@ -453,6 +476,10 @@ class Interface(Control):
             eui64 = f'{eui64}/{prefix}'
             self.add_addr(eui64 )
 
+        # the kernel may have changed the link-local and autoconfigured
+        # addresses along with it
+        self._refresh_addr()
+
     def set_ipv6_forwarding(self, forwarding):
         """
         Configure IPv6 interface-specific Host/Router behaviour.
@@ -478,14 +505,18 @@ class Interface(Control):
         3. Router Advertisements are ignored unless accept_ra is 2.
         4. Redirects are ignored.
         """
-        return self.set_interface('ipv6_forwarding', forwarding)
+        result = self.set_interface('ipv6_forwarding', forwarding)
+        self._refresh_addr()
+        return result
 
     def set_ipv6_dad_messages(self, dad):
         """
         The amount of Duplicate Address Detection probes to send.
         Default: 1
         """
-        return self.set_interface('ipv6_dad_transmits', dad)
+        result = self.set_interface('ipv6_dad_transmits', dad)
+        self._refresh_addr()
+        return result
 
     def set_link_detect(self, link_filter):
         """
@@ -605,6 +636,88 @@ class Interface(Control):
         """
         self.set_interface('proxy_arp_pvlan', enable)
 
+    def _get_state_value(self, name):
+        ifname = self.config['ifname']
+        if name == 'admin_state':
+            # no need to fork ip(8) just to read the IFF_UP flag
+            flags = self._read_sysfs(f'/sys/class/net/{ifname}/flags')
+            return 'up' if int(flags, 16) & netlink.IFF_UP else 'down'
+        if name == 'vrf':
+            self._flush()
+            master = f'/sys/class/net/{ifname}/master'
+            return os.path.basename(os.readlink(master)) if os.path.islink(master) else ''
+        if name in self._sysfs_get:
+            return self.get_interface(name)
+        if name in self._sysfs_set:
+            filename = self._sysfs_set[name]['location'].format(**self.config)
+            if os.path.isfile(filename):
+                return self._read_sysfs(filename)
+        # unknown, the setting will always be applied
+        return None
+
+    def _get_state_expected(self, name, value):
+        # the value as read back by _get_state_value() once it is applied
+        value = str(value)
+        if name == 'mac':
+            return value.lower()
+        if name in self._sysfs_set and name not in self._sysfs_get:
+            convert = self._sysfs_set[name].get('convert', None)
+            if convert:
+                value = str(convert(value))
+        return value
+
+    def get_state(self, names):
+        """
+        Read the current value of the given settings from the kernel.
+        Settings are named like for set_interface(), values are returned
+        as the kernel reports them, None if the value can not be read.
+
+        Example:
+        >>> from vyos.ifconfig import Interface
+        >>> Interface('eth0').get_state(['mtu', 'admin_state'])
+        {'mtu': '1500', 'admin_state': 'up'}
+        """
+        return {name: self._get_state_value(name) for name in names}
+
+    def apply(self, desired_state):
+        """
+        Bring the interface to the desired state. The current state is read
+        once, and only settings whose value differs are written, so that
+        re-applying an unchanged config costs no forks and no writes.
+
+        desired_state: dict of settings named like for set_interface() to
+        their values, applied in the order of the dict. A 'mac' change
+        brings the interface down, so 'admin_state' should come after it.
+
+        Returns a dict of the changed settings with (old, new) values.
+
+        Example:
+        >>> from vyos.ifconfig import Interface
+        >>> Interface('eth0').apply({'mtu': '1400', 'admin_state': 'up'})
+        {'mtu': ('1500', '1400')}
+        """
+        current = self.get_state(desired_state.keys())
+        changed = {}
+        for name, value in desired_state.items():
+            if current[name] == self._get_state_expected(name, value):
+                continue
+            if name == 'mac':
+                self.set_mac(value)
+                # set_mac() may have brought the interface down
+                if 'admin_state' in current:
+                    current['admin_state'] = self._get_state_value('admin_state')
+            elif self.set_interface(name, value) is False:
+                # not supported by the kernel, e.g. missing sysctl
+                continue
+            changed[name] = (current[name], value)
+
+        # the kernel may have removed addresses along with these
+        if any(name in ['mtu', 'vrf'] or name.startswith('ipv6_') for name in changed):
+            self._refresh_addr()
+
+        self._debug_msg(f"apply changed {changed}")
+        return changed
+
     def get_addr(self):
         """
         Retrieve assigned IPv4 and IPv6 addresses from given interface.
@@ -616,6 +729,7 @@ class Interface(Control):
         ['172.16.33.30/24', 'fe80::20c:29ff:fe11:a174/64']
         """
 
+        self._flush()
         ipv4 = []
         ipv6 = []
 
@@ -642,6 +756,14 @@ class Interface(Control):
 
         return ipv4 + ipv6
 
+    def _refresh_addr(self):
+        """
+        Read the addresses of the interface from the kernel into the
+        address snapshot, after changes which may have removed some
+        """
+        get_address_snapshot().refresh_interface(
+            self.config['ifname'], [a for _, a in netlink.get_addrs(self.config['ifname'])])
+
     def add_addr(self, addr):
         """
         Add IP(v6) address to interface. Address is only added if it is not
@@ -676,12 +798,20 @@ class Interface(Control):
 
         if addr == 'dhcp':
             self.dhcp.v4.set()
+            # dhclient may have replaced addresses of the interface
+            get_address_snapshot(refresh=True)
         elif addr == 'dhcpv6':
             self.dhcp.v6.set()
+            get_address_snapshot(refresh=True)
         else:
+            if is_intf_addr_assigned(self.config['ifname'], addr):
+                # the kernel removes addresses on its own, e.g. on MTU or
+                # IPv6 changes: only skip the address if it is still there
+                self._refresh_addr()
             if not is_intf_addr_assigned(self.config['ifname'], addr):
-                cmd = 'ip addr add "{}" dev "{}"'.format(addr, self.config['ifname'])
-                return self._cmd(cmd)
+                result = self.set_interface('add_addr', addr)
+                get_address_snapshot().add(self.config['ifname'], addr)
+                return result
 
     def del_addr(self, addr):
         """
@@ -707,12 +837,16 @@ class Interface(Control):
         """
         if addr == 'dhcp':
             self.dhcp.v4.delete()
+            # dhclient releases the lease when it is stopped
+            get_address_snapshot(refresh=True)
         elif addr == 'dhcpv6':
             self.dhcp.v6.delete()
+            get_address_snapshot(refresh=True)
         else:
             if is_intf_addr_assigned(self.config['ifname'], addr):
-                cmd = 'ip addr del "{}" dev "{}"'.format(addr, self.config['ifname'])
-                return self._cmd(cmd)
+                result = self.set_interface('del_addr', addr)
+                get_address_snapshot().remove(self.config['ifname'], addr)
+                return result
 
     def op_show_interface_stats(self):
         stats = self.get_interface_stats()
@@ -725,18 +859,14 @@ class Interface(Control):
         print('  '.join(('\n'+output.lstrip()).splitlines(True)))
 
     def get_interface_stats(self):
-        interface_stats = dict()
-        devices = [f for f in glob.glob("/sys/class/net/**/statistics")]
-        for dev_path in devices:
-            metrics = [f for f in glob.glob(dev_path +"/**")]
-            dev = re.findall(r"/sys/class/net/(.*)/statistics",dev_path)[0]
-            dev_dict = dict()
-            for metric_path in metrics:
-                metric = metric_path.replace(dev_path+"/","")
-                if isfile(metric_path):
-                    data = open(metric_path, 'r').read()[:-1]
-                    dev_dict[metric] = int(data)
-            interface_stats[dev] = dev_dict
-
-        return interface_stats[self.config['ifname']]
+        """
+        Get the counters of the interface, named like the files in
+        /sys/class/net/<interface>/statistics
+
+        Example:
+        >>> from vyos.ifconfig import Interface
+        >>> Interface('eth0').get_interface_stats()['rx_bytes']
+        123456
+        """
+        return stats.get_interface_stats(self.config['ifname'])
 
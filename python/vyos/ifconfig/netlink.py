@@ -0,0 +1,323 @@
+# Copyright 2020 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A minimal rtnetlink client, used by vyos.ifconfig instead of ip(8)
+when the netlink backend is selected (see vyos.ifconfig.control).
+
+Only the requests vyos.ifconfig needs are implemented: creating and
+deleting links (generic and VLAN), changing their flags, MAC address
+and master, and adding and removing addresses. Every request is acked
+by the kernel, errors are raised as OSError like failed commands are.
+
+The dumps of all addresses and of all link counters are also used
+regardless of the backend, by vyos.validate and vyos.ifconfig.stats.
+"""
+
+import os
+import errno
+import socket
+import struct
+import threading
+
+from ipaddress import ip_interface
+
+# linux/netlink.h
+NETLINK_ROUTE = 0
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_ACK = 0x4
+NLM_F_DUMP = 0x300
+NLM_F_EXCL = 0x200
+NLM_F_CREATE = 0x400
+
+# linux/rtnetlink.h
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+
+# linux/if_link.h
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_LINK = 5
+IFLA_MASTER = 10
+IFLA_LINKINFO = 18
+IFLA_STATS64 = 23
+IFLA_INFO_KIND = 1
+IFLA_INFO_DATA = 2
+IFLA_VLAN_ID = 1
+IFLA_VLAN_EGRESS_QOS = 3
+IFLA_VLAN_INGRESS_QOS = 4
+IFLA_VLAN_PROTOCOL = 5
+IFLA_VLAN_QOS_MAPPING = 1
+
+# linux/if_addr.h
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+
+# linux/if.h
+IFF_UP = 0x1
+IFF_ALLMULTI = 0x200
+IFF_MULTICAST = 0x1000
+
+NLA_F_NESTED = 0x8000
+
+_nlmsghdr = struct.Struct('=LHHLL')
+_nlmsgerr = struct.Struct('=i')
+_ifinfomsg = struct.Struct('=BxHiII')
+_ifaddrmsg = struct.Struct('=BBBBI')
+_rtattr = struct.Struct('=HH')
+
+# struct rtnl_link_stats64, named like the files in /sys/class/net/*/statistics
+_link_stats64 = (
+    'rx_packets', 'tx_packets', 'rx_bytes', 'tx_bytes',
+    'rx_errors', 'tx_errors', 'rx_dropped', 'tx_dropped',
+    'multicast', 'collisions', 'rx_length_errors', 'rx_over_errors',
+    'rx_crc_errors', 'rx_frame_errors', 'rx_fifo_errors', 'rx_missed_errors',
+    'tx_aborted_errors', 'tx_carrier_errors', 'tx_fifo_errors',
+    'tx_heartbeat_errors', 'tx_window_errors', 'rx_compressed',
+    'tx_compressed', 'rx_nohandler',
+)
+
+_vlan_protocols = {
+    '802.1q': 0x8100,
+    '802.1ad': 0x88a8,
+}
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+def _attr(kind, data):
+    if isinstance(data, str):
+        data = data.encode() + b'\0'
+    length = _rtattr.size + len(data)
+    return _rtattr.pack(length, kind) + data + b'\0' * (_align(length) - length)
+
+def _nested(kind, *attrs):
+    return _attr(kind | NLA_F_NESTED, b''.join(attrs))
+
+def _u16(value):
+    return struct.pack('=H', value)
+
+def _u32(value):
+    return struct.pack('=I', value)
+
+class NetlinkSocket(object):
+    def __init__(self):
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_CLOEXEC, NETLINK_ROUTE)
+        self._sock.bind((0, 0))
+        self._seq = 0
+
+    def _send(self, kind, payload, flags):
+        self._seq += 1
+        header = _nlmsghdr.pack(_nlmsghdr.size + len(payload), kind,
+                                NLM_F_REQUEST | flags, self._seq, 0)
+        self._sock.send(header + payload)
+        return self._seq
+
+    def _receive(self, seq):
+        # Yields (type, payload) of all messages answering the request,
+        # errors reported by the kernel are raised
+        while True:
+            data = self._sock.recv(65536)
+            offset = 0
+            while offset + _nlmsghdr.size <= len(data):
+                length, msg_type, _, msg_seq, _ = _nlmsghdr.unpack_from(data, offset)
+                body = data[offset + _nlmsghdr.size:offset + length]
+                offset += _align(length)
+                if msg_seq != seq:
+                    continue
+                if msg_type == NLMSG_ERROR:
+                    error = -_nlmsgerr.unpack_from(body)[0]
+                    if error:
+                        raise OSError(error, os.strerror(error))
+                yield msg_type, body
+
+    def request(self, kind, payload, flags=0):
+        """
+        Send a request and wait for the kernel's answer
+
+        Returns:
+            bytes: the payload of the reply for requests that have one,
+            or None for requests that are only acked
+        """
+        reply = None
+        for msg_type, body in self._receive(self._send(kind, payload, NLM_F_ACK | flags)):
+            if msg_type == NLMSG_ERROR:
+                return reply
+            reply = body
+
+    def dump(self, kind, payload):
+        """
+        Send a dump request, like RTM_GETADDR for all addresses
+
+        Returns:
+            list: the payloads of all replies
+        """
+        replies = []
+        for msg_type, body in self._receive(self._send(kind, payload, NLM_F_DUMP)):
+            if msg_type in [NLMSG_DONE, NLMSG_ERROR]:
+                return replies
+            replies.append(body)
+
+
+_local = threading.local()
+
+def _socket():
+    # One socket per thread, it is opened on first use
+    if not hasattr(_local, 'socket'):
+        _local.socket = NetlinkSocket()
+    return _local.socket
+
+def _request(kind, payload, flags=0):
+    return _socket().request(kind, payload, flags)
+
+def _dump(kind, payload):
+    return _socket().dump(kind, payload)
+
+def _parse_attrs(data):
+    attrs = {}
+    offset = 0
+    while offset + _rtattr.size <= len(data):
+        length, kind = _rtattr.unpack_from(data, offset)
+        if length < _rtattr.size:
+            break
+        attrs[kind & ~NLA_F_NESTED] = data[offset + _rtattr.size:offset + length]
+        offset += _align(length)
+    return attrs
+
+def _index(ifname):
+    try:
+        return socket.if_nametoindex(ifname)
+    except OSError:
+        raise OSError(errno.ENODEV, f'interface "{ifname}" not found')
+
+def _link_request(kind, ifname, attrs=b'', flags=0, change=0, index=None, msg_flags=0):
+    index = _index(ifname) if index is None else index
+    payload = _ifinfomsg.pack(socket.AF_UNSPEC, 0, index, flags, change) + attrs
+    try:
+        return _request(kind, payload, msg_flags)
+    except OSError as e:
+        raise OSError(e.errno, f'netlink request for "{ifname}" failed: {e.strerror}')
+
+
+def get_link_flags(ifname):
+    """ Returns the IFF_* flags of an interface """
+    reply = _link_request(RTM_GETLINK, ifname)
+    return _ifinfomsg.unpack_from(reply)[3]
+
+def _link_stats(body):
+    attrs = _parse_attrs(body[_ifinfomsg.size:])
+    ifname = attrs[IFLA_IFNAME].rstrip(b'\0').decode()
+    data = attrs.get(IFLA_STATS64, b'')
+    # older kernels have fewer counters, newer ones more
+    count = min(len(_link_stats64), len(data) // 8)
+    return ifname, dict(zip(_link_stats64, struct.unpack_from(f'={count}Q', data)))
+
+def get_link_stats(ifname):
+    """ Returns the counters of an interface as a dict """
+    return _link_stats(_link_request(RTM_GETLINK, ifname))[1]
+
+def get_all_link_stats():
+    """ Returns the counters of all interfaces as a dict of dicts, by interface name """
+    payload = _ifinfomsg.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+    return dict(_link_stats(body) for body in _dump(RTM_GETLINK, payload))
+
+def set_link_flag(ifname, flag, enable):
+    """ Set or clear one of the IFF_* flags of an interface """
+    _link_request(RTM_NEWLINK, ifname, flags=flag if enable else 0, change=flag)
+
+def set_link_address(ifname, mac):
+    address = bytes(int(b, 16) for b in mac.split(':'))
+    _link_request(RTM_NEWLINK, ifname, _attr(IFLA_ADDRESS, address))
+
+def set_link_master(ifname, master):
+    """ Enslave an interface to a bridge, bond, or VRF, or release it if master is empty """
+    index = _index(master) if master else 0
+    _link_request(RTM_NEWLINK, ifname, _attr(IFLA_MASTER, _u32(index)))
+
+def add_link(ifname, kind):
+    """ Create an interface which needs no options, like ip link add dev ifname type kind """
+    attrs = _attr(IFLA_IFNAME, ifname) + _nested(IFLA_LINKINFO, _attr(IFLA_INFO_KIND, kind))
+    _link_request(RTM_NEWLINK, ifname, attrs, index=0, msg_flags=NLM_F_CREATE | NLM_F_EXCL)
+
+def _qos_map(kind, mapping):
+    # "from:to from:to ..." as for ip(8)
+    maps = []
+    for entry in mapping.split():
+        source, dest = entry.split(':')
+        maps.append(_attr(IFLA_VLAN_QOS_MAPPING, _u32(int(source)) + _u32(int(dest))))
+    return _nested(kind, *maps)
+
+def add_vlan(parent, ifname, vlan_id, protocol='', ingress_qos='', egress_qos=''):
+    """ Create a VLAN interface, like ip link add link parent name ifname type vlan ... """
+    data = _attr(IFLA_VLAN_ID, _u16(int(vlan_id)))
+    if protocol:
+        data += _attr(IFLA_VLAN_PROTOCOL, struct.pack('!H', _vlan_protocols[protocol.lower()]))
+    if egress_qos:
+        data += _qos_map(IFLA_VLAN_EGRESS_QOS, egress_qos)
+    if ingress_qos:
+        data += _qos_map(IFLA_VLAN_INGRESS_QOS, ingress_qos)
+
+    attrs = _attr(IFLA_IFNAME, ifname) + _attr(IFLA_LINK, _u32(_index(parent)))
+    attrs += _nested(IFLA_LINKINFO, _attr(IFLA_INFO_KIND, 'vlan'), _nested(IFLA_INFO_DATA, data))
+    _link_request(RTM_NEWLINK, ifname, attrs, index=0, msg_flags=NLM_F_CREATE | NLM_F_EXCL)
+
+def del_link(ifname):
+    _link_request(RTM_DELLINK, ifname)
+
+def _addr_request(kind, ifname, addr, msg_flags=0):
+    interface = ip_interface(addr)
+    family = socket.AF_INET if interface.version == 4 else socket.AF_INET6
+    packed = interface.ip.packed
+    payload = _ifaddrmsg.pack(family, interface.network.prefixlen, 0, 0, _index(ifname))
+    payload += _attr(IFA_LOCAL, packed) + _attr(IFA_ADDRESS, packed)
+    try:
+        _request(kind, payload, msg_flags)
+    except OSError as e:
+        raise OSError(e.errno, f'netlink request for "{addr}" on "{ifname}" failed: {e.strerror}')
+
+def add_addr(ifname, addr):
+    _addr_request(RTM_NEWADDR, ifname, addr, NLM_F_CREATE | NLM_F_EXCL)
+
+def del_addr(ifname, addr):
+    _addr_request(RTM_DELADDR, ifname, addr)
+
+def get_addrs(ifname=None):
+    """
+    Returns the addresses of all interfaces as (ifname, address/prefix)
+    tuples, in the order the kernel reports them: per interface, the
+    primary address of each family comes first. With ifname, only the
+    addresses of that interface are returned.
+    """
+    names = dict(socket.if_nameindex())
+    result = []
+    for body in _dump(RTM_GETADDR, _ifaddrmsg.pack(socket.AF_UNSPEC, 0, 0, 0, 0)):
+        family, prefixlen, _, _, index = _ifaddrmsg.unpack_from(body)
+        if family not in [socket.AF_INET, socket.AF_INET6] or index not in names:
+            continue
+        if ifname and names[index] != ifname:
+            continue
+        attrs = _parse_attrs(body[_ifaddrmsg.size:])
+        # IFA_ADDRESS is the peer address of point-to-point interfaces
+        packed = attrs.get(IFA_LOCAL, attrs.get(IFA_ADDRESS))
+        if packed:
+            result.append((names[index], f'{socket.inet_ntop(family, packed)}/{prefixlen}'))
+    return result
@@ -0,0 +1,95 @@
+# Copyright 2020 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Interface counters and rates.
+
+Counters are read from the kernel with netlink, all interfaces with
+a single dump or one interface with a single request, instead of one
+file per counter in /sys/class/net/<interface>/statistics. They are
+named like these files, e.g. 'rx_bytes' or 'tx_carrier_errors'.
+
+Rates are computed from two samples taken some time apart::
+
+    first = sample()
+    time.sleep(1)
+    for ifname, rate in rates(first, sample()).items():
+        print(ifname, rate['rx_bps'], rate['tx_bps'])
+"""
+
+import time
+
+from vyos.ifconfig import netlink
+
+
+def get_interface_stats(ifname):
+    """
+    Returns the counters of one interface as a dict
+
+    Example:
+    >>> from vyos.ifconfig.stats import get_interface_stats
+    >>> get_interface_stats('eth0')['rx_bytes']
+    123456
+    """
+    return netlink.get_link_stats(ifname)
+
+
+def get_all_stats():
+    """
+    Returns the counters of all interfaces as a dict of dicts, by interface name
+    """
+    return netlink.get_all_link_stats()
+
+
+class Sample(object):
+    """ Counters of all interfaces, taken at a point in time """
+    def __init__(self, stats=None, timestamp=None):
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self.stats = get_all_stats() if stats is None else stats
+
+
+def sample():
+    return Sample()
+
+
+def _delta(old, new):
+    # counters start over when an interface is re-created
+    return new - old if new >= old else new
+
+
+def rates(first, second):
+    """
+    Compute per-second rates between two samples
+
+    Returns:
+        dict: of dicts with 'rx_bps', 'tx_bps', 'rx_pps' and 'tx_pps'
+        floats, by interface name, for interfaces present in both samples
+    """
+    elapsed = second.timestamp - first.timestamp
+    if elapsed <= 0:
+        raise ValueError('samples must be taken at different times')
+
+    result = {}
+    for ifname, new in second.stats.items():
+        old = first.stats.get(ifname)
+        if old is None:
+            continue
+        result[ifname] = {
+            'rx_bps': _delta(old['rx_bytes'], new['rx_bytes']) * 8 / elapsed,
+            'tx_bps': _delta(old['tx_bytes'], new['tx_bytes']) * 8 / elapsed,
+            'rx_pps': _delta(old['rx_packets'], new['rx_packets']) / elapsed,
+            'tx_pps': _delta(old['tx_packets'], new['tx_packets']) / elapsed,
+        }
+    return result
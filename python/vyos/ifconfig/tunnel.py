@@ -19,6 +19,7 @@
 
 from copy import deepcopy
 
+from vyos.ifconfig import netlink
 from vyos.ifconfig.interface import Interface
 from vyos.ifconfig.afi import IP4, IP6
 from vyos.validate import assert_list
@@ -54,11 +55,13 @@ class _Tunnel(Interface):
             'validate': lambda v: assert_list(v, ['enable', 'disable']),
             'convert': enable_to_on,
             'shellcmd': 'ip link set dev {ifname} multicast {value}',
+            'netlink': lambda c: netlink.set_link_flag(c['ifname'], netlink.IFF_MULTICAST, c['value'] == 'enable'),
         },
         'allmulticast': {
             'validate': lambda v: assert_list(v, ['enable', 'disable']),
             'convert': enable_to_on,
             'shellcmd': 'ip link set dev {ifname} allmulticast {value}',
+            'netlink': lambda c: netlink.set_link_flag(c['ifname'], netlink.IFF_ALLMULTI, c['value'] == 'enable'),
         },
     }}
 
@@ -17,6 +17,7 @@
 import os
 import re
 
+from vyos.ifconfig import netlink
 from vyos.ifconfig.interface import Interface
 
 
@@ -102,24 +103,29 @@ class VLAN:
         """
         vlan_ifname = self.config['ifname'] + '.' + str(vlan_id)
         if not os.path.exists(f'/sys/class/net/{vlan_ifname}'):
-            self._vlan_id = int(vlan_id)
+            # VLAN interfaces of the same parent may be added from several
+            # threads (see vyos.ifconfig_vlan), use no per-object state
+            vlan_id = int(vlan_id)
 
+            if self.netlink:
+                netlink.add_vlan(self.config['ifname'], vlan_ifname, vlan_id,
+                                 ethertype, ingress_qos, egress_qos)
+                return self.__class__(vlan_ifname)
+
+            cmd = ['ip', 'link', 'add', 'link', self.config['ifname'],
+                   'name', vlan_ifname, 'type', 'vlan']
             if ethertype:
-                self._ethertype = ethertype
-                ethertype = 'proto {}'.format(ethertype)
+                cmd += ['proto', ethertype]
+            cmd += ['id', vlan_id]
 
-            # Optional ingress QOS mapping
-            opt_i = ''
-            if ingress_qos:
-                opt_i = 'ingress-qos-map ' + ingress_qos
             # Optional egress QOS mapping
-            opt_e = ''
             if egress_qos:
-                opt_e = 'egress-qos-map ' + egress_qos
+                cmd += ['egress-qos-map'] + egress_qos.split()
+            # Optional ingress QOS mapping
+            if ingress_qos:
+                cmd += ['ingress-qos-map'] + ingress_qos.split()
 
             # create interface in the system
-            cmd = 'ip link add link {ifname} name {ifname}.{vlan} type vlan {proto} id {vlan} {opt_e} {opt_i}' \
-                .format(ifname=self.config['ifname'], vlan=self._vlan_id, proto=ethertype, opt_e=opt_e, opt_i=opt_i)
             self._cmd(cmd)
 
         # return new object mapping to the newly created interface
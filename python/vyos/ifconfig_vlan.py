@@ -13,13 +13,26 @@
 # You should have received a copy of the GNU Lesser General Public
 # License along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+
 from netifaces import interfaces
 from vyos import ConfigError
+from vyos.util import Batch
+
+# VLAN interfaces are set up by a bounded pool of threads, as the work is
+# mostly waiting for ip(8) and for sysfs/procfs writes
+default_workers = min(8, os.cpu_count() or 1)
 
 def apply_vlan_config(vlan, config):
     """
     Generic function to apply a VLAN configuration from a dictionary
     to a VLAN interface
+
+    Returns a dict of the interface settings which were changed,
+    see Interface.apply()
     """
 
     if not vlan.definition['vlan']:
@@ -40,49 +53,147 @@ def apply_vlan_config(vlan, config):
     if config['dhcpv6_temporary']:
         vlan.dhcp.v6.options['dhcpv6_temporary'] = True
 
-    # update interface description used e.g. within SNMP
-    vlan.set_alias(config['description'])
-    # ignore link state changes
-    vlan.set_link_detect(config['disable_link_detect'])
-    # configure ARP filter configuration
-    vlan.set_arp_filter(config['ip_disable_arp_filter'])
-    # configure ARP accept
-    vlan.set_arp_accept(config['ip_enable_arp_accept'])
-    # configure ARP announce
-    vlan.set_arp_announce(config['ip_enable_arp_announce'])
-    # configure ARP ignore
-    vlan.set_arp_ignore(config['ip_enable_arp_ignore'])
-    # configure Proxy ARP
-    vlan.set_proxy_arp(config['ip_proxy_arp'])
-    # IPv6 address autoconfiguration
-    vlan.set_ipv6_autoconf(config['ipv6_autoconf'])
-    # IPv6 forwarding
-    vlan.set_ipv6_forwarding(config['ipv6_forwarding'])
-    # IPv6 Duplicate Address Detection (DAD) tries
-    vlan.set_ipv6_dad_messages(config['ipv6_dup_addr_detect'])
-    # Maximum Transmission Unit (MTU)
-    vlan.set_mtu(config['mtu'])
-
-    # assign/remove VRF
-    vlan.set_vrf(config['vrf'])
+    # Only settings which differ from the current kernel state are applied,
+    # the order matters as changing the MAC address brings the VLAN down
+    state = {
+        # update interface description used e.g. within SNMP
+        'alias': config['description'],
+        # ignore link state changes
+        'link_detect': config['disable_link_detect'],
+        # configure ARP filter configuration
+        'arp_filter': config['ip_disable_arp_filter'],
+        # configure ARP accept
+        'arp_accept': config['ip_enable_arp_accept'],
+        # configure ARP announce
+        'arp_announce': config['ip_enable_arp_announce'],
+        # configure ARP ignore
+        'arp_ignore': config['ip_enable_arp_ignore'],
+        # configure Proxy ARP
+        'proxy_arp': config['ip_proxy_arp'],
+        # IPv6 address autoconfiguration
+        'ipv6_autoconf': config['ipv6_autoconf'],
+        # IPv6 forwarding
+        'ipv6_forwarding': config['ipv6_forwarding'],
+        # IPv6 Duplicate Address Detection (DAD) tries
+        'ipv6_dad_transmits': config['ipv6_dup_addr_detect'],
+        # Maximum Transmission Unit (MTU)
+        'mtu': config['mtu'],
+        # assign/remove VRF
+        'vrf': config['vrf'],
+    }
 
     # Change VLAN interface MAC address
     if config['mac']:
-        vlan.set_mac(config['mac'])
+        state['mac'] = config['mac']
 
     # enable/disable VLAN interface
-    if config['disable']:
-        vlan.set_admin_state('down')
-    else:
-        vlan.set_admin_state('up')
+    state['admin_state'] = 'down' if config['disable'] else 'up'
+
+    changed = vlan.apply(state)
 
     # Configure interface address(es)
     # - not longer required addresses get removed first
     # - newly addresses will be added second
-    for addr in config['address_remove']:
-        vlan.del_addr(addr)
-    for addr in config['address']:
-        vlan.add_addr(addr)
+    # with a single ip(8) process for all of them
+    with Batch():
+        for addr in config['address_remove']:
+            vlan.del_addr(addr)
+        for addr in config['address']:
+            vlan.add_addr(addr)
+
+    return changed
+
+def _add_vlan(parent, vif, ethertype='', qos=False):
+    if not qos:
+        vlan = parent.add_vlan(vif['id'], ethertype=ethertype)
+        return vlan, apply_vlan_config(vlan, vif)
+
+    # QoS priority mapping can only be set during interface creation
+    # so we delete the interface first if required.
+    if vif['egress_qos_changed'] or vif['ingress_qos_changed']:
+        try:
+            # on system bootup the above condition is true but the interface
+            # does not exists, which throws an exception, but that's legal
+            parent.del_vlan(vif['id'])
+        except:
+            pass
+
+    vlan = parent.add_vlan(vif['id'], ethertype=ethertype,
+                           ingress_qos=vif['ingress_qos'], egress_qos=vif['egress_qos'])
+    return vlan, apply_vlan_config(vlan, vif)
+
+def _add_service_vlan(parent, vif_s):
+    s_vlan, changed = _add_vlan(parent, vif_s, ethertype=vif_s['ethertype'])
+    # remove no longer required client VLAN interfaces (vif-c)
+    # on lower service VLAN interface
+    for vif_c in vif_s['vif_c_remove']:
+        s_vlan.del_vlan(vif_c)
+    return s_vlan, changed
+
+def apply_vlans(intf, config, qos=False, workers=default_workers):
+    """
+    Generic function to remove, create and configure all VLAN interfaces
+    (vif, vif-s and vif-c) of an interface from its config dictionary.
+
+    VLAN interfaces are independent of each other and are set up by a
+    pool of up to 'workers' threads, a service VLAN (vif-s) is always set up
+    before its client VLANs (vif-c). A failing VLAN interface does not stop
+    the others, all errors are raised together as a single ConfigError.
+
+    qos: recreate 802.1q VLAN interfaces whose ingress or egress QoS
+         mapping changed, and create them with the mapping
+
+    Returns a dict of VLAN interface names to the settings which were
+    changed, see apply_vlan_config()
+    """
+    ifname = intf.config['ifname']
+    errors = []
+    changes = {}
+
+    def result(name, future):
+        try:
+            return future.result()
+        except Exception as e:
+            errors.append(f'Could not configure VLAN interface {name}: {e}')
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # remove no longer required service VLAN and VLAN interfaces first,
+        # a VLAN ID could be reused by the other kind of VLAN interface
+        removals = {}
+        for vlan_id in config['vif_s_remove'] + config['vif_remove']:
+            removals[pool.submit(intf.del_vlan, vlan_id)] = f'{ifname}.{vlan_id}'
+        for future in as_completed(removals):
+            result(removals[future], future)
+
+        # create service VLAN interfaces (vif-s) and VLAN interfaces (vif)
+        parents = {}
+        for vif_s in config['vif_s']:
+            parents[pool.submit(_add_service_vlan, intf, vif_s)] = (vif_s['id'], vif_s['vif_c'])
+        for vif in config['vif']:
+            parents[pool.submit(_add_vlan, intf, vif, qos=qos)] = (vif['id'], [])
+
+        # create client VLAN interfaces (vif-c) once their service VLAN is up
+        children = {}
+        for future in as_completed(parents):
+            vlan_id, vif_c_list = parents[future]
+            name = f'{ifname}.{vlan_id}'
+            done = result(name, future)
+            if done is None:
+                # client VLANs can not be set up without their service VLAN
+                continue
+            vlan, changes[name] = done
+            for vif_c in vif_c_list:
+                children[pool.submit(_add_vlan, vlan, vif_c)] = f'{name}.{vif_c["id"]}'
+
+        for future in as_completed(children):
+            done = result(children[future], future)
+            if done is not None:
+                changes[children[future]] = done[1]
+
+    if errors:
+        raise ConfigError('\n'.join(sorted(errors)))
+    return changes
 
 def verify_vlan_config(config):
     """
@@ -15,7 +15,11 @@
 
 import sys
 import os
+import re
+import time
 import subprocess
+import importlib.util
+import importlib.machinery
 import vyos.version
 import vyos.defaults
 import vyos.systemversions as systemversions
@@ -24,6 +28,54 @@ import vyos.formatversions as formatversions
 class MigratorError(Exception):
     pass
 
+def load_migrate_function(migrate_script):
+    """
+    Import a migration script and return its migrate(config) function, or
+    None if the script has no such entry point and has to be run as a
+    separate program. Scripts are only imported if they define migrate(),
+    as older scripts do their work at import time.
+    """
+    with open(migrate_script, 'r') as f:
+        source = f.read()
+
+    if not re.search(r'^def migrate\(', source, re.MULTILINE):
+        return None
+
+    # scripts have no .py suffix, hence the explicit loader
+    component, name = migrate_script.split(os.sep)[-2:]
+    module_name = 'vyos_migration_{0}_{1}'.format(
+            re.sub(r'\W', '_', component), re.sub(r'\W', '_', name))
+    loader = importlib.machinery.SourceFileLoader(module_name, migrate_script)
+    spec = importlib.util.spec_from_file_location(module_name, migrate_script,
+                                                  loader=loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+
+    return getattr(module, 'migrate', None)
+
+def migrate_file(file_name, migrate):
+    """
+    Run the migrate(config) function of a migration script on a config
+    file, for scripts run as a program. The file is only written if the
+    script changed the config.
+    """
+    from vyos.configtree import ConfigTree
+
+    with open(file_name, 'r') as f:
+        config = ConfigTree(f.read())
+
+    before = config.to_string()
+    migrate(config)
+    if config.to_string() == before:
+        return
+
+    try:
+        with open(file_name, 'w') as f:
+            f.write(config.to_string())
+    except OSError as e:
+        print("Failed to save the modified config: {}".format(e))
+        sys.exit(1)
+
 class Migrator(object):
     def __init__(self, config_file, force=False, set_vintage='vyos'):
         self._config_file = config_file
@@ -32,6 +84,7 @@ class Migrator(object):
         self._config_file_vintage = None
         self._log_file = None
         self._changed = False
+        self._script_times = []
 
     def read_config_file_versions(self):
         """
@@ -91,13 +144,54 @@ class Migrator(object):
         os.umask(mask)
         return log
 
+    def read_config(self):
+        from vyos.configtree import ConfigTree
+
+        with open(self._config_file, 'r') as f:
+            return ConfigTree(f.read())
+
+    def write_config(self, config):
+        try:
+            with open(self._config_file, 'w') as f:
+                f.write(config.to_string())
+        except OSError as e:
+            print("Failed to save the migrated config: {0}".format(e))
+            sys.exit(1)
+
+    def run_migration_script(self, migrate_script, config):
+        """
+        Run a single migration script: in this process on the config tree if
+        it has a migrate() function, else as a program on the config file.
+        Returns the config tree to hand to the next script, or None if the
+        config file is up to date.
+        """
+        migrate = load_migrate_function(migrate_script)
+        if migrate:
+            if config is None:
+                config = self.read_config()
+            migrate(config)
+            return config
+
+        if config is not None:
+            self.write_config(config)
+        subprocess.check_call([migrate_script, self._config_file])
+        return None
+
     def run_migration_scripts(self, config_file_versions, system_versions):
         """
         Run migration scripts iteratively, until config file version equals
         system component version.
+
+        Scripts providing a migrate(config) function are run in this process
+        on a config tree that is parsed once and only written back before a
+        script without it is run as a separate program, and at the end.
         """
         log = self.open_log_file()
 
+        # config tree shared by the in-process scripts, None while the
+        # config file is up to date
+        config = None
+
         cfg_versions = config_file_versions
         sys_versions = system_versions
 
@@ -123,10 +217,12 @@ class Migrator(object):
                         '{}-to-{}'.format(cfg_ver, next_ver))
 
                 try:
-                    subprocess.check_call([migrate_script,
-                        self._config_file])
-                except FileNotFoundError:
-                    pass
+                    if os.path.exists(migrate_script):
+                        start = time.monotonic()
+                        config = self.run_migration_script(migrate_script,
+                                                           config)
+                        self._script_times.append((migrate_script,
+                            time.monotonic() - start, config is not None))
                 except Exception as err:
                     print("\nMigration script error: {0}: {1}."
                           "".format(migrate_script, err))
@@ -142,7 +238,23 @@ class Migrator(object):
 
             rev_versions[key] = cfg_ver
 
+        write_time = None
+        if config is not None:
+            start = time.monotonic()
+            self.write_config(config)
+            write_time = time.monotonic() - start
+
         if log:
+            try:
+                log.write("\nTime per migration script:\n")
+                for script, seconds, in_process in self._script_times:
+                    log.write('{0:8.3f}s  {1:10}  {2}\n'.format(seconds,
+                        'in-process' if in_process else 'subprocess', script))
+                if write_time is not None:
+                    log.write('{0:8.3f}s  writing the migrated config\n'
+                              ''.format(write_time))
+            except Exception as e:
+                print("Error writing log: {0}".format(e))
             log.close()
 
         return rev_versions
@@ -200,6 +312,12 @@ class Migrator(object):
     def config_changed(self):
         return self._changed
 
+    def script_times(self):
+        """
+        Return (script, seconds, in_process) for each migration script run.
+        """
+        return self._script_times
+
 class VirtualMigrator(Migrator):
     def run(self):
         cfg_file = self._config_file
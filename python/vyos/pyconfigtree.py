@@ -0,0 +1,383 @@
+# pyconfigtree -- a pure Python implementation of the vyos.configtree API
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This library is free software; you can redistribute it and/or modify it under the terms of
+# the GNU Lesser General Public License as published by the Free Software Foundation;
+# either version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along with this library;
+# if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA
+
+"""
+A pure Python config tree with the same API as ``vyos.configtree.ConfigTree``.
+
+``vyos.configtree.ConfigTree`` uses this implementation when the
+``VYOS_CONFIGTREE`` environment variable is set to ``python``, and falls
+back to it with a warning when libvyosconfig is not installed. It needs no FFI calls and no JSON round trips:
+nodes are ``__slots__`` objects in a tree of dicts, and a path index maps
+every path to its node, so lookups are a single dict access.
+"""
+
+import re
+import copy
+import json
+
+from vyos.configtree import ConfigTree
+from vyos.configtree import ConfigTreeError
+from vyos.configtree import check_path
+from vyos.configtree import extract_version
+
+
+class ConfigNode(object):
+    __slots__ = ('name', 'values', 'children', 'tag', 'comment')
+
+    def __init__(self, name):
+        self.name = name
+        self.values = []
+        self.children = {}
+        self.tag = False
+        self.comment = None
+
+    def __deepcopy__(self, memo):
+        node = ConfigNode(self.name)
+        node.values = list(self.values)
+        node.children = {k: copy.deepcopy(v, memo) for k, v in self.children.items()}
+        node.tag = self.tag
+        node.comment = self.comment
+        return node
+
+
+_token_re = re.compile(r'''
+      (?P<newline>\n)
+    | (?P<space>[ \t\r]+)
+    | (?P<comment>/\*.*?\*/)
+    | (?P<line_comment>//[^\n]*)
+    | (?P<lbrace>\{)
+    | (?P<rbrace>\})
+    | (?P<quoted>"(?:[^"\\]|\\.)*")
+    | (?P<word>[^\s{}"]+)
+''', re.VERBOSE | re.DOTALL)
+
+_bare_word_re = re.compile(r'^[^\s{}"\\/*]+$')
+
+
+def _unquote(string):
+    # Only the escapes produced by the renderer are special,
+    # other backslashes are preserved as is
+    return re.sub(r'\\(["\\])', r'\1', string[1:-1])
+
+def _quote(string):
+    return '"{0}"'.format(string.replace('\\', '\\\\').replace('"', '\\"'))
+
+def _tokenize(config_string):
+    pos = 0
+    line = 1
+    while pos < len(config_string):
+        match = _token_re.match(config_string, pos)
+        if not match:
+            raise ValueError("Failed to parse config: syntax error on line {0}".format(line))
+        kind = match.lastgroup
+        text = match.group(kind)
+        pos = match.end()
+        if kind == 'newline':
+            line += 1
+            yield ('newline', None, line)
+        elif kind in ['space', 'line_comment']:
+            continue
+        elif kind == 'comment':
+            line += text.count('\n')
+            yield ('comment', text[2:-2].strip(), line)
+        elif kind == 'quoted':
+            line += text.count('\n')
+            yield ('word', _unquote(text), line)
+        else:
+            yield (kind, text, line)
+    yield ('eof', None, line)
+
+
+class _Parser(object):
+    def __init__(self, config_string):
+        self.tokens = list(_tokenize(config_string))
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def error(self, token, message):
+        raise ValueError("Failed to parse config: {0} on line {1}".format(message, token[2]))
+
+    def skip_newlines(self):
+        while self.peek()[0] == 'newline':
+            self.pos += 1
+
+    def parse_block(self, parent, toplevel=False):
+        comment = None
+        while True:
+            self.skip_newlines()
+            kind, text, _ = token = self.next()
+            if kind == 'eof':
+                if not toplevel:
+                    self.error(token, "unexpected end of file")
+                return
+            elif kind == 'rbrace':
+                if toplevel:
+                    self.error(token, "unbalanced '}'")
+                return
+            elif kind == 'comment':
+                comment = text
+            elif kind == 'word':
+                self.parse_statement(parent, text, comment)
+                comment = None
+            else:
+                self.error(token, "unexpected '{0}'".format(text))
+
+    def parse_statement(self, parent, name, comment):
+        node = _get_child(parent, name)
+        if comment is not None:
+            node.comment = comment
+
+        kind, text, _ = token = self.next()
+        if kind == 'lbrace':
+            self.parse_block(node)
+        elif kind == 'word':
+            # Either "tag-node value {" or "leaf-node value"
+            if self.peek()[0] == 'lbrace':
+                self.next()
+                node.tag = True
+                self.parse_block(_get_child(node, text))
+            else:
+                if text not in node.values:
+                    node.values.append(text)
+                self.end_of_statement()
+        elif kind in ['newline', 'eof', 'rbrace']:
+            # Valueless node
+            self.pos -= 1
+        else:
+            self.error(token, "unexpected '{0}'".format(text))
+
+    def end_of_statement(self):
+        kind, text, _ = token = self.peek()
+        if kind not in ['newline', 'eof', 'rbrace']:
+            self.error(token, "unexpected '{0}'".format(text))
+
+
+def _get_child(node, name):
+    if name not in node.children:
+        node.children[name] = ConfigNode(name)
+    return node.children[name]
+
+
+class PyConfigTree(ConfigTree):
+    def __init__(self, config_string, libpath=None):
+        # libpath is accepted for compatibility with the library-backed tree
+        config_section, version_section = extract_version(config_string)
+        self.__root = ConfigNode(None)
+        _Parser(config_section).parse_block(self.__root, toplevel=True)
+        self.__version = version_section
+        self.__index = {}
+        self.__reindex((), self.__root)
+
+    @classmethod
+    def from_json_ast(cls, json_string, version=''):
+        """ Create a tree from the output of to_json_ast() """
+        def load(data):
+            node = ConfigNode(data['name'])
+            node.values = list(data['values'])
+            node.tag = data['tag']
+            node.comment = data['comment']
+            for child in data['children']:
+                node.children[child['name']] = load(child)
+            return node
+
+        tree = cls.__new__(cls)
+        tree.__root = load(json.loads(json_string))
+        tree.__version = version
+        tree.__index = {}
+        tree.__reindex((), tree.__root)
+        return tree
+
+    def __del__(self):
+        pass
+
+    def __reindex(self, path, node):
+        self.__index[path] = node
+        for name, child in node.children.items():
+            self.__reindex(path + (name,), child)
+
+    def __unindex(self, path, node):
+        del self.__index[path]
+        for name, child in node.children.items():
+            self.__unindex(path + (name,), child)
+
+    def __get(self, path):
+        check_path(path)
+        return self.__index.get(tuple(path))
+
+    def __get_existing(self, path):
+        node = self.__get(path)
+        if node is None:
+            raise ConfigTreeError("Path [{}] doesn't exist".format(" ".join(path)))
+        return node
+
+    def __create(self, path):
+        node = self.__root
+        for i, name in enumerate(path):
+            if name not in node.children:
+                child = ConfigNode(name)
+                node.children[name] = child
+                self.__index[tuple(path[:i + 1])] = child
+            node = node.children[name]
+        return node
+
+    def __render(self, node, indent):
+        lines = []
+        prefix = '    ' * indent
+        for child in node.children.values():
+            if child.comment is not None:
+                lines.append('{0}/* {1} */'.format(prefix, child.comment))
+            if child.tag and child.children:
+                for tag_child in child.children.values():
+                    if tag_child.comment is not None:
+                        lines.append('{0}/* {1} */'.format(prefix, tag_child.comment))
+                    tag_value = tag_child.name
+                    if not _bare_word_re.match(tag_value):
+                        tag_value = _quote(tag_value)
+                    lines.append('{0}{1} {2} {{'.format(prefix, child.name, tag_value))
+                    lines.extend(self.__render(tag_child, indent + 1))
+                    lines.append('{0}}}'.format(prefix))
+            elif child.children:
+                lines.append('{0}{1} {{'.format(prefix, child.name))
+                lines.extend(self.__render(child, indent + 1))
+                lines.append('{0}}}'.format(prefix))
+            elif child.values:
+                for value in child.values:
+                    lines.append('{0}{1} {2}'.format(prefix, child.name, _quote(value)))
+            else:
+                lines.append('{0}{1}'.format(prefix, child.name))
+        return lines
+
+    def __commands(self, node, path):
+        commands = []
+        for name, child in node.children.items():
+            child_path = path + [name]
+            if child.children:
+                commands.extend(self.__commands(child, child_path))
+            elif child.values:
+                for value in child.values:
+                    commands.append("set {0} '{1}'".format(" ".join(child_path), value))
+            else:
+                commands.append("set {0}".format(" ".join(child_path)))
+        return commands
+
+    def __to_dict(self, node):
+        if node.children:
+            return {name: self.__to_dict(child) for name, child in node.children.items()}
+        if len(node.values) == 1:
+            return node.values[0]
+        if node.values:
+            return list(node.values)
+        return {}
+
+    def __to_ast(self, node):
+        return {'name': node.name,
+                'values': node.values,
+                'tag': node.tag,
+                'comment': node.comment,
+                'children': [self.__to_ast(c) for c in node.children.values()]}
+
+    def to_string(self):
+        config_string = "\n".join(self.__render(self.__root, 0))
+        config_string = "{0}\n{1}".format(config_string, self.__version)
+        return config_string
+
+    def to_commands(self):
+        return "\n".join(self.__commands(self.__root, []))
+
+    def to_json(self):
+        return json.dumps(self.__to_dict(self.__root))
+
+    def to_json_ast(self):
+        return json.dumps(self.__to_ast(self.__root))
+
+    def set(self, path, value=None, replace=True):
+        check_path(path)
+        node = self.__create([str(p) for p in path])
+        if value is None:
+            return
+        if replace:
+            node.values = [str(value)]
+        elif str(value) not in node.values:
+            node.values.append(str(value))
+
+    def delete(self, path):
+        node = self.__get(path)
+        if node is None or not path:
+            return
+        parent = self.__index[tuple(path[:-1])]
+        del parent.children[path[-1]]
+        self.__unindex(tuple(path), node)
+
+    def delete_value(self, path, value):
+        node = self.__get(path)
+        if node is not None and value in node.values:
+            node.values.remove(value)
+
+    def rename(self, path, new_name):
+        node = self.__get_existing(path)
+        new_path = path[:-1] + [new_name]
+        if self.exists(new_path):
+            raise ConfigTreeError()
+
+        # Keep the position of the node among its siblings
+        parent = self.__index[tuple(path[:-1])]
+        parent.children = {(new_name if k == path[-1] else k): v for k, v in parent.children.items()}
+        self.__unindex(tuple(path), node)
+        node.name = new_name
+        self.__reindex(tuple(new_path), node)
+
+    def copy(self, old_path, new_path):
+        node = self.__get_existing(old_path)
+        check_path(new_path)
+        if self.exists(new_path):
+            raise ConfigTreeError()
+        parent = self.__get_existing(new_path[:-1])
+
+        new_node = copy.deepcopy(node)
+        new_node.name = new_path[-1]
+        parent.children[new_node.name] = new_node
+        self.__reindex(tuple(new_path), new_node)
+
+    def exists(self, path):
+        return self.__get(path) is not None
+
+    def list_nodes(self, path):
+        return list(self.__get_existing(path).children)
+
+    def return_value(self, path):
+        node = self.__get_existing(path)
+        if not node.values:
+            raise ConfigTreeError("Node [{}] has no values".format(" ".join(path)))
+        return node.values[0]
+
+    def return_values(self, path):
+        return list(self.__get_existing(path).values)
+
+    def get_subtree(self, path):
+        return self.__to_dict(self.__get_existing(path))
+
+    def is_tag(self, path):
+        node = self.__get(path)
+        return node is not None and node.tag
+
+    def set_tag(self, path):
+        self.__get_existing(path).tag = True
+        return True
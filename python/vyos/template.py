@@ -15,41 +15,112 @@
 
 import os
 
+from jinja2 import ChoiceLoader
 from jinja2 import Environment
 from jinja2 import FileSystemLoader
+from jinja2 import ModuleLoader
 
 from vyos.defaults import directories
+from vyos.trace import span
+from vyos.util import write_file
 
 
+# Options of the Jinja2 environments, by the trim_blocks argument of render().
+# The precompiled template bundle has one set of modules for each of them,
+# since the compiled code depends on the options
+_templates_options = {
+    False: {},
+    True: {'trim_blocks': True},
+}
+
 # reuse the same Environment to improve performance
-_templates_env = Environment(loader=FileSystemLoader(directories['templates']))
-_templates_mem = {}
+_templates_env = {}
+_templates_mem = {
+    False: {},
+    True: {},
+}
+
+def _bundle_dir(trim_blocks):
+    name = 'trim_blocks' if trim_blocks else 'default'
+    return os.path.join(directories['templates_compiled'], name)
+
+def _get_environment(trim_blocks):
+    if trim_blocks not in _templates_env:
+        # Templates compiled to Python modules at package build time don't
+        # need to be lexed and compiled again by every script. Templates
+        # missing from the bundle are still loaded from the template folder.
+        loader = FileSystemLoader(directories['templates'])
+        bundle = _bundle_dir(trim_blocks)
+        if os.path.isdir(bundle):
+            loader = ChoiceLoader([ModuleLoader(bundle), loader])
+        _templates_env[trim_blocks] = Environment(loader=loader, **_templates_options[trim_blocks])
+    return _templates_env[trim_blocks]
+
+def compile_templates(target):
+    """
+    compile all templates from the template folder to Python modules,
+    this is done once when the package is built
+    target: the folder to save the bundle to, it's used at run time
+    when it's the templates_compiled folder from vyos.defaults
+    """
+    for trim_blocks, options in _templates_options.items():
+        env = Environment(loader=FileSystemLoader(directories['templates']), **options)
+        name = os.path.basename(_bundle_dir(trim_blocks))
+        # Not every file in the template folder is a Jinja2 template,
+        # anything that fails to compile is loaded from the folder instead
+        env.compile_templates(os.path.join(target, name), zip=None, ignore_errors=True)
 
-def render(destination, template, content):
+def render(destination, template, content, trim_blocks=False, formatter=None):
     """
     render a template from the template directory, it will raise on any errors
     destination: the file where the rendered template must be saved
     template: the path to the template relative to the template folder
     content: the dictionary to use to render the template
+    trim_blocks: remove the first newline after a block (see the Jinja2 docs)
+    formatter: optional function applied to the rendered text before saving it
+
+    returns True if the file was written, False if it already had the
+    rendered content, so that callers can avoid restarting services
+    whose configuration is identical (see vyos.util.restart_if_changed)
 
     This classes cache the renderer, so rendering the same file multiple time
-    does not cause as too much overhead. If use everywhere, it could be changed
-    and load the template from python environement variables from an import 
-    python module generated when the debian package is build 
-    (recovering the load time and overhead caused by having the file out of the code)
+    does not cause as too much overhead. Templates are loaded from the
+    precompiled bundle generated when the debian package is built if it
+    exists (see compile_templates), recovering the load time and overhead
+    caused by having the file out of the code
     """
 
-    # Setup a renderer for the given template
-    # This is cached and re-used for performance
-    if template not in _templates_mem:
-        _templates_mem[template] = _templates_env.get_template(template)
-    template = _templates_mem[template]
+    with span(template, kind='render', detail=destination):
+        # Setup a renderer for the given template
+        # This is cached and re-used for performance
+        templates = _templates_mem[trim_blocks]
+        if template not in templates:
+            templates[template] = _get_environment(trim_blocks).get_template(template)
+        template = templates[template]
+
+        # We are performing the rendering before writing
+        # to not accidentally erase the file if the templating fails
+        content = template.render(content)
+        if formatter:
+            content = formatter(content)
+
+        # Leave the file alone if nothing has changed, its modification
+        # time is then also a hint for what the last commit changed
+        if is_file_content(destination, content):
+            return False
+
+        # Write client config file, atomically so that daemons never
+        # read a partial one (see vyos.util.write_file)
+        write_file(destination, content)
+        return True
 
-    # As we are opening the file with 'w', we are performing the rendering
-    # before calling open() to not accidentally erase the file if the 
-    # templating fails
-    content = template.render(content)
 
-    # Write client config file
-    with open(destination, 'w') as f:
-        f.write(content)
+def is_file_content(path, content):
+    """ Check if the file at path exists and contains exactly content """
+    try:
+        # Config files are small, comparing in memory
+        # is cheaper than hashing both sides
+        with open(path, 'r') as f:
+            return f.read() == content
+    except (OSError, UnicodeDecodeError):
+        return False
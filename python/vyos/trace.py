@@ -0,0 +1,215 @@
+# Copyright 2020 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Timing trace of commits.
+
+conf_mode scripts run their phases with ``run_phases()``, which wraps
+each of them in a ``span()``::
+
+    run_phases(get_config, verify, generate, apply)
+
+Scripts whose phases do not simply pass the configuration along use
+``span()`` themselves::
+
+    with span('verify'):
+        verify(c)
+
+Every span is appended to the commit trace (vyos.defaults.commit_trace) as
+a JSON line with the commit it belongs to, the script, its kind and name,
+its start as a UNIX timestamp and its duration in seconds. The first phase
+of a script also records a span for the whole script run, from the start
+of the interpreter to its exit. Templates rendered and commands run by a
+traced script are recorded as spans of kind 'render' and 'command'. Command
+spans only name the program, unless the 'command' debug flag is set (see
+vyos.util.debug), as arguments may be secrets. The trace is readable by
+root and the config group only.
+
+The trace can be written elsewhere by setting the VYOS_COMMIT_TRACE
+environment variable to a file name, or disabled by setting it to 'off'.
+It is summarized by the 'show system commit-trace' op mode command.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+
+from vyos.defaults import commit_trace
+
+# the trace is moved aside when it gets bigger
+max_size = 16 * 1024 * 1024
+
+_file = None
+_file_lock = threading.Lock()
+_script = None
+
+
+def trace_file():
+    """ Return the file spans are written to, or None if tracing is off """
+    path = os.environ.get('VYOS_COMMIT_TRACE', commit_trace)
+    return None if path == 'off' else path
+
+
+def active():
+    """ Whether this process records spans, that is it is a traced script """
+    return _script is not None
+
+
+def _open(path):
+    """ Open the trace for appending, or return False if it is not ours """
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_NOFOLLOW, 0o640)
+    st = os.fstat(fd)
+    if st.st_uid != os.geteuid():
+        os.close(fd)
+        return False
+    try:
+        from vyos.util import get_cfg_group_id
+        if st.st_gid != get_cfg_group_id():
+            os.fchown(fd, -1, get_cfg_group_id())
+    except (KeyError, OSError):
+        # no config group, root only
+        pass
+    if st.st_mode & 0o037:
+        os.fchmod(fd, 0o640)
+    return os.fdopen(fd, 'a')
+
+
+def _write(record):
+    global _file
+    with _file_lock:
+        if _file is None:
+            path = trace_file()
+            if not path:
+                _file = False
+                return
+            try:
+                if os.path.getsize(path) > max_size:
+                    os.rename(path, path + '.1')
+            except OSError:
+                pass
+            try:
+                _file = _open(path)
+            except OSError:
+                # tracing must never fail a commit
+                _file = False
+        if _file:
+            try:
+                _file.write(json.dumps(record) + '\n')
+                _file.flush()
+            except OSError:
+                pass
+
+
+def _process_start():
+    """ Start of this process as a UNIX timestamp, from /proc """
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            stat = f.read()
+        ticks = int(stat[stat.rindex(')') + 2:].split()[19])
+        with open('/proc/uptime', 'r') as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+def _end_script():
+    add_span(_script['name'], 'script', _script['start'],
+             time.time() - _script['start'], error=_script['error'])
+
+
+def _start_script():
+    global _script
+    from vyos.util import _commit_id
+
+    _script = {
+        'name': os.path.basename(sys.argv[0]),
+        'commit': _commit_id(),
+        'start': _process_start(),
+        'error': None,
+    }
+    atexit.register(_end_script)
+
+
+def add_span(name, kind, start, duration, detail=None, error=None):
+    """
+    Record a span which started at start (a UNIX timestamp) and took
+    duration seconds; detail is shown next to its name
+    """
+    if not trace_file():
+        return
+    if _script is None:
+        from vyos.util import _commit_id
+        commit, script = _commit_id(), os.path.basename(sys.argv[0])
+    else:
+        commit, script = _script['commit'], _script['name']
+
+    record = {
+        'commit': commit,
+        'pid': os.getpid(),
+        'script': script,
+        'kind': kind,
+        'name': name,
+        'start': round(start, 6),
+        'duration': round(duration, 6),
+    }
+    if detail:
+        record['detail'] = detail
+    if error:
+        record['error'] = error
+    _write(record)
+
+
+@contextmanager
+def span(name, kind='phase', detail=None):
+    """
+    Record the time spent in the with block as a span. A phase makes the
+    script a traced one, other spans are only recorded in traced scripts.
+    """
+    if not trace_file() or (kind != 'phase' and _script is None):
+        yield
+        return
+    if _script is None:
+        _start_script()
+
+    start = time.time()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        if not isinstance(e, SystemExit) or e.code:
+            _script['error'] = error
+        raise
+    finally:
+        add_span(name, kind, start, time.time() - start, detail, error)
+
+
+def run_phases(get_config, verify=None, generate=None, apply=None):
+    """
+    Run the phases of a conf_mode script, each in its span: the
+    configuration returned by get_config is passed to verify, generate
+    and apply. Phases the script does not have are left out.
+    """
+    with span('get_config'):
+        c = get_config()
+    for name, phase in [('verify', verify), ('generate', generate), ('apply', apply)]:
+        if phase:
+            with span(name):
+                phase(c)
@@ -16,6 +16,10 @@
 import os
 import re
 import sys
+import time
+import errno
+import shlex
+import threading
 from subprocess import Popen
 from subprocess import PIPE
 from subprocess import STDOUT
@@ -29,12 +33,18 @@ def debug(flag):
     with flag being the flag name, the current flags are:
      - developer: the code will drop into PBD on un-handled exception
      - ifconfig: prints command and sysfs access on stdout for interface
+     - command: logs every command run by popen() with its caller, run time
+       and exit code to /var/log/vyatta/vyos-commands.log (see vyos-command-profile)
+    a flag can also be set for a process and its children with the
+    environment variable VYOS_<FLAG>_DEBUG, e.g. VYOS_COMMAND_DEBUG=1
     The function returns an empty string if the flag was not set,
     """
 
     # this is to force all new flags to be registered here to be documented:
-    if flag not in ['developer', 'ifconfig']:
+    if flag not in ['developer', 'ifconfig', 'command']:
         return ''
+    if os.environ.get(f'VYOS_{flag.upper()}_DEBUG'):
+        return flag
     return flag if os.path.isfile(f'/tmp/vyos.{flag}.debug') else ''
 
 
@@ -47,10 +57,117 @@ def debug_msg(message, flag=''):
         print(f'DEBUG/{flag:<6} {message}')
 
 
+def _commit_id():
+    """
+    Identify the commit this process is part of, if any: all scripts of
+    a commit are run by the same my_commit process, so its PID and start
+    time (which makes it unique across PID reuse) identify the commit
+    """
+    # scripts run ahead of the boot commit (see vyos.confscheduler)
+    if os.environ.get('VYOS_COMMIT_ID'):
+        return os.environ['VYOS_COMMIT_ID']
+    pid = os.getpid()
+    while pid > 1:
+        try:
+            with open(f'/proc/{pid}/stat', 'r') as f:
+                stat = f.read()
+        except OSError:
+            return None
+        # the command name is in parentheses and may contain spaces
+        comm = stat[stat.index('(') + 1:stat.rindex(')')]
+        fields = stat[stat.rindex(')') + 2:].split()
+        if comm == 'my_commit':
+            return f'{pid}-{fields[19]}'
+        pid = int(fields[1])
+    return None
+
+
+# modules running commands on behalf of their caller
+_command_wrappers = [__name__, 'vyos.ifconfig.control']
+
+def _command_caller():
+    # the first frame outside of the command wrappers
+    frame = sys._getframe()
+    while frame and frame.f_globals.get('__name__') in _command_wrappers:
+        frame = frame.f_back
+    if not frame:
+        return ''
+    return f'{frame.f_code.co_filename}:{frame.f_lineno}:{frame.f_code.co_name}'
+
+
+_command_commit = False
+
+def _log_command(command, start, wall, code, size):
+    """
+    Append a record of a command to the command log as a JSON line,
+    failing to write it must not fail the command
+    """
+    import json
+    from vyos.defaults import command_log
+
+    global _command_commit
+    if _command_commit is False:
+        _command_commit = _commit_id()
+
+    record = {
+        'time': start,
+        'command': command,
+        'caller': _command_caller(),
+        'script': sys.argv[0],
+        'pid': os.getpid(),
+        'commit': _command_commit,
+        'wall': round(wall, 6),
+        'exit': code,
+        'output': size,
+    }
+    try:
+        # command lines may hold secrets: the log is only readable by its
+        # owner, and a log created by another user or a link is not used
+        fd = os.open(os.environ.get('VYOS_COMMAND_LOG', command_log),
+                     os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        with os.fdopen(fd, 'a') as f:
+            st = os.fstat(fd)
+            if st.st_uid != os.geteuid():
+                return
+            if st.st_mode & 0o077:
+                os.fchmod(fd, 0o600)
+            f.write(json.dumps(record) + '\n')
+    except OSError:
+        pass
+
+
 # There is many (too many) ways to run command with python
 # os.system, subprocess.Popen, subproces.{run,call,check_output}
 # which all have slighty different behaviour
 
+# characters meaning something to /bin/sh: pipes, redirections, expansions,
+# globbing, ... a command using none of them does not need a shell to run
+_shell_chars = re.compile(r'[|&;<>()$`\\*?\[\]{}~!#\n]')
+
+
+def _split_command(command):
+    """
+    Return the command as a list of arguments if it can be run without
+    going through /bin/sh, None otherwise
+    """
+    if _shell_chars.search(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        # unbalanced quotes, let the shell report it
+        return None
+    # variable assignments (VAR=value command) are done by the shell
+    if not argv or '=' in argv[0]:
+        return None
+    return argv
+
+
+def _command_text(command):
+    if isinstance(command, (list, tuple)):
+        return ' '.join(shlex.quote(str(_)) for _ in command)
+    return command
+
 
 def popen(command, flag='', shell=None, input=None, timeout=None, env=None,
           stdout=PIPE, stderr=None, decode=None):
@@ -61,8 +178,12 @@ def popen(command, flag='', shell=None, input=None, timeout=None, env=None,
     err: the error code returned by the program
 
     it can be affected by the following flags:
+    command: the command to run, either as a string or a list of arguments.
+             A list is run directly without shell, so arguments do not need
+             quoting. A string is split into its arguments and run directly
+             too, unless it uses a shell feature: a pipe (|), a redirection
+             (>, >>), a variable, a glob, ...
     shell:   do not try to auto-detect if a shell is required
-             for example if a pipe (|) or redirection (>, >>) is used
     input:   data to sent to the child process via STDIN
              the data should be bytes but string will be converted
     timeout: time after which the command will be considered to have failed
@@ -80,31 +201,70 @@ def popen(command, flag='', shell=None, input=None, timeout=None, env=None,
     usage:
     to get both stdout, and stderr: popen('command', stdout=PIPE, stderr=STDOUT)
     to discard stdout and get stderr: popen('command', stdout=DEVNUL, stderr=PIPE)
+
+    if the 'command' debug flag is set, every command is logged (see debug())
     """
-    debug_msg(f"cmd '{command}'", flag)
-    use_shell = shell
+    # the commands of a batch are run first, to keep them in order
+    batch = current_batch()
+    if batch:
+        batch.flush()
+    debug_msg(f"cmd '{_command_text(command)}'", flag)
+    from vyos import trace as commit_trace
+
+    trace = debug('command')
+    # commands of conf_mode scripts are part of the commit trace
+    traced = commit_trace.active()
+    if trace or traced:
+        start = time.time()
+        started = time.perf_counter()
+    argv = None
+    if isinstance(command, (list, tuple)):
+        if shell:
+            command = _command_text(command)
+        else:
+            argv = [str(_) for _ in command]
+    elif not shell:
+        # the environment of the shell provides a default PATH
+        if shell is False or not env:
+            argv = _split_command(command)
+        if shell is False and argv is None:
+            argv = [command]
     stdin = None
-    if shell is None:
-        use_shell = False
-        if ' ' in command:
-            use_shell = True
-        if env:
-            use_shell = True
     if input:
         stdin = PIPE
         input = input.encode() if type(input) is str else input
-    p = Popen(
-        command,
-        stdin=stdin, stdout=stdout, stderr=stderr,
-        env=env, shell=use_shell,
-    )
-    tmp = p.communicate(input, timeout)
+    try:
+        p = Popen(
+            command if argv is None else argv,
+            stdin=stdin, stdout=stdout, stderr=stderr,
+            env=env, shell=argv is None,
+        )
+        tmp = p.communicate(input, timeout)
+        code = p.returncode
+    except (FileNotFoundError, PermissionError) as e:
+        # fail the way the shell does for a missing or non executable program
+        code = 127 if e.errno == errno.ENOENT else 126
+        message = f'{argv[0]}: {e.strerror}\n'.encode()
+        if stderr is None:
+            sys.stderr.write(message.decode())
+        tmp = (message if stderr == STDOUT else b'', message)
     out1 = b''
     out2 = b''
     if stdout == PIPE:
         out1 = tmp[0]
     if stderr == PIPE:
         out2 += tmp[1]
+    if trace:
+        _log_command(command, start, time.perf_counter() - started,
+                     code, len(out1) + len(out2))
+    if traced:
+        text = _command_text(command)
+        # arguments may be secrets (passwords, keys), the full command line
+        # is only recorded along with the 'command' debug flag
+        commit_trace.add_span(os.path.basename(text.split(' ', 1)[0]), 'command',
+                              start, time.perf_counter() - started,
+                              detail=text if trace else None,
+                              error=f'exit {code}' if code else None)
     decoded1 = out1.decode(decode) if decode else out1.decode()
     decoded2 = out2.decode(decode) if decode else out2.decode()
     decoded1 = decoded1.replace('\r\n', '\n').strip()
@@ -113,7 +273,7 @@ def popen(command, flag='', shell=None, input=None, timeout=None, env=None,
     decoded = decoded1 + nl + decoded2
     if decoded:
         debug_msg(f"returned:\n{decoded}", flag)
-    return decoded, p.returncode
+    return decoded, code
 
 
 def run(command, flag='', shell=None, input=None, timeout=None, env=None,
@@ -151,7 +311,7 @@ def cmd(command, flag='', shell=None, input=None, timeout=None, env=None,
     )
     if code != 0:
         feedback = message + '\n' if message else ''
-        feedback += f'failed to run command: {command}\n'
+        feedback += f'failed to run command: {_command_text(command)}\n'
         feedback += f'returned: {decoded}\n'
         feedback += f'exit code: {code}'
         if raising is None:
@@ -179,6 +339,254 @@ def call(command, flag='', shell=None, input=None, timeout=None, env=None,
     return code
 
 
+_batches = threading.local()
+
+def current_batch():
+    """
+    Return the innermost Batch entered in this thread, or None
+    """
+    stack = getattr(_batches, 'stack', [])
+    return stack[-1] if stack else None
+
+
+class Batch(object):
+    """
+    Collect ip, iptables, ip6tables and sysctl -w commands and run them
+    through the batch mode of each tool, so a sequence of commands costs
+    one process instead of one per command:
+
+      ip [options] -batch -        for ip commands with the same options
+      iptables-restore --noflush   for iptables (ip6tables) commands
+      sysctl -w key=value ...      for sysctl -w commands
+
+    Commands are run in the order they were added: adding a command of
+    another kind first runs what is pending, and so does any command run
+    with popen() (cmd, run, call) in the same thread or any sysfs access
+    of vyos.ifconfig. A command which can not be batched is run right away
+    with cmd(). Pending commands are run when leaving the context or on
+    flush().
+
+    A failing command raises the same way cmd() does (OSError unless
+    'raising' is set), naming the command and where it was added from.
+    ip stops at the first failing command, iptables-restore does not
+    apply any rule of a table if one fails, all other sysctl keys are set.
+
+    with Batch(raising=ConfigError) as batch:
+        batch.add('ip link set dev eth0 up')
+        batch.add('ip -6 route add vrf red unreachable default')
+        batch.add('sysctl -wq net.ipv4.tcp_l3mdev_accept=1')
+
+    vyos.ifconfig interfaces add the ip commands of their settings to the
+    current batch
+    """
+    def __init__(self, flag='', raising=None, message=''):
+        self.flag = flag
+        self.raising = raising
+        self.message = message
+        self._key = None
+        self._pending = []
+
+    def __enter__(self):
+        # keep the order with the commands of an enclosing batch
+        outer = current_batch()
+        if outer:
+            outer.flush()
+        if not hasattr(_batches, 'stack'):
+            _batches.stack = []
+        _batches.stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _batches.stack.remove(self)
+        if exc_type is None:
+            self.flush()
+            return
+        # do not hide the original error
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _quote(arg, escape=True):
+        if arg and not re.search(r'[\s"\'\\]', arg):
+            return arg
+        # iptables-restore understands escapes within double quotes,
+        # ip -batch only quotes: an argument can not have both " and '
+        if not escape:
+            return f"'{arg}'" if '"' in arg else f'"{arg}"'
+        return '"' + arg.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+    @staticmethod
+    def _parse(argv):
+        """
+        Return the batch a command belongs to and its line in the batch
+        input, or (None, None) if the command can not be batched
+        """
+        tool = os.path.basename(argv[0])
+        args = argv[1:]
+        if tool == 'ip':
+            options = []
+            while args and args[0].startswith('-'):
+                if args[0] in ['-n', '-netns', '-b', '-batch']:
+                    return None, None
+                options.append(args.pop(0))
+            if any(('"' in _ and "'" in _) or '\n' in _ for _ in args):
+                return None, None
+            return ('ip', tuple(options)), args
+
+        if tool in ['iptables', 'ip6tables']:
+            table = 'filter'
+            for option in ['-t', '--table']:
+                if option in args:
+                    index = args.index(option)
+                    table = args[index + 1]
+                    args = args[:index] + args[index + 2:]
+            return (tool, ), (table, args)
+
+        if tool == 'sysctl':
+            options = [_ for _ in args if _.startswith('-')]
+            keys = [_ for _ in args if not _.startswith('-')]
+            if not any('w' in _ for _ in options) or not all('=' in _ for _ in keys):
+                return None, None
+            return ('sysctl', ), keys
+
+        return None, None
+
+    def add(self, command):
+        """
+        Add a command, given as a string or a list of arguments, to the
+        batch. Returns the output of the command if it was run immediately
+        """
+        argv = command
+        if not isinstance(command, (list, tuple)):
+            argv = _split_command(command)
+        else:
+            argv = [str(_) for _ in command]
+
+        key, line = self._parse(argv) if argv else (None, None)
+        if key is None:
+            self.flush()
+            return cmd(command, self.flag, raising=self.raising, message=self.message)
+
+        if key != self._key:
+            self.flush()
+            self._key = key
+        self._pending.append((line, _command_text(command), _command_caller()))
+        return ''
+
+    def flush(self):
+        """
+        Run the pending commands
+        """
+        pending, key = self._pending, self._key
+        self._pending, self._key = [], None
+        if not pending:
+            return
+
+        debug_msg(f"batch of {len(pending)} '{key[0]}' commands", self.flag)
+        if key[0] == 'ip':
+            self._flush_ip(key[1], pending)
+        elif key[0] == 'sysctl':
+            self._flush_sysctl(pending)
+        else:
+            self._flush_iptables(key[0], pending)
+
+    def _run(self, argv, input=None):
+        # stderr is kept apart to find which line failed
+        tmp = popen(argv, self.flag, input=input, stdout=DEVNULL, stderr=PIPE)
+        return tmp[1], tmp[0]
+
+    def _fail(self, code, entry, returned):
+        if isinstance(entry, list):
+            # the tool did not tell which one failed
+            command = 'one of\n  ' + '\n  '.join(_[1] for _ in entry)
+            caller = entry[0][2]
+        else:
+            _, command, caller = entry
+        feedback = self.message + '\n' if self.message else ''
+        feedback += f'failed to run command: {command}\n'
+        feedback += f'called from: {caller}\n'
+        feedback += f'returned: {returned}\n'
+        feedback += f'exit code: {code}'
+        if self.raising is None:
+            raise OSError(code, feedback)
+        raise self.raising(feedback)
+
+    def _flush_ip(self, options, pending):
+        lines = '\n'.join(' '.join(self._quote(_, escape=False) for _ in line)
+                          for line, _, _ in pending)
+        code, error = self._run(['ip'] + list(options) + ['-batch', '-'], lines + '\n')
+        if not code:
+            return
+        # ip reports the line it stopped at after the error of the command
+        found = re.search(r'^Command failed -:(\d+)$', error, re.M)
+        if not found:
+            self._fail(code, pending, error)
+        returned = error[:found.start()].strip()
+        self._fail(code, pending[int(found.group(1)) - 1], returned)
+
+    def _flush_iptables(self, tool, pending):
+        # one section per table, in the order the commands were added
+        lines = []
+        index = []
+        table = None
+        for number, (line, _, _) in enumerate(pending):
+            if line[0] != table:
+                if table:
+                    lines.append('COMMIT')
+                    index.append(None)
+                table = line[0]
+                lines.append(f'*{table}')
+                index.append(None)
+            lines.append(' '.join(self._quote(_) for _ in line[1]))
+            index.append(number)
+        lines.append('COMMIT')
+        index.append(None)
+
+        code, error = self._run([f'{tool}-restore', '--noflush'], '\n'.join(lines) + '\n')
+        if not code:
+            return
+        found = re.search(r'line (\d+)', error)
+        number = index[int(found.group(1)) - 1] if found else None
+        self._fail(code, pending if number is None else pending[number], error)
+
+    def _flush_sysctl(self, pending):
+        keys = [key for line, _, _ in pending for key in line]
+        code, error = self._run(['sysctl', '-q', '-w'] + keys)
+        if not code:
+            return
+        # sysctl goes on with the other keys and names the ones it failed
+        for entry in pending:
+            for key in entry[0]:
+                name = key.split('=', 1)[0]
+                failed = [_ for _ in error.splitlines()
+                          if name in _ or name.replace('.', '/') in _]
+                if failed:
+                    self._fail(code, entry, '\n'.join(failed))
+        self._fail(code, pending, error)
+
+
+def restart_if_changed(service, changed, action='restart'):
+    """
+    Restart a systemd service only if its configuration has changed,
+    or if it is not running.
+
+    Args:
+        service (str): systemd unit name
+        changed (bool): whether any of the service's config files changed,
+            e.g. the return value of vyos.template.render()
+        action (str): 'restart', or 'reload' for services that support it
+
+    Returns:
+        bool: True if the service was restarted or reloaded
+    """
+    if not changed and run(f'systemctl is-active --quiet {service}') == 0:
+        return False
+    call(f'systemctl {action} {service}')
+    return True
+
+
 def read_file(path):
     """ Read a file to string """
     with open(path, 'r') as f:
@@ -186,6 +594,152 @@ def read_file(path):
     return data
 
 
+# Files written with write_file() waiting for the fsync at exit
+_fsync_pending = []
+
+def _fsync(path, flags=os.O_RDONLY):
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _fsync_all():
+    """ Flush all files written by this process to disk, in one go """
+    directories = []
+    for path in _fsync_pending:
+        try:
+            _fsync(path)
+        except OSError:
+            pass
+        if os.path.dirname(path) not in directories:
+            directories.append(os.path.dirname(path))
+    # The renames are only durable once the directories are synced
+    for directory in directories:
+        try:
+            _fsync(directory, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            pass
+    _fsync_pending.clear()
+
+
+def _sticky_untrusted(directory, uid):
+    """
+    Whether a file or symlink owned by uid in directory may have been
+    planted by another user: the directory is sticky and world writable,
+    like /tmp, and neither we nor the owner of the directory own it
+    """
+    from stat import S_ISVTX, S_IWOTH
+    st = os.stat(directory)
+    if st.st_mode & (S_ISVTX | S_IWOTH) != (S_ISVTX | S_IWOTH):
+        return False
+    return uid not in [os.geteuid(), st.st_uid]
+
+def _resolve_symlinks(path):
+    """
+    Resolve the symlinks of path, refusing the ones other users could
+    have planted in sticky directories, as protected_symlinks does
+    """
+    for _ in range(40):
+        directory = os.path.realpath(os.path.dirname(os.path.abspath(path)))
+        path = os.path.join(directory, os.path.basename(path))
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            return path, None
+        if not os.path.islink(path):
+            return path, st
+        if _sticky_untrusted(directory, st.st_uid):
+            raise PermissionError(errno.EPERM, 'Refusing to follow a symlink of another user', path)
+        path = os.path.join(directory, os.readlink(path))
+    raise OSError(errno.ELOOP, os.strerror(errno.ELOOP), path)
+
+def _create_temp(directory, name, mode):
+    """ Create a new file next to name, mode is subject to the umask like open() """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW
+    for _ in range(100):
+        tmp_path = os.path.join(directory, f'.{name}.{os.urandom(4).hex()}')
+        try:
+            return os.open(tmp_path, flags, mode), tmp_path
+        except FileExistsError:
+            continue
+    raise FileExistsError(errno.EEXIST, 'No usable temporary file name', directory)
+
+def write_file(path, data, fsync=None):
+    """
+    Write a string to a file atomically: the data is written to a temporary
+    file in the same directory, which is then renamed over the destination.
+    Daemons reading the file, and a crash in the middle of a commit, never
+    see a partially written file. Ownership and permissions of an existing
+    file are preserved, symlinks are followed.
+
+    In sticky directories such as /tmp, symlinks of other users are not
+    followed, and a file another user created is replaced by a new one
+    instead of keeping its owner and permissions.
+
+    fsync can be one of:
+     - off: leave flushing to the kernel
+     - always: fsync every file before it replaces the old one
+     - batch: fsync all files written by the process once when it exits,
+       which avoids a stall per file on slow flash storage
+    It defaults to the value of the VYOS_CONFIG_FSYNC environment
+    variable, or off.
+    """
+    from stat import S_IMODE
+
+    if fsync is None:
+        fsync = os.environ.get('VYOS_CONFIG_FSYNC', 'off')
+
+    path, st = _resolve_symlinks(path)
+    directory, name = os.path.split(path)
+    untrusted = st is not None and _sticky_untrusted(directory, st.st_uid)
+    if untrusted:
+        st = None
+
+    try:
+        fd, tmp_path = _create_temp(directory, name, S_IMODE(st.st_mode) if st else 0o666)
+    except PermissionError:
+        tmp_path = None
+    else:
+        try:
+            if st:
+                os.fchmod(fd, S_IMODE(st.st_mode))
+                if (st.st_uid, st.st_gid) != (os.geteuid(), os.getegid()):
+                    os.fchown(fd, st.st_uid, st.st_gid)
+
+            with os.fdopen(fd, 'w') as f:
+                fd = None
+                f.write(data)
+                if fsync == 'always':
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException as e:
+            if fd is not None:
+                os.close(fd)
+            os.unlink(tmp_path)
+            # Not allowed to give the file its owner, or the file
+            # is a mount point: only an in-place write is possible
+            if not (isinstance(e, PermissionError) or getattr(e, 'errno', None) in [errno.EBUSY, errno.EXDEV]):
+                raise
+            tmp_path = None
+
+    if tmp_path is None:
+        if untrusted:
+            raise PermissionError(errno.EPERM, 'Refusing to write a file of another user', path)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_NOFOLLOW
+        with os.fdopen(os.open(path, flags, 0o666), 'w') as f:
+            f.write(data)
+
+    if fsync == 'always':
+        _fsync(directory, os.O_RDONLY | os.O_DIRECTORY)
+    elif fsync == 'batch':
+        if not _fsync_pending:
+            import atexit
+            atexit.register(_fsync_all)
+        _fsync_pending.append(path)
+
+
 def chown(path, user, group):
     """ change file/directory owner """
     from pwd import getpwnam
@@ -13,9 +13,9 @@
 # You should have received a copy of the GNU Lesser General Public
 # License along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
-import socket
-import netifaces
+import bisect
 import ipaddress
+import threading
 
 def is_ip(addr):
     """
@@ -65,75 +65,147 @@ def is_ipv6_link_local(addr):
 
     return False
 
-def _are_same_ip(one, two):
-    # compare the binary representation of the IP
-    f_one = socket.AF_INET if is_ipv4(one) else socket.AF_INET6
-    s_two = socket.AF_INET if is_ipv4(two) else socket.AF_INET6
-    return socket.inet_pton(f_one, one) == socket.inet_pton(f_one, two)
+class AddressSnapshot(object):
+    """
+    All IPv4 and IPv6 addresses assigned to the interfaces of the system,
+    read from the kernel at once and indexed, so that checks for an address
+    or a connected subnet need not walk all interfaces and their addresses.
+
+    Addresses are kept per address and per interface, and as integers in
+    sorted lists per IP version, one with all addresses and one with the
+    primary (first) address of every interface, for subnet lookups by
+    bisection.
+    """
+    def __init__(self, addresses=None):
+        """
+        addresses: list of (ifname, address/prefix) tuples in kernel order,
+        the addresses of the system are read if not given
+        """
+        if addresses is None:
+            # vyos.ifconfig itself depends on this module
+            from vyos.ifconfig import netlink
+            addresses = netlink.get_addrs()
+
+        self._lock = threading.Lock()
+        self._by_addr = {}
+        self._by_intf = {}
+        self._sorted = {4: [], 6: []}
+        self._primary = {4: [], 6: []}
+        for intf, addr in addresses:
+            self.add(intf, addr)
+
+    def _primary_addr(self, intf, version):
+        for interface in self._by_intf.get(intf, []):
+            if interface.version == version:
+                return interface
+        return None
+
+    def add(self, intf, addr):
+        """ Record an address which was assigned to an interface """
+        interface = ipaddress.ip_interface(addr.split('%')[0])
+        ip, version = interface.ip, interface.version
+        with self._lock:
+            if interface in self._by_intf.get(intf, []):
+                return
+            if self._primary_addr(intf, version) is None:
+                bisect.insort(self._primary[version], int(ip))
+            self._by_intf.setdefault(intf, []).append(interface)
+            self._by_addr.setdefault(ip, []).append((intf, interface.network.prefixlen))
+            bisect.insort(self._sorted[version], int(ip))
+
+    def remove(self, intf, addr):
+        """ Forget an address which was removed from an interface """
+        interface = ipaddress.ip_interface(addr.split('%')[0])
+        ip, version = interface.ip, interface.version
+        with self._lock:
+            if interface not in self._by_intf.get(intf, []):
+                return
+            primary = self._primary_addr(intf, version)
+            self._by_intf[intf].remove(interface)
+            self._by_addr[ip].remove((intf, interface.network.prefixlen))
+            if not self._by_addr[ip]:
+                del self._by_addr[ip]
+            _remove_sorted(self._sorted[version], int(ip))
+            if primary == interface:
+                _remove_sorted(self._primary[version], int(ip))
+                primary = self._primary_addr(intf, version)
+                if primary is not None:
+                    bisect.insort(self._primary[version], int(primary.ip))
+
+    def remove_interface(self, intf):
+        """ Forget all addresses of an interface which was removed """
+        for interface in list(self._by_intf.get(intf, [])):
+            self.remove(intf, str(interface))
+        self._by_intf.pop(intf, None)
+
+    def refresh_interface(self, intf, addresses):
+        """ Replace the addresses of an interface with the ones read from the kernel """
+        self.remove_interface(intf)
+        for addr in addresses:
+            self.add(intf, addr)
+
+    def get_interfaces(self, addr):
+        """
+        Returns the names of the interfaces the IPv4/IPv6 address is assigned
+        to. If addr has a prefix length, it must match the assigned one.
+        """
+        ip, _, prefixlen = addr.split('%')[0].partition('/')
+        try:
+            owners = self._by_addr.get(ipaddress.ip_address(ip), [])
+        except ValueError:
+            return []
+        return [intf for intf, length in owners if not prefixlen or str(length) == prefixlen]
+
+    def is_intf_addr_assigned(self, intf, addr):
+        return intf in self.get_interfaces(addr)
+
+    def is_addr_assigned(self, addr):
+        return bool(self.get_interfaces(addr))
+
+    def is_subnet_connected(self, subnet, primary=False):
+        network = ipaddress.ip_network(subnet)
+        addrs = (self._primary if primary else self._sorted)[network.version]
+        i = bisect.bisect_left(addrs, int(network.network_address))
+        return i < len(addrs) and addrs[i] <= int(network.broadcast_address)
+
+
+def _remove_sorted(values, value):
+    del values[bisect.bisect_left(values, value)]
+
+
+_address_snapshot = None
+# interfaces may be set up by several threads (see vyos.ifconfig_vlan),
+# they must all share the same snapshot
+_address_snapshot_lock = threading.Lock()
+
+def get_address_snapshot(refresh=False):
+    """
+    Returns the AddressSnapshot shared by the address checks of this process.
+    It is read on first use, and kept up to date by Interface.add_addr() and
+    Interface.del_addr(); the addresses of an interface are read again after
+    MTU, VRF and IPv6 changes, which may make the kernel drop some. Use
+    refresh=True to read it again after addresses
+    were changed by other means, e.g. by a DHCP client.
+    """
+    global _address_snapshot
+    with _address_snapshot_lock:
+        if _address_snapshot is None or refresh:
+            _address_snapshot = AddressSnapshot()
+        return _address_snapshot
 
 def is_intf_addr_assigned(intf, addr):
-    if '/' in addr:
-        ip,mask = addr.split('/')
-        return _is_intf_addr_assigned(intf, ip, mask)
-    return _is_intf_addr_assigned(intf, addr)
-
-def _is_intf_addr_assigned(intf, address, netmask=''):
     """
     Verify if the given IPv4/IPv6 address is assigned to specific interface.
     It can check both a single IP address (e.g. 192.0.2.1 or a assigned CIDR
     address 192.0.2.1/24.
     """
-
-    # check if the requested address type is configured at all
-    # {
-    # 17: [{'addr': '08:00:27:d9:5b:04', 'broadcast': 'ff:ff:ff:ff:ff:ff'}], 
-    # 2:  [{'addr': '10.0.2.15', 'netmask': '255.255.255.0', 'broadcast': '10.0.2.255'}], 
-    # 10: [{'addr': 'fe80::a00:27ff:fed9:5b04%eth0', 'netmask': 'ffff:ffff:ffff:ffff::'}]
-    # }
-    try:
-        ifaces = netifaces.ifaddresses(intf)
-    except ValueError as e:
-        print(e)
-        return False
-
-    # determine IP version (AF_INET or AF_INET6) depending on passed address
-    addr_type = netifaces.AF_INET if is_ipv4(address) else netifaces.AF_INET6
-
-    # Check every IP address on this interface for a match
-    for ip in ifaces.get(addr_type,[]):
-        # ip can have the interface name in the 'addr' field, we need to remove it
-        # {'addr': 'fe80::a00:27ff:fec5:f821%eth2', 'netmask': 'ffff:ffff:ffff:ffff::'}
-        ip_addr = ip['addr'].split('%')[0]
-
-        if not _are_same_ip(address, ip_addr):
-            continue
-
-        # we do not have a netmask to compare against, they are the same
-        if netmask == '':
-            return True
-
-        prefixlen = ''
-        if is_ipv4(ip_addr):
-            prefixlen = sum([bin(int(_)).count('1') for _ in ip['netmask'].split('.')])
-        else:
-            prefixlen = sum([bin(int(_,16)).count('1') for _ in ip['netmask'].split(':') if _])
-
-        if str(prefixlen) == netmask:
-            return True
-
-    return False
+    return get_address_snapshot().is_intf_addr_assigned(intf, addr)
 
 def is_addr_assigned(addr):
     """
     Verify if the given IPv4/IPv6 address is assigned to any interface
     """
-
-    for intf in netifaces.interfaces():
-        tmp = is_intf_addr_assigned(intf, addr)
-        if tmp == True:
-            return True
-
-    return False
+    return get_address_snapshot().is_addr_assigned(addr)
 
 def is_loopback_addr(addr):
     """
@@ -152,34 +224,7 @@ def is_subnet_connected(subnet, primary=False):
 
     Return True/False
     """
-
-    # determine IP version (AF_INET or AF_INET6) depending on passed address
-    addr_type = netifaces.AF_INET
-    if is_ipv6(subnet):
-        addr_type = netifaces.AF_INET6
-
-    for interface in netifaces.interfaces():
-        # check if the requested address type is configured at all
-        if addr_type not in netifaces.ifaddresses(interface).keys():
-            continue
-
-        # An interface can have multiple addresses, but some software components
-        # only support the primary address :(
-        if primary:
-            ip = netifaces.ifaddresses(interface)[addr_type][0]['addr']
-            if ipaddress.ip_address(ip) in ipaddress.ip_network(subnet):
-                return True
-        else:
-            # Check every assigned IP address if it is connected to the subnet
-            # in question
-            for ip in netifaces.ifaddresses(interface)[addr_type]:
-                # remove interface extension (e.g. %eth0) that gets thrown on the end of _some_ addrs
-                addr = ip['addr'].split('%')[0]
-                if ipaddress.ip_address(addr) in ipaddress.ip_network(subnet):
-                    return True
-
-    return False
-
+    return get_address_snapshot().is_subnet_connected(subnet, primary)
 
 def assert_boolean(b):
     if int(b) not in (0, 1):
@@ -23,7 +23,10 @@ import syslog as sl
 
 from vyos.config import Config
 from vyos.util import call
+from vyos.util import run
+from vyos.util import DEVNULL
 from vyos import ConfigError
+from vyos.trace import span
 
 arp_cmd = '/usr/sbin/arp'
 
@@ -82,20 +85,23 @@ def generate(c):
 def apply(c):
   for ip_addr in c['remove']:
     sl.syslog(sl.LOG_NOTICE, "arp -d " + ip_addr)
-    call(f'{arp_cmd} -d {ip_addr} >/dev/null 2>&1')
+    run([arp_cmd, '-d', ip_addr], stderr=DEVNULL)
 
   for ip_addr in c['update']:
     sl.syslog(sl.LOG_NOTICE, "arp -s " + ip_addr + " " + c['update'][ip_addr])
     updated = c['update'][ip_addr]
-    call(f'{arp_cmd} -s {ip_addr} {updated}')
+    call([arp_cmd, '-s', ip_addr, updated])
 
 
 if __name__ == '__main__':
   try:
-    c = get_config()
+    with span('get_config'):
+      c = get_config()
     ## syntax verification is done via cli
-    config = generate(c)
-    apply(config)
+    with span('generate'):
+      config = generate(c)
+    with span('apply'):
+      apply(config)
   except ConfigError as e:
     print(e)
     sys.exit(1)
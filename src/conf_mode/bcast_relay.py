@@ -25,6 +25,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 config_file = r'/etc/default/udp-broadcast-relay'
 
@@ -148,8 +150,7 @@ def generate(relay):
         file = config_file + str(r['id'])
         tmpl = env.get_template('udp-broadcast-relay.tmpl')
         config_text = tmpl.render(r)
-        with open(file, 'w') as f:
-            f.write(config_text)
+        write_file(file, config_text)
 
     return None
 
@@ -171,10 +172,7 @@ def apply(relay):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -17,16 +17,17 @@
 import os
 
 from ipaddress import ip_address, ip_network
-from jinja2 import FileSystemLoader, Environment
 from socket import inet_ntoa
 from struct import pack
 from sys import exit
 
 from vyos.config import Config
-from vyos.defaults import directories as vyos_data_dir
 from vyos.validate import is_subnet_connected
 from vyos import ConfigError
+from vyos.template import render
 from vyos.util import call
+from vyos.util import restart_if_changed
+from vyos.trace import run_phases
 
 
 config_file = r'/etc/dhcp/dhcpd.conf'
@@ -604,24 +605,14 @@ def generate(dhcp):
         print('Warning: DHCP server will be deactivated because it is disabled')
         return None
 
-    # Prepare Jinja2 template loader from files
-    tmpl_path = os.path.join(vyos_data_dir['data'], 'templates', 'dhcp-server')
-    fs_loader = FileSystemLoader(tmpl_path)
-    env = Environment(loader=fs_loader)
-
-    tmpl = env.get_template('dhcpd.conf.tmpl')
-    config_text = tmpl.render(dhcp)
     # Please see: https://phabricator.vyos.net/T1129 for quoting of the raw parameters
     # we can pass to ISC DHCPd
-    config_text = config_text.replace("&quot;",'"')
-
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    changed = render(config_file, 'dhcp-server/dhcpd.conf.tmpl', dhcp,
+                     formatter=lambda config_text: config_text.replace("&quot;",'"'))
+    changed |= render(daemon_config_file, 'dhcp-server/daemon.tmpl', dhcp)
 
-    tmpl = env.get_template('daemon.tmpl')
-    config_text = tmpl.render(dhcp)
-    with open(daemon_config_file, 'w') as f:
-        f.write(config_text)
+    # Restarting the server is disruptive, only do it when needed
+    dhcp['changed'] = changed
 
     return None
 
@@ -638,16 +629,13 @@ def apply(dhcp):
         if not os.path.exists(lease_file):
             os.mknod(lease_file)
 
-        call('sudo systemctl restart isc-dhcpv4-server.service')
+        restart_if_changed('isc-dhcpv4-server.service', dhcp['changed'])
 
     return None
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
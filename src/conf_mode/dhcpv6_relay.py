@@ -24,6 +24,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = r'/etc/default/isc-dhcpv6-relay'
@@ -93,8 +95,7 @@ def generate(relay):
 
     tmpl = env.get_template('config.tmpl')
     config_text = tmpl.render(relay)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     return None
 
@@ -110,10 +111,7 @@ def apply(relay):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -26,6 +26,8 @@ from vyos.defaults import directories as vyos_data_dir
 from vyos.validate import is_subnet_connected
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = r'/etc/dhcp/dhcpdv6.conf'
@@ -351,13 +353,11 @@ def generate(dhcpv6):
 
     tmpl = env.get_template('dhcpdv6.conf.tmpl')
     config_text = tmpl.render(dhcpv6)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     tmpl = env.get_template('daemon.tmpl')
     config_text = tmpl.render(dhcpv6)
-    with open(daemon_config_file, 'w') as f:
-        f.write(config_text)
+    write_file(daemon_config_file, config_text)
 
     return None
 
@@ -380,10 +380,7 @@ def apply(dhcpv6):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -27,6 +27,8 @@ from vyos.hostsd_client import Client as hostsd_client
 from vyos.util import wait_for_commit_lock
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--dhclient", action="store_true",
@@ -160,8 +162,7 @@ def generate(dns):
 
     tmpl = env.get_template('recursor.conf.tmpl')
     config_text = tmpl.render(dns)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
     return None
 
 def apply(dns):
@@ -182,10 +183,7 @@ if __name__ == '__main__':
         wait_for_commit_lock()
 
     try:
-        c = get_config(args)
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(lambda: get_config(args), verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -25,6 +25,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = r'/etc/ddclient/ddclient.conf'
@@ -241,8 +243,7 @@ def generate(dyndns):
 
     tmpl = env.get_template('ddclient.conf.tmpl')
     config_text = tmpl.render(dyndns)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     # Config file must be accessible only by its owner
     os.chmod(config_file, S_IRUSR | S_IWUSR)
@@ -267,10 +268,7 @@ def apply(dyndns):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -21,7 +21,9 @@ import copy
 
 from vyos.config import Config
 from vyos import ConfigError
-from vyos.util import call
+from vyos.util import cmd
+from vyos.util import Batch
+from vyos.trace import run_phases
 
 
 default_config_data = {
@@ -86,60 +88,45 @@ def verify(tcp):
 def apply(tcp):
     target = 'VYOS_FW_OPTIONS'
 
-    # always cleanup iptables
-    call('iptables --table mangle --delete FORWARD --jump {} >&/dev/null'.format(target))
-    call('iptables --table mangle --flush {} >&/dev/null'.format(target))
-    call('iptables --table mangle --delete-chain {} >&/dev/null'.format(target))
-
-    # always cleanup ip6tables
-    call('ip6tables --table mangle --delete FORWARD --jump {} >&/dev/null'.format(target))
-    call('ip6tables --table mangle --flush {} >&/dev/null'.format(target))
-    call('ip6tables --table mangle --delete-chain {} >&/dev/null'.format(target))
-
-    # Setup new iptables rules
-    if tcp['new_chain4']:
-        call('iptables --table mangle --new-chain {} >&/dev/null'.format(target))
-        call('iptables --table mangle --append FORWARD --jump {} >&/dev/null'.format(target))
-
-        for opts in tcp['intf_opts']:
-            intf = opts['intf']
-            mss = opts['mss4']
-
-            # Check if this rule iis disabled
-            if opts['disabled']:
-                continue
-
-            # adjust TCP MSS per interface
-            if mss:
-                call('iptables --table mangle --append {} --out-interface {} --protocol tcp '
-                          '--tcp-flags SYN,RST SYN --jump TCPMSS --set-mss {} >&/dev/null'.format(target, intf, mss))
-
-    # Setup new ip6tables rules
-    if tcp['new_chain6']:
-        call('ip6tables --table mangle --new-chain {} >&/dev/null'.format(target))
-        call('ip6tables --table mangle --append FORWARD --jump {} >&/dev/null'.format(target))
-
-        for opts in tcp['intf_opts']:
-            intf = opts['intf']
-            mss = opts['mss6']
-
-            # Check if this rule iis disabled
-            if opts['disabled']:
-                continue
-
-            # adjust TCP MSS per interface
-            if mss:
-                call('ip6tables --table mangle --append {} --out-interface {} --protocol tcp '
-                    '--tcp-flags SYN,RST SYN --jump TCPMSS --set-mss {} >&/dev/null'.format(target, intf, mss))
+    # All changes of an address family are done by one iptables-restore
+    # process, which fails on a missing rule or chain: only clean up what
+    # iptables-save reports
+    for tool, new_chain, mss_key in [('iptables', 'new_chain4', 'mss4'),
+                                     ('ip6tables', 'new_chain6', 'mss6')]:
+        rules = cmd(f'{tool}-save --table mangle').splitlines()
+
+        with Batch(raising=ConfigError, message='Error changing TCP MSS options') as batch:
+            # always cleanup
+            if f'-A FORWARD -j {target}' in rules:
+                batch.add(f'{tool} --table mangle --delete FORWARD --jump {target}')
+            if any(_.startswith(f':{target} ') for _ in rules):
+                batch.add(f'{tool} --table mangle --flush {target}')
+                batch.add(f'{tool} --table mangle --delete-chain {target}')
+
+            # Setup new rules
+            if tcp[new_chain]:
+                batch.add(f'{tool} --table mangle --new-chain {target}')
+                batch.add(f'{tool} --table mangle --append FORWARD --jump {target}')
+
+                for opts in tcp['intf_opts']:
+                    intf = opts['intf']
+                    mss = opts[mss_key]
+
+                    # Check if this rule iis disabled
+                    if opts['disabled']:
+                        continue
+
+                    # adjust TCP MSS per interface
+                    if mss:
+                        batch.add(f'{tool} --table mangle --append {target} --out-interface {intf} '
+                                  f'--protocol tcp --tcp-flags SYN,RST SYN --jump TCPMSS --set-mss {mss}')
 
     return None
 
 if __name__ == '__main__':
 
     try:
-        c = get_config()
-        verify(c)
-        apply(c)
+        run_phases(get_config, verify=verify, apply=apply)
     except ConfigError as e:
         print(e)
         sys.exit(1)
@@ -28,6 +28,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import cmd
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 # default values
@@ -343,8 +345,7 @@ def generate(config):
     # Generate daemon configs
     tmpl = env.get_template('uacctd.conf.tmpl')
     config_text = tmpl.render(templatecfg = config, snaplen = default_captured_packet_size)
-    with open(uacctd_conf_path, 'w') as file:
-        file.write(config_text)
+    write_file(uacctd_conf_path, config_text)
 
 
 def apply(config):
@@ -367,10 +368,7 @@ def apply(config):
 
 if __name__ == '__main__':
     try:
-        config = get_config()
-        verify(config)
-        generate(config)
-        apply(config)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -32,10 +32,12 @@ import vyos.util
 import vyos.hostsd_client
 
 from vyos.config import Config
+from vyos.configdiff import ConfigDiff
 from vyos import ConfigError
 from vyos.util import cmd
 from vyos.util import call
 from vyos.util import run
+from vyos.trace import run_phases
 
 
 default_config_data = {
@@ -43,7 +45,9 @@ default_config_data = {
     'domain_name': '',
     'domain_search': [],
     'nameserver': [],
-    'no_dhcp_ns': False
+    'no_dhcp_ns': False,
+    'restart_snmpd': True,
+    'restart_pdns': True
 }
 
 def get_config():
@@ -81,6 +85,13 @@ def get_config():
             mapping['aliases'] = conf.return_values('system static-host-mapping host-name {0} alias'.format(hn))
             hosts['static_host_mapping'].append(mapping)
 
+    # This script is called when any of the nodes it owns change,
+    # only restart services that actually use the changed ones
+    diff = ConfigDiff(conf)
+    name_changed = diff.is_node_changed('system host-name') or diff.is_node_changed('system domain-name')
+    hosts['restart_snmpd'] = name_changed
+    hosts['restart_pdns'] = name_changed or diff.is_node_changed('system static-host-mapping')
+
     return hosts
 
 
@@ -137,17 +148,19 @@ def apply(config):
     try:
         client = vyos.hostsd_client.Client()
 
-        # Check if disable-dhcp-nameservers is configured, and if yes - delete DNS servers added by DHCP
-        if config['no_dhcp_ns']:
-            client.delete_name_servers('dhcp-.+')
+        # all changes in one request, vyos-hostsd writes its files once
+        with client.transaction() as t:
+            # Check if disable-dhcp-nameservers is configured, and if yes - delete DNS servers added by DHCP
+            if config['no_dhcp_ns']:
+                t.delete_name_servers('dhcp-.+')
 
-        client.set_host_name(config['hostname'], config['domain_name'], config['domain_search'])
+            t.set_host_name(config['hostname'], config['domain_name'], config['domain_search'])
 
-        client.delete_name_servers(tag)
-        client.add_name_servers(tag, config['nameserver'])
+            t.delete_name_servers(tag)
+            t.add_name_servers(tag, config['nameserver'])
 
-        client.delete_hosts(tag)
-        client.add_hosts(tag, config['static_host_mapping'])
+            t.delete_hosts(tag)
+            t.add_hosts(tag, config['static_host_mapping'])
     except vyos.hostsd_client.VyOSHostsdError as e:
         raise ConfigError(str(e))
 
@@ -166,24 +179,19 @@ def apply(config):
         call("systemctl restart rsyslog.service")
 
     # If SNMP is running, restart it too
-    ret = run("pgrep snmpd")
-    if ret == 0:
+    if config['restart_snmpd'] and run("pgrep snmpd") == 0:
         call("systemctl restart snmpd.service")
 
     # restart pdns if it is used
-    ret = run('/usr/bin/rec_control ping')
-    if ret == 0:
-        call('/etc/init.d/pdns-recursor restart >/dev/null')
+    if config['restart_pdns'] and run('/usr/bin/rec_control ping') == 0:
+        run('/etc/init.d/pdns-recursor restart')
 
     return None
 
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         sys.exit(1)
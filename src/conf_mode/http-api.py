@@ -26,6 +26,8 @@ from vyos.config import Config
 from vyos import ConfigError
 from vyos.util import cmd
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 config_file = '/etc/vyos/http-api.conf'
 
@@ -85,8 +87,7 @@ def generate(http_api):
     if not os.path.exists('/etc/vyos'):
         os.mkdir('/etc/vyos')
 
-    with open(config_file, 'w') as f:
-        json.dump(http_api, f, indent=2)
+    write_file(config_file, json.dumps(http_api, indent=2))
 
     return None
 
@@ -101,10 +102,7 @@ def apply(http_api):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         sys.exit(1)
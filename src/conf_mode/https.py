@@ -27,6 +27,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = '/etc/nginx/sites-available/default'
@@ -143,8 +145,7 @@ def generate(https):
 
     tmpl = env.get_template('nginx.default.tmpl')
     config_text = tmpl.render(https)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     return None
 
@@ -156,10 +157,7 @@ def apply(https):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -25,6 +25,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = r'/etc/igmpproxy.conf'
@@ -123,8 +125,7 @@ def generate(igmp_proxy):
 
     tmpl = env.get_template('igmpproxy.conf.tmpl')
     config_text = tmpl.render(igmp_proxy)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     return None
 
@@ -141,10 +142,7 @@ def apply(igmp_proxy):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
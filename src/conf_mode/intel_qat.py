@@ -23,6 +23,7 @@ import re
 from vyos.config import Config
 from vyos import ConfigError
 from vyos.util import popen, run
+from vyos.trace import run_phases
 
 # Define for recovering
 gl_ipsec_conf = None
@@ -91,9 +92,7 @@ def apply(c):
 
 if __name__ == '__main__':
   try:
-    c = get_config()
-    verify(c)
-    apply(c)
+    run_phases(get_config, verify=verify, apply=apply)
   except ConfigError as e:
     print(e)
     vpn_control('restore')
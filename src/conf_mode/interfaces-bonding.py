@@ -21,12 +21,13 @@ from sys import exit
 from netifaces import interfaces
 
 from vyos.ifconfig import BondIf
-from vyos.ifconfig_vlan import apply_vlan_config, verify_vlan_config
+from vyos.ifconfig_vlan import apply_vlans, verify_vlan_config
 from vyos.configdict import list_diff, vlan_to_dict
 from vyos.config import Config
 from vyos.util import is_bridge_member
 from vyos.util import call
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 default_config_data = {
     'address': [],
@@ -111,8 +112,9 @@ def get_config():
         bond['deleted'] = True
         return bond
 
-    # set new configuration level
-    conf.set_level(cfg_base)
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view(cfg_base)
 
     # retrieve configured interface addresses
     if conf.exists('address'):
@@ -488,43 +490,14 @@ def apply(bond):
         # assign/remove VRF
         b.set_vrf(bond['vrf'])
 
-        # remove no longer required service VLAN interfaces (vif-s)
-        for vif_s in bond['vif_s_remove']:
-            b.del_vlan(vif_s)
-
-        # create service VLAN interfaces (vif-s)
-        for vif_s in bond['vif_s']:
-            s_vlan = b.add_vlan(vif_s['id'], ethertype=vif_s['ethertype'])
-            apply_vlan_config(s_vlan, vif_s)
-
-            # remove no longer required client VLAN interfaces (vif-c)
-            # on lower service VLAN interface
-            for vif_c in vif_s['vif_c_remove']:
-                s_vlan.del_vlan(vif_c)
-
-            # create client VLAN interfaces (vif-c)
-            # on lower service VLAN interface
-            for vif_c in vif_s['vif_c']:
-                c_vlan = s_vlan.add_vlan(vif_c['id'])
-                apply_vlan_config(c_vlan, vif_c)
-
-        # remove no longer required VLAN interfaces (vif)
-        for vif in bond['vif_remove']:
-            b.del_vlan(vif)
-
-        # create VLAN interfaces (vif)
-        for vif in bond['vif']:
-            vlan = b.add_vlan(vif['id'])
-            apply_vlan_config(vlan, vif)
+        # remove, create and configure VLAN interfaces (vif, vif-s and vif-c)
+        apply_vlans(b, bond)
 
     return None
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -25,6 +25,7 @@ from vyos.ifconfig.stp import STP
 from vyos.configdict import list_diff
 from vyos.config import Config
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 default_config_data = {
     'address': [],
@@ -76,8 +77,9 @@ def get_config():
         bridge['deleted'] = True
         return bridge
 
-    # set new configuration level
-    conf.set_level('interfaces bridge ' + bridge['intf'])
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view('interfaces bridge ' + bridge['intf'])
 
     # retrieve configured interface addresses
     if conf.exists('address'):
@@ -359,10 +361,7 @@ def apply(bridge):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -25,6 +25,7 @@ from vyos.configdict import list_diff
 from vyos.config import Config
 from vyos.util import is_bridge_member
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 default_config_data = {
     'address': [],
@@ -51,8 +52,9 @@ def get_config():
         dummy['deleted'] = True
         return dummy
 
-    # set new configuration level
-    conf.set_level('interfaces dummy ' + dummy['intf'])
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view('interfaces dummy ' + dummy['intf'])
 
     # retrieve configured interface addresses
     if conf.exists('address'):
@@ -129,10 +131,7 @@ def apply(dummy):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -21,10 +21,11 @@ from copy import deepcopy
 from netifaces import interfaces
 
 from vyos.ifconfig import EthernetIf
-from vyos.ifconfig_vlan import apply_vlan_config, verify_vlan_config
+from vyos.ifconfig_vlan import apply_vlans, verify_vlan_config
 from vyos.configdict import list_diff, vlan_to_dict
 from vyos.config import Config
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 default_config_data = {
     'address': [],
@@ -87,8 +88,9 @@ def get_config():
         # Thus we need to remove individual settings
         return eth
 
-    # set new configuration level
-    conf.set_level(cfg_base)
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view(cfg_base)
 
     # retrieve configured interface addresses
     if conf.exists('address'):
@@ -298,9 +300,6 @@ def apply(eth):
         # delete interface
         e.remove()
     else:
-        # update interface description used e.g. within SNMP
-        e.set_alias(eth['description'])
-
         if eth['dhcp_client_id']:
             e.dhcp.v4.options['client_id'] = eth['dhcp_client_id']
 
@@ -316,32 +315,37 @@ def apply(eth):
         if eth['dhcpv6_temporary']:
             e.dhcp.v6.options['dhcpv6_temporary'] = True
 
-        # ignore link state changes
-        e.set_link_detect(eth['disable_link_detect'])
+        # only settings which differ from the kernel state are written
+        e.apply({
+            # update interface description used e.g. within SNMP
+            'alias': eth['description'],
+            # ignore link state changes
+            'link_detect': eth['disable_link_detect'],
+            # configure ARP cache timeout in milliseconds
+            'arp_cache_tmo': eth['ip_arp_cache_tmo'],
+            # configure ARP filter configuration
+            'arp_filter': eth['ip_disable_arp_filter'],
+            # configure ARP accept
+            'arp_accept': eth['ip_enable_arp_accept'],
+            # configure ARP announce
+            'arp_announce': eth['ip_enable_arp_announce'],
+            # configure ARP ignore
+            'arp_ignore': eth['ip_enable_arp_ignore'],
+            # Enable proxy-arp on this interface
+            'proxy_arp': eth['ip_proxy_arp'],
+            # Enable private VLAN proxy ARP on this interface
+            'proxy_arp_pvlan': eth['ip_proxy_arp_pvlan'],
+            # IPv6 address autoconfiguration
+            'ipv6_autoconf': eth['ipv6_autoconf'],
+            # IPv6 forwarding
+            'ipv6_forwarding': eth['ipv6_forwarding'],
+            # IPv6 Duplicate Address Detection (DAD) tries
+            'ipv6_dad_transmits': eth['ipv6_dup_addr_detect'],
+        })
         # disable ethernet flow control (pause frames)
         e.set_flow_control(eth['flow_control'])
-        # configure ARP cache timeout in milliseconds
-        e.set_arp_cache_tmo(eth['ip_arp_cache_tmo'])
-        # configure ARP filter configuration
-        e.set_arp_filter(eth['ip_disable_arp_filter'])
-        # configure ARP accept
-        e.set_arp_accept(eth['ip_enable_arp_accept'])
-        # configure ARP announce
-        e.set_arp_announce(eth['ip_enable_arp_announce'])
-        # configure ARP ignore
-        e.set_arp_ignore(eth['ip_enable_arp_ignore'])
-        # Enable proxy-arp on this interface
-        e.set_proxy_arp(eth['ip_proxy_arp'])
-        # Enable private VLAN proxy ARP on this interface
-        e.set_proxy_arp_pvlan(eth['ip_proxy_arp_pvlan'])
-        # IPv6 address autoconfiguration
-        e.set_ipv6_autoconf(eth['ipv6_autoconf'])
         # IPv6 EUI-based address
         e.set_ipv6_eui64_address(eth['ipv6_eui64_prefix'])
-        # IPv6 forwarding
-        e.set_ipv6_forwarding(eth['ipv6_forwarding'])
-        # IPv6 Duplicate Address Detection (DAD) tries
-        e.set_ipv6_dad_messages(eth['ipv6_dup_addr_detect'])
 
         # Change interface MAC address - re-set to real hardware address (hw-id)
         # if custom mac is removed
@@ -351,7 +355,7 @@ def apply(eth):
             e.set_mac(eth['hw_id'])
 
         # Maximum Transmission Unit (MTU)
-        e.set_mtu(eth['mtu'])
+        e.apply({'mtu': eth['mtu']})
 
         # GRO (generic receive offload)
         e.set_gro(eth['offload_gro'])
@@ -372,10 +376,7 @@ def apply(eth):
         e.set_speed_duplex(eth['speed'], eth['duplex'])
 
         # Enable/Disable interface
-        if eth['disable']:
-            e.set_admin_state('down')
-        else:
-            e.set_admin_state('up')
+        e.apply({'admin_state': 'down' if eth['disable'] else 'up'})
 
         # Configure interface address(es)
         # - not longer required addresses get removed first
@@ -386,55 +387,16 @@ def apply(eth):
             e.add_addr(addr)
 
         # assign/remove VRF
-        e.set_vrf(eth['vrf'])
-
-        # remove no longer required service VLAN interfaces (vif-s)
-        for vif_s in eth['vif_s_remove']:
-            e.del_vlan(vif_s)
-
-        # create service VLAN interfaces (vif-s)
-        for vif_s in eth['vif_s']:
-            s_vlan = e.add_vlan(vif_s['id'], ethertype=vif_s['ethertype'])
-            apply_vlan_config(s_vlan, vif_s)
-
-            # remove no longer required client VLAN interfaces (vif-c)
-            # on lower service VLAN interface
-            for vif_c in vif_s['vif_c_remove']:
-                s_vlan.del_vlan(vif_c)
-
-            # create client VLAN interfaces (vif-c)
-            # on lower service VLAN interface
-            for vif_c in vif_s['vif_c']:
-                c_vlan = s_vlan.add_vlan(vif_c['id'])
-                apply_vlan_config(c_vlan, vif_c)
-
-        # remove no longer required VLAN interfaces (vif)
-        for vif in eth['vif_remove']:
-            e.del_vlan(vif)
-
-        # create VLAN interfaces (vif)
-        for vif in eth['vif']:
-            # QoS priority mapping can only be set during interface creation
-            # so we delete the interface first if required.
-            if vif['egress_qos_changed'] or vif['ingress_qos_changed']:
-                try:
-                    # on system bootup the above condition is true but the interface
-                    # does not exists, which throws an exception, but that's legal
-                    e.del_vlan(vif['id'])
-                except:
-                    pass
-
-            vlan = e.add_vlan(vif['id'], ingress_qos=vif['ingress_qos'], egress_qos=vif['egress_qos'])
-            apply_vlan_config(vlan, vif)
+        e.apply({'vrf': eth['vrf']})
+
+        # remove, create and configure VLAN interfaces (vif, vif-s and vif-c)
+        apply_vlans(e, eth, qos=True)
 
     return None
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
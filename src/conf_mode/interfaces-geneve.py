@@ -24,6 +24,7 @@ from vyos.config import Config
 from vyos.ifconfig import GeneveIf
 from vyos.util import is_bridge_member
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 default_config_data = {
     'address': [],
@@ -53,8 +54,9 @@ def get_config():
         geneve['deleted'] = True
         return geneve
 
-    # set new configuration level
-    conf.set_level('interfaces geneve ' + geneve['intf'])
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view('interfaces geneve ' + geneve['intf'])
 
     # retrieve configured interface addresses
     if conf.exists('address'):
@@ -162,10 +164,7 @@ def apply(geneve):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -24,6 +24,7 @@ from vyos.ifconfig import L2TPv3If, Interface
 from vyos import ConfigError
 from vyos.util import call
 from vyos.util import is_bridge_member
+from vyos.trace import run_phases
 from netifaces import interfaces
 
 default_config_data = {
@@ -80,8 +81,9 @@ def get_config():
 
         return l2tpv3
 
-    # set new configuration level
-    conf.set_level('interfaces l2tpv3 ' + l2tpv3['intf'])
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view('interfaces l2tpv3 ' + l2tpv3['intf'])
 
     # retrieve configured interface addresses
     if conf.exists('address'):
@@ -248,10 +250,7 @@ def apply(l2tpv3):
 if __name__ == '__main__':
     try:
         check_kmod()
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
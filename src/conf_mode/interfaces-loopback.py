@@ -23,6 +23,7 @@ from vyos.ifconfig import LoopbackIf
 from vyos.configdict import list_diff
 from vyos.config import Config
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 default_config_data = {
     'address': [],
@@ -46,8 +47,9 @@ def get_config():
     if not conf.exists('interfaces loopback ' + loopback['intf']):
         loopback['deleted'] = True
 
-    # set new configuration level
-    conf.set_level('interfaces loopback ' + loopback['intf'])
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view('interfaces loopback ' + loopback['intf'])
 
     # retrieve configured interface addresses
     if conf.exists('address'):
@@ -91,10 +93,7 @@ def apply(loopback):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -30,8 +30,10 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos.ifconfig import VTunIf
 from vyos.util import call, is_bridge_member, chown, chmod_x
+from vyos.util import write_file
 from vyos.validate import is_addr_assigned
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 user = 'openvpn'
 group = 'openvpn'
@@ -152,8 +154,9 @@ def get_config():
             if intf == openvpn['intf']:
                 openvpn['bridge_member'].append(intf)
 
-    # set configuration level
-    conf.set_level('interfaces openvpn ' + openvpn['intf'])
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view('interfaces openvpn ' + openvpn['intf'])
 
     # retrieve authentication options - username
     if conf.exists('authentication username'):
@@ -699,8 +702,7 @@ def generate(openvpn):
     # Generate User/Password authentication file
     if openvpn['auth']:
         auth_file = '/tmp/openvpn-{}-pw'.format(interface)
-        with open(auth_file, 'w') as f:
-            f.write('{}\n{}'.format(openvpn['auth_user'], openvpn['auth_pass']))
+        write_file(auth_file, '{}\n{}'.format(openvpn['auth_user'], openvpn['auth_pass']))
 
         fixup_permission(auth_file)
 
@@ -714,8 +716,7 @@ def generate(openvpn):
         client_file = directory + '/ccd/' + interface + '/' + client['name']
         tmpl = env.get_template('client.conf.tmpl')
         client_text = tmpl.render(client)
-        with open(client_file, 'w') as f:
-            f.write(client_text)
+        write_file(client_file, client_text)
         chown(client_file, user, group)
 
     tmpl = env.get_template('server.conf.tmpl')
@@ -723,8 +724,7 @@ def generate(openvpn):
     # we need to support quoting of raw parameters from OpenVPN CLI
     # see https://phabricator.vyos.net/T1632
     config_text = config_text.replace("&quot;",'"')
-    with open(get_config_name(interface), 'w') as f:
-        f.write(config_text)
+    write_file(get_config_name(interface), config_text)
     chown(get_config_name(interface), user, group)
 
     return None
@@ -805,10 +805,7 @@ def apply(openvpn):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -25,7 +25,9 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos.ifconfig import Interface
 from vyos.util import chown, chmod_x, cmd
+from vyos.util import write_file
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 default_config_data = {
     'access_concentrator': '',
@@ -67,8 +69,9 @@ def get_config():
         pppoe['deleted'] = True
         return pppoe
 
-    # set new configuration level
-    conf.set_level(base_path + [pppoe['intf']])
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view(base_path + [pppoe['intf']])
 
     # Access concentrator name (only connect to this concentrator)
     if conf.exists(['access-concentrator']):
@@ -197,32 +200,27 @@ def generate(pppoe):
         # Create PPP configuration files
         tmpl = env.get_template('peer.tmpl')
         config_text = tmpl.render(pppoe)
-        with open(config_pppoe, 'w') as f:
-            f.write(config_text)
+        write_file(config_pppoe, config_text)
 
         # Create script for ip-pre-up.d
         tmpl = env.get_template('ip-pre-up.script.tmpl')
         config_text = tmpl.render(pppoe)
-        with open(script_pppoe_pre_up, 'w') as f:
-            f.write(config_text)
+        write_file(script_pppoe_pre_up, config_text)
 
         # Create script for ip-up.d
         tmpl = env.get_template('ip-up.script.tmpl')
         config_text = tmpl.render(pppoe)
-        with open(script_pppoe_ip_up, 'w') as f:
-            f.write(config_text)
+        write_file(script_pppoe_ip_up, config_text)
 
         # Create script for ip-down.d
         tmpl = env.get_template('ip-down.script.tmpl')
         config_text = tmpl.render(pppoe)
-        with open(script_pppoe_ip_down, 'w') as f:
-            f.write(config_text)
+        write_file(script_pppoe_ip_down, config_text)
 
         # Create script for ipv6-up.d
         tmpl = env.get_template('ipv6-up.script.tmpl')
         config_text = tmpl.render(pppoe)
-        with open(script_pppoe_ipv6_up, 'w') as f:
-            f.write(config_text)
+        write_file(script_pppoe_ipv6_up, config_text)
 
         # make generated script file executable
         chmod_x(script_pppoe_pre_up)
@@ -249,10 +247,7 @@ def apply(pppoe):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -27,6 +27,7 @@ from vyos.configdict import list_diff
 from vyos.validate import is_ipv4, is_ipv6
 from vyos import ConfigError
 from vyos.dicts import FixedDict
+from vyos.trace import run_phases
 
 class ConfigurationState(Config):
     """
@@ -603,10 +604,7 @@ def apply(conf):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
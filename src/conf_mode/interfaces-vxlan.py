@@ -24,6 +24,7 @@ from vyos.config import Config
 from vyos.ifconfig import VXLANIf, Interface
 from vyos.util import is_bridge_member
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 default_config_data = {
     'address': [],
@@ -66,8 +67,9 @@ def get_config():
         vxlan['deleted'] = True
         return vxlan
 
-    # set new configuration level
-    conf.set_level('interfaces vxlan ' + vxlan['intf'])
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view('interfaces vxlan ' + vxlan['intf'])
 
     # retrieve configured interface addresses
     if conf.exists('address'):
@@ -261,10 +263,7 @@ def apply(vxlan):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -26,7 +26,9 @@ from vyos.configdict import list_diff
 from vyos.ifconfig import WireGuardIf
 from vyos.util import chown, is_bridge_member, chmod_750
 from vyos.util import call
+from vyos.util import write_file
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 kdir = r'/config/auth/wireguard'
 
@@ -82,7 +84,9 @@ def get_config():
         wg['deleted'] = True
         return wg
 
-    conf.set_level(base + [wg['intf']])
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view(base + [wg['intf']])
 
     # retrieve configured interface addresses
     if conf.exists(['address']):
@@ -280,8 +284,7 @@ def apply(wg):
         # preshared-key - needs to be read from a file
         if peer['psk']:
             psk_file = '/config/auth/wireguard/psk'
-            with open(psk_file, 'w') as f:
-                f.write(peer['psk'])
+            write_file(psk_file, peer['psk'])
             w.config['psk'] = psk_file
 
         w.update()
@@ -298,9 +301,7 @@ if __name__ == '__main__':
     try:
         _check_kmod()
         _migrate_default_keys()
-        c = get_config()
-        verify(c)
-        apply(c)
+        run_phases(get_config, verify=verify, apply=apply)
     except ConfigError as e:
         print(e)
         exit(1)
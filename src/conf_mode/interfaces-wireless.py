@@ -30,7 +30,9 @@ from vyos.defaults import directories as vyos_data_dir
 from vyos.ifconfig import WiFiIf
 from vyos.ifconfig_vlan import apply_vlan_config, verify_vlan_config
 from vyos.util import process_running, chmod_x, chown, run, is_bridge_member
+from vyos.util import write_file
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 user = 'root'
 group = 'vyattacfg'
@@ -171,8 +173,13 @@ def get_config():
         # Thus we need to remove individual settings
         return wifi
 
-    # set new configuration level
-    conf.set_level(cfg_base)
+    # retrieve configured regulatory domain, outside of the interface
+    if conf.exists('system wifi-regulatory-domain'):
+        wifi['country_code'] = conf.return_value('system wifi-regulatory-domain')
+
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view(cfg_base)
 
     # retrieve configured interface addresses
     if conf.exists('address'):
@@ -544,11 +551,6 @@ def get_config():
     if conf.exists('disable'):
         wifi['disable'] = True
 
-    # retrieve configured regulatory domain
-    conf.set_level('system')
-    if conf.exists('wifi-regulatory-domain'):
-        wifi['country_code'] = conf.return_value('wifi-regulatory-domain')
-
     return wifi
 
 
@@ -691,14 +693,12 @@ def generate(wifi):
     if wifi['op_mode'] == 'ap':
         tmpl = env.get_template('hostapd.conf.tmpl')
         config_text = tmpl.render(wifi)
-        with open(get_conf_file('hostapd', wifi['intf']), 'w') as f:
-            f.write(config_text)
+        write_file(get_conf_file('hostapd', wifi['intf']), config_text)
 
     elif wifi['op_mode'] == 'station':
         tmpl = env.get_template('wpa_supplicant.conf.tmpl')
         config_text = tmpl.render(wifi)
-        with open(get_conf_file('wpa_supplicant', wifi['intf']), 'w') as f:
-            f.write(config_text)
+        write_file(get_conf_file('wpa_supplicant', wifi['intf']), config_text)
 
     return None
 
@@ -839,10 +839,7 @@ def apply(wifi):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -26,7 +26,9 @@ from vyos.defaults import directories as vyos_data_dir
 from vyos.util import chown, chmod_x, is_bridge_member
 from vyos.util import cmd
 from vyos.util import call
+from vyos.util import write_file
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 default_config_data = {
     'address': [],
@@ -70,8 +72,9 @@ def get_config():
         wwan['deleted'] = True
         return wwan
 
-    # set new configuration level
-    conf.set_level('interfaces wirelessmodem ' + wwan['intf'])
+    # fetch the whole interface subtree at once, all lookups below are
+    # plain dict accesses relative to the interface
+    conf = conf.get_config_view('interfaces wirelessmodem ' + wwan['intf'])
 
     # get metrick for backup default route
     if conf.exists(['apn']):
@@ -177,32 +180,27 @@ def generate(wwan):
         # Create PPP configuration files
         tmpl = env.get_template('peer.tmpl')
         config_text = tmpl.render(wwan)
-        with open(config_wwan, 'w') as f:
-            f.write(config_text)
+        write_file(config_wwan, config_text)
 
         # Create PPP chat script
         tmpl = env.get_template('chat.tmpl')
         config_text = tmpl.render(wwan)
-        with open(config_wwan_chat, 'w') as f:
-            f.write(config_text)
+        write_file(config_wwan_chat, config_text)
 
         # Create script for ip-pre-up.d
         tmpl = env.get_template('ip-pre-up.script.tmpl')
         config_text = tmpl.render(wwan)
-        with open(script_wwan_pre_up, 'w') as f:
-            f.write(config_text)
+        write_file(script_wwan_pre_up, config_text)
 
         # Create script for ip-up.d
         tmpl = env.get_template('ip-up.script.tmpl')
         config_text = tmpl.render(wwan)
-        with open(script_wwan_ip_up, 'w') as f:
-            f.write(config_text)
+        write_file(script_wwan_ip_up, config_text)
 
         # Create script for ip-down.d
         tmpl = env.get_template('ip-down.script.tmpl')
         config_text = tmpl.render(wwan)
-        with open(script_wwan_ip_down, 'w') as f:
-            f.write(config_text)
+        write_file(script_wwan_ip_down, config_text)
 
         # make generated script file executable
         chmod_x(script_wwan_pre_up)
@@ -228,10 +226,7 @@ def apply(wwan):
 if __name__ == '__main__':
     try:
         check_kmod()
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
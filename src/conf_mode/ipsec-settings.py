@@ -25,6 +25,10 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import run
+from vyos.util import DEVNULL
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 ra_conn_name = "remote-access"
 charon_conf_file = "/etc/strongswan.d/charon.conf"
@@ -153,8 +157,7 @@ def generate(data):
 
     tmpl = env.get_template('charon.tmpl')
     config_text = tmpl.render(data)
-    with open(charon_conf_file, 'w') as f:
-        f.write(config_text)
+    write_file(charon_conf_file, config_text)
 
     if data["ipsec_l2tp"]:
         remove_confs(delim_ipsec_l2tp_begin, delim_ipsec_l2tp_end, ipsec_conf_flie)
@@ -162,8 +165,7 @@ def generate(data):
         tmpl = env.get_template('ipsec.secrets.tmpl')
         l2pt_ipsec_secrets_txt = tmpl.render(c)
         old_umask = os.umask(0o077)
-        with open(ipsec_secrets_flie,'w') as f:
-            f.write(l2pt_ipsec_secrets_txt)
+        write_file(ipsec_secrets_flie, l2pt_ipsec_secrets_txt)
         os.umask(old_umask)
 
         tmpl = env.get_template('remote-access.tmpl')
@@ -174,8 +176,7 @@ def generate(data):
         if not os.path.exists(ipsec_ra_conn_dir):
             os.makedirs(ipsec_ra_conn_dir)
 
-        with open(ipsec_ra_conn_file,'w') as f:
-            f.write(ipsec_ra_conn_txt)
+        write_file(ipsec_ra_conn_file, ipsec_ra_conn_txt)
         os.umask(old_umask)
 
 
@@ -193,12 +194,12 @@ def generate(data):
         remove_confs(delim_ipsec_l2tp_begin, delim_ipsec_l2tp_end, ipsec_conf_flie)
 
 def restart_ipsec():
-    call('ipsec restart >&/dev/null')
+    run('ipsec restart', stderr=DEVNULL)
     # counter for apply swanctl config
     counter = 10
     while counter <= 10:
         if os.path.exists(charon_pidfile):
-            call('swanctl -q >&/dev/null')
+            run('swanctl -q', stderr=DEVNULL)
             break
         counter -=1
         sleep(1)
@@ -211,10 +212,7 @@ def apply(data):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -24,6 +24,7 @@ from vyos.config import Config
 from vyos import ConfigError
 from vyos.util import cmd
 from vyos.util import call
+from vyos.trace import run_phases
 
 
 vyos_conf_scripts_dir = vyos.defaults.directories['conf_mode']
@@ -104,10 +105,7 @@ def apply(cert):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         sys.exit(1)
@@ -27,6 +27,8 @@ from vyos.defaults import directories as vyos_data_dir
 from vyos.version import get_version_data
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = "/etc/default/lldpd"
@@ -228,14 +230,12 @@ def generate(lldp):
     # generate /etc/default/lldpd
     tmpl = env.get_template('lldpd.tmpl')
     config_text = tmpl.render(lldp)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     # generate /etc/lldpd.d/01-vyos.conf
     tmpl = env.get_template('vyos.conf.tmpl')
     config_text = tmpl.render(lldp)
-    with open(vyos_config_file, 'w') as f:
-        f.write(config_text)
+    write_file(vyos_config_file, config_text)
 
 
 def apply(lldp):
@@ -250,10 +250,7 @@ def apply(lldp):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
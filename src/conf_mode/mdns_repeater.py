@@ -25,6 +25,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = r'/etc/default/mdns-repeater'
@@ -89,8 +91,7 @@ def generate(mdns):
 
     tmpl = env.get_template('mdns-repeater.tmpl')
     config_text = tmpl.render(mdns)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     return None
 
@@ -106,10 +107,7 @@ def apply(mdns):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -25,6 +25,8 @@ from vyos.defaults import directories as vyos_data_dir
 from vyos.validate import is_ipv6_link_local, is_ipv6
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = r'/tmp/bfd.frr'
@@ -198,8 +200,7 @@ def generate(bfd):
 
     tmpl = env.get_template('bfd.frr.tmpl')
     config_text = tmpl.render(bfd)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     return None
 
@@ -215,10 +216,7 @@ def apply(bfd):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -24,6 +24,8 @@ from vyos import ConfigError
 from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = r'/tmp/igmp.frr'
@@ -95,8 +97,7 @@ def generate(igmp):
 
     tmpl = env.get_template('igmp.frr.tmpl')
     config_text = tmpl.render(igmp)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     return None
 
@@ -112,10 +113,7 @@ def apply(igmp):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
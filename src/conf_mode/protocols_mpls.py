@@ -22,6 +22,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = r'/tmp/ldpd.frr'
@@ -136,8 +138,7 @@ def generate(mpls):
 
     tmpl = env.get_template('ldpd.frr.tmpl')
     config_text = tmpl.render(mpls)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     return None
 
@@ -169,10 +170,7 @@ def apply(mpls):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
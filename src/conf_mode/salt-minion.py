@@ -27,6 +27,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = r'/etc/salt/minion'
@@ -98,8 +100,7 @@ def generate(salt):
 
     tmpl = env.get_template('minion.tmpl')
     config_text = tmpl.render(salt)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     path = "/etc/salt/"
     for path in paths:
@@ -136,9 +137,7 @@ def apply(salt):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        generate(c)
-        apply(c)
+        run_phases(get_config, generate=generate, apply=apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -26,6 +26,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import run
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 ipoe_cnf_dir = r'/etc/accel-ppp/ipoe'
 ipoe_cnf = ipoe_cnf_dir + r'/ipoe.config'
@@ -230,14 +232,12 @@ def generate(c):
         tmpl = env.get_template('chap-secrets.tmpl')
         chap_secrets_txt = tmpl.render(c)
         old_umask = os.umask(0o077)
-        with open(chap_secrets, 'w') as f:
-            f.write(chap_secrets_txt)
+        write_file(chap_secrets, chap_secrets_txt)
         os.umask(old_umask)
 
     tmpl = env.get_template('ipoe.config.tmpl')
     config_text = tmpl.render(c)
-    with open(ipoe_cnf, 'w') as f:
-        f.write(config_text)
+    write_file(ipoe_cnf, config_text)
     return c
 
 
@@ -310,10 +310,7 @@ def apply(c):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -26,6 +26,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import run
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 pidfile = r'/var/run/accel_pppoe.pid'
 pppoe_cnf_dir = r'/etc/accel-ppp/pppoe'
@@ -396,15 +398,13 @@ def generate(c):
 
     tmpl = env.get_template('pppoe.config.tmpl')
     config_text = tmpl.render(c)
-    with open(pppoe_conf, 'w') as f:
-        f.write(config_text)
+    write_file(pppoe_conf, config_text)
 
     if c['authentication']['local-users']:
         tmpl = env.get_template('chap-secrets.tmpl')
         chap_secrets_txt = tmpl.render(c)
         old_umask = os.umask(0o077)
-        with open(chap_secrets, 'w') as f:
-            f.write(chap_secrets_txt)
+        write_file(chap_secrets, chap_secrets_txt)
         os.umask(old_umask)
 
     return c
@@ -430,10 +430,7 @@ def apply(c):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -24,6 +24,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = r'/etc/radvd.conf'
@@ -146,8 +148,7 @@ def generate(rtradv):
 
     tmpl = env.get_template('radvd.conf.tmpl')
     config_text = tmpl.render(rtradv)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     # adjust file permissions of new configuration file
     if os.path.exists(config_file):
@@ -169,10 +170,7 @@ def apply(rtradv):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
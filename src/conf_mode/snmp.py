@@ -20,14 +20,16 @@ from binascii import hexlify
 from time import sleep
 from stat import S_IRWXU, S_IXGRP, S_IXOTH, S_IROTH, S_IRGRP
 from sys import exit
-from jinja2 import FileSystemLoader, Environment
 
 from vyos.config import Config
-from vyos.defaults import directories as vyos_data_dir
+from vyos.configdiff import ConfigDiff
 from vyos.validate import is_ipv4, is_addr_assigned
 from vyos.version import get_version_data
 from vyos import ConfigError
+from vyos.template import render
 from vyos.util import call
+from vyos.util import run
+from vyos.trace import run_phases
 
 
 config_file_client  = r'/etc/snmp/snmp.conf'
@@ -65,7 +67,9 @@ default_config_data = {
     'v3_traps': [],
     'v3_users': [],
     'v3_views': [],
-    'script_ext': []
+    'script_ext': [],
+    'v3_users_changed': True,
+    'changed': True
 }
 
 def rmfile(file):
@@ -91,6 +95,11 @@ def get_config():
     snmp['vyos_user'] = 'vyos' + hexlify(os.urandom(8)).decode('utf-8')
     snmp['vyos_user_pass'] = hexlify(os.urandom(16)).decode('utf-8')
 
+    # Users end up in the user database of snmpd, which it rewrites itself,
+    # so changes to them can't be detected by comparing config files
+    diff = ConfigDiff(conf)
+    snmp['v3_users_changed'] = diff.is_node_changed('v3 user') or diff.is_node_changed('v3 engineid')
+
     if conf.exists('community'):
         for name in conf.list_nodes('community'):
             community = {
@@ -505,7 +514,37 @@ def verify(snmp):
 
     return None
 
+def get_internal_user():
+    """ Returns the internal user of the configured snmpd, or None """
+    try:
+        with open(config_file_daemon, 'r') as f:
+            for line in f:
+                if line.startswith('iquerySecName '):
+                    return line.split()[1]
+    except OSError:
+        pass
+    return None
+
+def render_config(snmp):
+    """ Render all static config files, returns True if any of them changed """
+    changed = False
+    changed |= render(config_file_client, 'snmp/etc.snmp.conf.tmpl', snmp)
+    changed |= render(config_file_daemon, 'snmp/etc.snmpd.conf.tmpl', snmp)
+    changed |= render(config_file_access, 'snmp/usr.snmpd.conf.tmpl', snmp)
+    return changed
+
 def generate(snmp):
+    if snmp is not None and not snmp['v3_users_changed']:
+        # Restarting snmpd is disruptive for pollers. The internal user is
+        # a random one, so render with the user of the running daemon to find
+        # out if anything else in the configuration changed
+        internal_user = get_internal_user()
+        if internal_user and run('systemctl is-active --quiet snmpd.service') == 0:
+            current = dict(snmp, vyos_user=internal_user)
+            if not render_config(current):
+                snmp['changed'] = False
+                return None
+
     #
     # As we are manipulating the snmpd user database we have to stop it first!
     # This is even save if service is going to be removed
@@ -518,34 +557,11 @@ def generate(snmp):
     if snmp is None:
         return None
 
-    # Prepare Jinja2 template loader from files
-    tmpl_path = os.path.join(vyos_data_dir['data'], 'templates', 'snmp')
-    fs_loader = FileSystemLoader(tmpl_path)
-    env = Environment(loader=fs_loader)
-
-    # Write client config file
-    tmpl = env.get_template('etc.snmp.conf.tmpl')
-    config_text = tmpl.render(snmp)
-    with open(config_file_client, 'w') as f:
-        f.write(config_text)
-
-    # Write server config file
-    tmpl = env.get_template('etc.snmpd.conf.tmpl')
-    config_text = tmpl.render(snmp)
-    with open(config_file_daemon, 'w') as f:
-        f.write(config_text)
-
-    # Write access rights config file
-    tmpl = env.get_template('usr.snmpd.conf.tmpl')
-    config_text = tmpl.render(snmp)
-    with open(config_file_access, 'w') as f:
-        f.write(config_text)
-
-    # Write access rights config file
-    tmpl = env.get_template('var.snmpd.conf.tmpl')
-    config_text = tmpl.render(snmp)
-    with open(config_file_user, 'w') as f:
-        f.write(config_text)
+    # Write client, server, and access rights config files
+    render_config(snmp)
+
+    # Write user database file
+    render(config_file_user, 'snmp/var.snmpd.conf.tmpl', snmp)
 
     return None
 
@@ -553,6 +569,10 @@ def apply(snmp):
     if snmp is None:
         return None
 
+    if not snmp['changed']:
+        # snmpd is still running with the same configuration
+        return None
+
     # start SNMP daemon
     call("systemctl restart snmpd.service")
 
@@ -597,22 +617,20 @@ def apply(snmp):
                 #
                 # Currently when executing call() the environment does not
                 # have the vyos_libexec_dir variable set, see Phabricator T685.
-                call('/opt/vyatta/sbin/my_set service snmp v3 user "{0}" auth encrypted-key "{1}" > /dev/null'.format(cfg['user'], cfg['auth_pw']))
-                call('/opt/vyatta/sbin/my_set service snmp v3 user "{0}" privacy encrypted-key "{1}" > /dev/null'.format(cfg['user'], cfg['priv_pw']))
-                call('/opt/vyatta/sbin/my_delete service snmp v3 user "{0}" auth plaintext-key > /dev/null'.format(cfg['user']))
-                call('/opt/vyatta/sbin/my_delete service snmp v3 user "{0}" privacy plaintext-key > /dev/null'.format(cfg['user']))
+                user = ['service', 'snmp', 'v3', 'user', cfg['user']]
+                run(['/opt/vyatta/sbin/my_set'] + user + ['auth', 'encrypted-key', cfg['auth_pw']])
+                run(['/opt/vyatta/sbin/my_set'] + user + ['privacy', 'encrypted-key', cfg['priv_pw']])
+                run(['/opt/vyatta/sbin/my_delete'] + user + ['auth', 'plaintext-key'])
+                run(['/opt/vyatta/sbin/my_delete'] + user + ['privacy', 'plaintext-key'])
 
     # Enable AgentX in FRR
-    call('vtysh -c "configure terminal" -c "agentx" >/dev/null')
+    run(['vtysh', '-c', 'configure terminal', '-c', 'agentx'])
 
     return None
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -22,6 +22,8 @@ from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = r'/etc/ssh/sshd_config'
@@ -127,8 +129,7 @@ def generate(ssh):
 
     tmpl = env.get_template('sshd_config.tmpl')
     config_text = tmpl.render(ssh)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
     return None
 
 def apply(ssh):
@@ -144,10 +145,7 @@ def apply(ssh):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
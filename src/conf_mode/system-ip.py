@@ -21,6 +21,7 @@ from copy import deepcopy
 from vyos.config import Config
 from vyos import ConfigError
 from vyos.util import call
+from vyos.trace import run_phases
 
 
 default_config_data = {
@@ -74,10 +75,7 @@ def apply(ip_opt):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -22,6 +22,8 @@ from copy import deepcopy
 from vyos.config import Config
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 ipv6_disable_file = '/etc/modprobe.d/vyos_disable_ipv6.conf'
@@ -71,8 +73,7 @@ def generate(ip_opt):
 def apply(ip_opt):
     # disable IPv6 address assignment
     if ip_opt['disable_addr_assignment']:
-        with open(ipv6_disable_file, 'w') as f:
-            f.write('options ipv6 disable_ipv6=1')
+        write_file(ipv6_disable_file, 'options ipv6 disable_ipv6=1')
     else:
         if os.path.exists(ipv6_disable_file):
             os.unlink(ipv6_disable_file)
@@ -102,10 +103,7 @@ def apply(ip_opt):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
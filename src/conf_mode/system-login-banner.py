@@ -17,6 +17,8 @@
 from sys import exit
 from vyos.config import Config
 from vyos import ConfigError
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 motd="""
 The programs included with the Debian GNU/Linux system are free software;
@@ -85,23 +87,17 @@ def generate(banner):
     pass
 
 def apply(banner):
-    with open(PRELOGIN_FILE, 'w') as f:
-        f.write(banner['issue'])
+    write_file(PRELOGIN_FILE, banner['issue'])
 
-    with open(PRELOGIN_NET_FILE, 'w') as f:
-        f.write(banner['issue_net'])
+    write_file(PRELOGIN_NET_FILE, banner['issue_net'])
 
-    with open(POSTLOGIN_FILE, 'w') as f:
-        f.write(banner['motd'])
+    write_file(POSTLOGIN_FILE, banner['motd'])
 
     return None
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -29,6 +29,8 @@ from vyos import ConfigError
 from vyos.util import cmd
 from vyos.util import call
 from vyos.util import DEVNULL
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 radius_config_file = "/etc/pam_radius_auth.conf"
@@ -229,8 +231,7 @@ def generate(login):
 
         tmpl = env.get_template('pam_radius_auth.conf.tmpl')
         config_text = tmpl.render(login)
-        with open(radius_config_file, 'w') as f:
-            f.write(config_text)
+        write_file(radius_config_file, config_text)
 
         uid = getpwnam('root').pw_uid
         gid = getpwnam('root').pw_gid
@@ -361,10 +362,7 @@ def apply(login):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
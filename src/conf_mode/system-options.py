@@ -21,6 +21,7 @@ from copy import deepcopy
 from vyos.config import Config
 from vyos import ConfigError
 from vyos.util import run
+from vyos.trace import run_phases
 
 systemd_ctrl_alt_del = '/lib/systemd/system/ctrl-alt-del.target'
 
@@ -80,10 +81,7 @@ def apply(opt):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -22,6 +22,7 @@ import re
 
 from vyos import ConfigError
 from vyos.config import Config
+from vyos.trace import span
 
 proxy_def = r'/etc/profile.d/vyos-system-proxy.sh'
 
@@ -83,10 +84,14 @@ def apply(ln):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        ln = generate(c)
-        apply(ln)
+        with span('get_config'):
+            c = get_config()
+        with span('verify'):
+            verify(c)
+        with span('generate'):
+            ln = generate(c)
+        with span('apply'):
+            apply(ln)
     except ConfigError as e:
         print(e)
         sys.exit(1)
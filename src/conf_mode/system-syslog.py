@@ -17,13 +17,14 @@
 import os
 import re
 
-from jinja2 import FileSystemLoader, Environment
 from sys import exit
 
 from vyos.config import Config
-from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
+from vyos.template import render
 from vyos.util import run
+from vyos.util import restart_if_changed
+from vyos.trace import run_phases
 
 def get_config():
     c = Config()
@@ -192,22 +193,12 @@ def generate(c):
     if c == None:
         return None
 
-    # Prepare Jinja2 template loader from files
-    tmpl_path = os.path.join(vyos_data_dir['data'], 'templates', 'syslog')
-    fs_loader = FileSystemLoader(tmpl_path)
-    env = Environment(loader=fs_loader, trim_blocks=True)
-
-    tmpl = env.get_template('rsyslog.conf.tmpl')
-    config_text = tmpl.render(c)
-    with open('/etc/rsyslog.d/vyos-rsyslog.conf', 'w') as f:
-        f.write(config_text)
+    c['changed'] = render('/etc/rsyslog.d/vyos-rsyslog.conf', 'syslog/rsyslog.conf.tmpl',
+                          c, trim_blocks=True)
 
     # eventually write for each file its own logrotate file, since size is
     # defined it shouldn't matter
-    tmpl = env.get_template('logrotate.tmpl')
-    config_text = tmpl.render(c)
-    with open('/etc/logrotate.d/vyos-rsyslog', 'w') as f:
-        f.write(config_text)
+    render('/etc/logrotate.d/vyos-rsyslog', 'syslog/logrotate.tmpl', c, trim_blocks=True)
 
 
 def verify(c):
@@ -254,14 +245,12 @@ def verify(c):
 def apply(c):
     if not c:
         return run('systemctl stop syslog')
-    return run('systemctl restart syslog')
+    # logrotate reads its config on every run, only rsyslog needs a restart
+    return restart_if_changed('syslog', c['changed'])
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -23,6 +23,8 @@ from jinja2 import FileSystemLoader, Environment
 from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 config_80211_file='/etc/modprobe.d/cfg80211.conf'
 config_crda_file='/etc/default/crda'
@@ -74,13 +76,11 @@ def generate(regdom):
 
     tmpl = env.get_template('cfg80211.conf.tmpl')
     config_text = tmpl.render(regdom)
-    with open(config_80211_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_80211_file, config_text)
 
     tmpl = env.get_template('crda.tmpl')
     config_text = tmpl.render(regdom)
-    with open(config_crda_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_crda_file, config_text)
 
     return None
 
@@ -89,10 +89,7 @@ def apply(regdom):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -22,6 +22,7 @@ import sys
 
 from vyos.config import Config
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 
 crontab_file = "/etc/cron.d/vyos-crontab"
@@ -139,10 +140,7 @@ def apply(config):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         sys.exit(1)
@@ -28,6 +28,8 @@ from vyos.defaults import directories as vyos_data_dir
 from vyos.validate import is_ipv4, is_addr_assigned
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 
 config_file = r'/etc/default/tftpd'
@@ -106,8 +108,7 @@ def generate(tftpd):
         tmpl = env.get_template('default.tmpl')
         config_text = tmpl.render(config)
         file = config_file + str(idx)
-        with open(file, 'w') as f:
-            f.write(config_text)
+        write_file(file, config_text)
 
         idx = idx + 1
 
@@ -147,10 +148,7 @@ def apply(tftpd):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
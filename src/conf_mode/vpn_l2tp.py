@@ -28,8 +28,10 @@ from jinja2 import FileSystemLoader, Environment
 from vyos.config import Config
 from vyos.defaults import directories as vyos_data_dir
 from vyos.util import call
+from vyos.util import write_file
 from vyos.validate import is_ipv4
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 l2tp_conf = '/etc/accel-ppp/l2tp.conf'
 l2tp_chap_secrets = '/etc/accel-ppp/l2tp.chap-secrets'
@@ -355,14 +357,12 @@ def generate(l2tp):
 
     tmpl = env.get_template('l2tp.config.tmpl')
     config_text = tmpl.render(c)
-    with open(l2tp_conf, 'w') as f:
-        f.write(config_text)
+    write_file(l2tp_conf, config_text)
 
     if l2tp['auth_mode'] == 'local':
         tmpl = env.get_template('chap-secrets.tmpl')
         config_text = tmpl.render(l2tp)
-        with open(l2tp_chap_secrets, 'w') as f:
-            f.write(config_text)
+        write_file(l2tp_chap_secrets, config_text)
 
         os.chmod(l2tp_chap_secrets, S_IRUSR | S_IWUSR | S_IRGRP)
 
@@ -389,10 +389,7 @@ def apply(l2tp):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
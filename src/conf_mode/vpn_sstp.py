@@ -26,6 +26,8 @@ from vyos.config import Config
 from vyos import ConfigError
 from vyos.defaults import directories as vyos_data_dir
 from vyos.util import call, run
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 sstp_conf = '/etc/accel-ppp/sstp.conf'
 sstp_chap_secrets = '/etc/accel-ppp/sstp.chap-secrets'
@@ -312,14 +314,12 @@ def generate(sstp):
     # accel-cmd reload doesn't work so any change results in a restart of the daemon
     tmpl = env.get_template('sstp.config.tmpl')
     config_text = tmpl.render(sstp)
-    with open(sstp_conf, 'w') as f:
-        f.write(config_text)
+    write_file(sstp_conf, config_text)
 
     if sstp['local_users']:
         tmpl = env.get_template('chap-secrets.tmpl')
         config_text = tmpl.render(sstp)
-        with open(sstp_chap_secrets, 'w') as f:
-            f.write(sstp_chap_secrets)
+        write_file(sstp_chap_secrets, sstp_chap_secrets)
 
         os.chmod(sstp_chap_secrets, S_IRUSR | S_IWUSR | S_IRGRP)
     else:
@@ -345,10 +345,7 @@ def apply(sstp):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -26,7 +26,10 @@ from vyos.configdict import list_diff
 from vyos.defaults import directories as vyos_data_dir
 from vyos.ifconfig import Interface
 from vyos.util import read_file, cmd
+from vyos.util import write_file
+from vyos.util import Batch
 from vyos import ConfigError
+from vyos.trace import run_phases
 
 config_file = r'/etc/iproute2/rt_tables.d/vyos-vrf.conf'
 
@@ -38,8 +41,8 @@ default_config_data = {
     'vrf_remove': []
 }
 
-def _cmd(command):
-    cmd(command, raising=ConfigError, message='Error changing VRF')
+def _batch():
+    return Batch(raising=ConfigError, message='Error changing VRF')
 
 def list_rules():
     command = 'ip -j -4 rule show'
@@ -185,8 +188,7 @@ def generate(vrf_config):
 
     tmpl = env.get_template('vrf.conf.tmpl')
     config_text = tmpl.render(vrf_config)
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     return None
 
@@ -199,37 +201,42 @@ def apply(vrf_config):
     # - https://netdevconf.info/1.1/proceedings/slides/ahern-vrf-tutorial.pdf
     # - https://netdevconf.info/1.2/slides/oct6/02_ahern_what_is_l3mdev_slides.pdf
 
-    # set the default VRF global behaviour
-    bind_all = vrf_config['bind_to_all']
-    if read_file('/proc/sys/net/ipv4/tcp_l3mdev_accept') != bind_all:
-        _cmd(f'sysctl -wq net.ipv4.tcp_l3mdev_accept={bind_all}')
-        _cmd(f'sysctl -wq net.ipv4.udp_l3mdev_accept={bind_all}')
-
-    for vrf in vrf_config['vrf_remove']:
-        name = vrf['name']
-        if os.path.isdir(f'/sys/class/net/{name}'):
-            _cmd(f'sudo ip -4 route del vrf {name} unreachable default metric 4278198272')
-            _cmd(f'sudo ip -6 route del vrf {name} unreachable default metric 4278198272')
-            _cmd(f'ip link delete dev {name}')
+    # All ip commands are run by a single ip(8) process, the default routes
+    # are given as 0.0.0.0/0 and ::/0 for ip to get the address family from
+    # them, as no -4/-6 option can be given per command
+    with _batch() as batch:
+        # set the default VRF global behaviour
+        bind_all = vrf_config['bind_to_all']
+        if read_file('/proc/sys/net/ipv4/tcp_l3mdev_accept') != bind_all:
+            batch.add(f'sysctl -wq net.ipv4.tcp_l3mdev_accept={bind_all} '
+                      f'net.ipv4.udp_l3mdev_accept={bind_all}')
+
+        for vrf in vrf_config['vrf_remove']:
+            name = vrf['name']
+            if os.path.isdir(f'/sys/class/net/{name}'):
+                batch.add(f'ip route del vrf {name} unreachable 0.0.0.0/0 metric 4278198272')
+                batch.add(f'ip route del vrf {name} unreachable ::/0 metric 4278198272')
+                batch.add(f'ip link delete dev {name}')
+
+        for vrf in vrf_config['vrf_add']:
+            name = vrf['name']
+            table = vrf['table']
+
+            if not os.path.isdir(f'/sys/class/net/{name}'):
+                # For each VRF apart from your default context create a VRF
+                # interface with a separate routing table
+                batch.add(f'ip link add {name} type vrf table {table}')
+                # Start VRf
+                batch.add(f'ip link set dev {name} up')
+                # The kernel Documentation/networking/vrf.txt also recommends
+                # adding unreachable routes to the VRF routing tables so that routes
+                # afterwards are taken.
+                batch.add(f'ip route add vrf {name} unreachable 0.0.0.0/0 metric 4278198272')
+                batch.add(f'ip route add vrf {name} unreachable ::/0 metric 4278198272')
 
     for vrf in vrf_config['vrf_add']:
-        name = vrf['name']
-        table = vrf['table']
-
-        if not os.path.isdir(f'/sys/class/net/{name}'):
-            # For each VRF apart from your default context create a VRF
-            # interface with a separate routing table
-            _cmd(f'ip link add {name} type vrf table {table}')
-            # Start VRf
-            _cmd(f'ip link set dev {name} up')
-            # The kernel Documentation/networking/vrf.txt also recommends
-            # adding unreachable routes to the VRF routing tables so that routes
-            # afterwards are taken.
-            _cmd(f'ip -4 route add vrf {name} unreachable default metric 4278198272')
-            _cmd(f'ip -6 route add vrf {name} unreachable default metric 4278198272')
-
         # set VRF description for e.g. SNMP monitoring
-        Interface(name).set_alias(vrf['description'])
+        Interface(vrf['name']).set_alias(vrf['description'])
 
     # Linux routing uses rules to find tables - routing targets are then
     # looked up in those tables. If the lookup got a matching route, the
@@ -247,30 +254,29 @@ def apply(vrf_config):
     # get current preference on local table
     local_pref = [r.get('priority') for r in list_rules() if r.get('table') == 'local'][0]
 
-    # change preference when VRFs are enabled and local lookup table is default
-    if not local_pref and vrf_config['vrf_add']:
-        for af in ['-4', '-6']:
-            _cmd(f'ip {af} rule add pref 32765 table local')
-            _cmd(f'ip {af} rule del pref 0')
+    with _batch() as batch:
+        # change preference when VRFs are enabled and local lookup table is default
+        if not local_pref and vrf_config['vrf_add']:
+            for af in ['-4', '-6']:
+                batch.add(f'ip {af} rule add pref 32765 table local')
+                batch.add(f'ip {af} rule del pref 0')
 
-    # return to default lookup preference when no VRF is configured
-    if not vrf_config['vrf_add']:
-        for af in ['-4', '-6']:
-            _cmd(f'ip {af} rule add pref 0 table local')
-            _cmd(f'ip {af} rule del pref 32765')
+        # return to default lookup preference when no VRF is configured
+        if not vrf_config['vrf_add']:
+            for af in ['-4', '-6']:
+                batch.add(f'ip {af} rule add pref 0 table local')
+                batch.add(f'ip {af} rule del pref 32765')
 
-            # clean out l3mdev-table rule if present
-            if 1000 in [r.get('priority') for r in list_rules() if r.get('priority') == 1000]:
-                _cmd(f'ip {af} rule del pref 1000')
+                # clean out l3mdev-table rule if present (list_rules() runs
+                # the pending commands first)
+                if 1000 in [r.get('priority') for r in list_rules() if r.get('priority') == 1000]:
+                    batch.add(f'ip {af} rule del pref 1000')
 
     return None
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         exit(1)
@@ -28,6 +28,8 @@ import vyos.keepalived
 from vyos.defaults import directories as vyos_data_dir
 from vyos import ConfigError
 from vyos.util import call
+from vyos.util import write_file
+from vyos.trace import run_phases
 
 daemon_file = "/etc/default/keepalived"
 config_file = "/etc/keepalived/keepalived.conf"
@@ -127,8 +129,7 @@ def get_config():
         sync_groups.append(sync_group)
 
     # create a file with dict with proposed configuration
-    with open("{}.temp".format(config_dict_path), 'w') as dict_file:
-        dict_file.write(dumps({'vrrp_groups': vrrp_groups, 'sync_groups': sync_groups}))
+    write_file("{}.temp".format(config_dict_path), dumps({'vrrp_groups': vrrp_groups, 'sync_groups': sync_groups}))
 
     return (vrrp_groups, sync_groups)
 
@@ -219,13 +220,11 @@ def generate(data):
 
     tmpl = env.get_template('keepalived.conf.tmpl')
     config_text = tmpl.render({"groups": vrrp_groups, "sync_groups": sync_groups})
-    with open(config_file, 'w') as f:
-        f.write(config_text)
+    write_file(config_file, config_text)
 
     tmpl = env.get_template('daemon.tmpl')
     config_text = tmpl.render()
-    with open(daemon_file, 'w') as f:
-        f.write(config_text)
+    write_file(daemon_file, config_text)
 
     return None
 
@@ -260,10 +259,7 @@ def apply(data):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print("VRRP error: {0}".format(str(e)))
         exit(1)
@@ -26,6 +26,7 @@ import vyos.defaults
 from vyos.config import Config
 from vyos import ConfigError
 from vyos.util import cmd
+from vyos.trace import run_phases
 
 vyos_conf_scripts_dir = vyos.defaults.directories['conf_mode']
 
@@ -132,10 +133,7 @@ def apply(vyos_cert):
 
 if __name__ == '__main__':
     try:
-        c = get_config()
-        verify(c)
-        generate(c)
-        apply(c)
+        run_phases(get_config, verify, generate, apply)
     except ConfigError as e:
         print(e)
         sys.exit(1)
@@ -26,6 +26,7 @@ from datetime import datetime
 from vyos.defaults import directories
 from vyos.configsession import ConfigSession, ConfigSessionError
 from vyos.configtree import ConfigTree
+from vyos.trace import add_span
 from vyos.util import cmd
 
 STATUS_FILE = '/tmp/vyos-config-status'
@@ -35,6 +36,10 @@ CFG_GROUP = 'vyattacfg'
 
 trace_config = False
 
+# number of conf_mode scripts run in parallel ahead of the commit,
+# None to leave all of them to the commit
+parallel_scripts = None
+
 if 'log' in directories:
     LOG_DIR = directories['log']
 else:
@@ -50,6 +55,12 @@ try:
     if 'vyos-config-debug' in cmdline:
         os.environ['VYOS_DEBUG'] = 'yes'
         trace_config = True
+    for option in cmdline.split():
+        # vyos-parallel-boot=1 runs the scripts one by one, in a fixed order
+        if option == 'vyos-parallel-boot':
+            parallel_scripts = os.cpu_count()
+        elif option.startswith('vyos-parallel-boot='):
+            parallel_scripts = int(option.split('=', 1)[1])
 except Exception as e:
     print('{0}'.format(e))
 
@@ -67,6 +78,30 @@ def trace_to_file(trace_file_name):
     except Exception as e:
         print('{0}'.format(e))
 
+def run_scripts_ahead(session_env, workers):
+    """
+    Run the conf_mode scripts of the loaded config in parallel, the commit
+    then only runs those which were not run or failed (see vyos.confscheduler)
+    """
+    from vyos import confscheduler
+    from vyos.config import Config
+
+    if os.path.lexists(confscheduler.results_dir):
+        return ('Not running conf_mode scripts ahead of the commit, {0} '
+                'already exists\n'.format(confscheduler.results_dir))
+    try:
+        time_begin = datetime.now()
+        jobs = confscheduler.plan(confscheduler.load_handlers(),
+                                  Config(session_env=session_env))
+        jobs = confscheduler.run(jobs, env=session_env, workers=workers)
+        confscheduler.save_results(jobs)
+        elapsed = (datetime.now() - time_begin).total_seconds()
+        return confscheduler.report(jobs, elapsed, workers)
+    except Exception as e:
+        # the commit runs all scripts as usual
+        confscheduler.clear_results()
+        return 'Failed to run conf_mode scripts ahead of the commit: {0}\n'.format(e)
+
 def failsafe(config_file_name):
     fail_msg = """
     !!!!!
@@ -135,10 +170,13 @@ if __name__ == '__main__':
             trace_to_file(TRACE_FILE)
         sys.exit(1)
 
+    schedule_out = ''
     try:
         time_begin_load = datetime.now()
         load_out = session.load_config(file_name)
         time_end_load = datetime.now()
+        if parallel_scripts:
+            schedule_out = run_scripts_ahead(env, parallel_scripts)
         time_begin_commit = datetime.now()
         commit_out = session.commit()
         time_end_commit = datetime.now()
@@ -151,10 +189,20 @@ if __name__ == '__main__':
             failsafe(default_file_name)
             trace_to_file(TRACE_FILE)
         sys.exit(1)
+    finally:
+        if parallel_scripts:
+            from vyos.confscheduler import clear_results
+            clear_results()
 
     time_elapsed_load = time_end_load - time_begin_load
     time_elapsed_commit = time_end_commit - time_begin_commit
 
+    # the scripts run by the commit record their spans themselves
+    add_span('config load', 'boot', time_begin_load.timestamp(),
+             time_elapsed_load.total_seconds())
+    add_span('config commit', 'boot', time_begin_commit.timestamp(),
+             time_elapsed_commit.total_seconds())
+
     try:
         if not os.path.exists(LOG_DIR):
             os.mkdir(LOG_DIR)
@@ -167,6 +215,7 @@ if __name__ == '__main__':
                     ''.format(time_end_load))
             f.write('Elapsed time for config load: {0}\n'
                     ''.format(time_elapsed_load))
+            f.write(schedule_out)
             f.write('{0}    Begin config commit\n'
                     ''.format(time_begin_commit))
             f.write(commit_out)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Summarize the commit trace written by vyos.trace: which conf_mode scripts,
+# and which of their phases, templates and commands, took the time of a commit.
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+from tabulate import tabulate
+
+from vyos.trace import trace_file
+
+
+def load(path):
+    spans = []
+    for name in [path + '.1', path]:
+        try:
+            with open(name, 'r') as f:
+                for line in f:
+                    try:
+                        spans.append(json.loads(line))
+                    except ValueError:
+                        # a line may be cut short if the disk filled up
+                        continue
+        except FileNotFoundError:
+            continue
+    return spans
+
+
+def timestamp(seconds):
+    return datetime.fromtimestamp(seconds).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def commits(spans):
+    """ Spans by commit, in order of the commit start """
+    result = {}
+    for span in spans:
+        if span['commit']:
+            result.setdefault(span['commit'], []).append(span)
+    return sorted(result.items(), key=lambda c: min(s['start'] for s in c[1]))
+
+
+def wall_time(spans):
+    return max(s['start'] + s['duration'] for s in spans) - min(s['start'] for s in spans)
+
+
+def table(spans, top, title, name):
+    rows = sorted(spans, key=lambda s: s['duration'], reverse=True)[:top]
+    if not rows:
+        return
+    print(title)
+    print(tabulate([[f'{s["duration"]:.3f}', name(s)[:90], s.get('error', '')] for s in rows],
+                   headers=['seconds', '', 'error'], tablefmt='simple',
+                   disable_numparse=True))
+    print()
+
+
+def summarize(commit, spans, boot, top):
+    scripts = [s for s in spans if s['kind'] == 'script']
+    start = min(s['start'] for s in spans)
+    print(f'Commit {commit} started {timestamp(start)}, {len(scripts)} scripts, '
+          f'{wall_time(spans):.2f}s from the first to the last span')
+
+    # the boot config loader records its load and commit itself
+    for span in boot:
+        if span['start'] <= start <= span['start'] + span['duration']:
+            print(f'Run at boot, {span["name"]} took {span["duration"]:.2f}s')
+    print()
+
+    total = sum(s['duration'] for s in scripts)
+    phases = sum(s['duration'] for s in spans if s['kind'] == 'phase')
+    print(f'{total:.2f}s in scripts, of which {total - phases:.2f}s outside of '
+          f'their phases (interpreter start, imports and exit)')
+    print()
+
+    table(scripts, top, 'Slowest scripts', lambda s: s['name'])
+    table([s for s in spans if s['kind'] == 'phase'], top, 'Slowest phases',
+          lambda s: f'{s["script"]} {s["name"]}')
+    table([s for s in spans if s['kind'] == 'render'], top, 'Slowest templates',
+          lambda s: f'{s["script"]} {s["name"]}')
+    table([s for s in spans if s['kind'] == 'command'], top, 'Slowest commands',
+          lambda s: f'{s["script"]}: {s.get("detail", s["name"])}')
+
+
+def chrome_trace(spans):
+    """ Convert spans to the Chrome trace event format (chrome://tracing) """
+    events = []
+    for span in spans:
+        events.append({
+            'name': span['name'] if span['kind'] != 'command' else span.get('detail', span['name']),
+            'cat': span['kind'],
+            'ph': 'X',
+            'ts': int(span['start'] * 1000000),
+            'dur': int(span['duration'] * 1000000),
+            'pid': span['pid'],
+            'tid': span['pid'],
+            'args': {'script': span['script']},
+        })
+    return {'traceEvents': events}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Show the slowest parts of a commit')
+    parser.add_argument('--file', default=trace_file(), help='commit trace to read')
+    parser.add_argument('--commit', default='last',
+                        help='commit ID to summarize, "last" (default) or "list"')
+    parser.add_argument('--top', type=int, default=10, help='rows per table')
+    parser.add_argument('--chrome', metavar='FILE',
+                        help='write the spans of the commit as a Chrome trace to FILE')
+    args = parser.parse_args()
+
+    if not args.file:
+        sys.exit('Commit tracing is disabled')
+
+    spans = load(args.file)
+    boot = [s for s in spans if s['kind'] == 'boot']
+    by_commit = commits(spans)
+    if not by_commit:
+        sys.exit('No commit found in the commit trace')
+
+    if args.commit == 'list':
+        print(tabulate([[commit, timestamp(min(s['start'] for s in spans)),
+                         len([s for s in spans if s['kind'] == 'script']),
+                         f'{wall_time(spans):.2f}']
+                        for commit, spans in by_commit],
+                       headers=['commit', 'started', 'scripts', 'seconds'],
+                       tablefmt='simple', disable_numparse=True))
+        sys.exit(0)
+
+    if args.commit == 'last':
+        commit, spans = by_commit[-1]
+    else:
+        spans = dict(by_commit).get(args.commit)
+        if not spans:
+            sys.exit(f'Commit {args.commit} not found in the commit trace')
+        commit = args.commit
+
+    if args.chrome:
+        with open(args.chrome, 'w') as f:
+            json.dump(chrome_trace(spans), f)
+
+    summarize(commit, spans, boot, args.top)
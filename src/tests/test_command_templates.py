@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import os
+import stat
+import tempfile
+import subprocess
+import importlib.util
+from importlib.machinery import SourceFileLoader
+from unittest import TestCase
+
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+CONVERTER = os.path.join(BASE, 'scripts', 'build-command-templates')
+HELPERS = os.path.join(BASE, 'src', 'helpers')
+
+
+def load_converter():
+    loader = SourceFileLoader('build_command_templates', CONVERTER)
+    module = importlib.util.module_from_spec(importlib.util.spec_from_loader('build_command_templates', loader))
+    loader.exec_module(module)
+    return module
+
+
+class TestOwnerAction(TestCase):
+    """ The end: action of a node runs its owner script, as the commit would """
+    def setUp(self):
+        self.converter = load_converter()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.script = os.path.join(self.tmp.name, 'script.py')
+        with open(self.script, 'w') as f:
+            f.write('#!/bin/sh\necho "run $VYOS_TAGNODE_VALUE"\n')
+        os.chmod(self.script, stat.S_IRWXU)
+
+    def run_end(self, env, tag=False):
+        props = {'owner': self.script}
+        if tag:
+            props['tag'] = True
+        node_def = self.converter.make_node_def(props)
+        action = [l for l in node_def.splitlines() if l.startswith('end: ')][0][len('end: '):]
+        # commits run the action as the config user, there is no sudo here
+        action = action.replace('sudo ', '').replace('$VAR(@)', 'eth0')
+        return subprocess.run(['sh', '-c', action], env=env, stdout=subprocess.PIPE,
+                              universal_newlines=True, check=True).stdout
+
+    def test_without_libexec_dir(self):
+        self.converter.schedule_results_dir = os.path.join(self.tmp.name, 'missing')
+        env = {'PATH': os.environ['PATH']}
+        self.assertEqual(self.run_end(env), 'run \n')
+        self.assertEqual(self.run_end(env, tag=True), 'run eth0\n')
+
+    def test_boot_commit(self):
+        # without results saved by this commit, the script is run
+        self.converter.schedule_results_dir = self.tmp.name
+        env = {'PATH': os.environ['PATH'], 'vyos_libexec_dir': HELPERS}
+        self.assertEqual(self.run_end(env, tag=True), 'run eth0\n')
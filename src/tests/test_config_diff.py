@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+from unittest import TestCase
+from unittest import mock
+
+from vyos.configdiff import ConfigDiff
+from vyos.configdiff import diff_dicts
+
+
+running = {
+    'interfaces': {
+        'ethernet': {
+            'eth0': {'address': ['192.0.2.1/24', '2001:db8::1/64'], 'mtu': '1500'},
+            'eth1': {'address': 'dhcp', 'disable': {}},
+        },
+    },
+    'system': {'host-name': 'vyos', 'name-server': '192.0.2.53'},
+}
+
+session = {
+    'interfaces': {
+        'ethernet': {
+            'eth0': {'address': ['192.0.2.1/24', '2001:db8::1/64'], 'mtu': '9000'},
+            'eth2': {'address': 'dhcp'},
+        },
+    },
+    'system': {'host-name': 'vyos', 'name-server': ['192.0.2.53', '198.51.100.53']},
+}
+
+
+class FakeConfig(object):
+    def __init__(self, level=[], in_session=True):
+        self._level = level
+        self._in_session = in_session
+
+    def get_level(self):
+        return self._level
+
+    def set_level(self, level):
+        self._level = level
+
+    def in_session(self):
+        return self._in_session
+
+    def get_snapshot_key(self):
+        return None
+
+    def get_config_dict(self, path=[], effective=False):
+        return running if effective else session
+
+
+class TestConfigDiff(TestCase):
+    def setUp(self):
+        patcher = mock.patch('vyos.configdiff.os.path.isfile', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_diff_dicts(self):
+        changes = diff_dicts(running, session)
+        self.assertCountEqual(changes, [
+            [['interfaces', 'ethernet', 'eth0', 'mtu'], ['1500'], ['9000']],
+            [['interfaces', 'ethernet', 'eth1', 'address'], ['dhcp'], None],
+            [['interfaces', 'ethernet', 'eth1', 'disable'], [], None],
+            [['interfaces', 'ethernet', 'eth2', 'address'], None, ['dhcp']],
+            [['system', 'name-server'], ['192.0.2.53'], ['192.0.2.53', '198.51.100.53']],
+        ])
+
+    def test_is_node_changed(self):
+        diff = ConfigDiff(FakeConfig())
+        self.assertTrue(diff.is_node_changed('interfaces ethernet eth0'))
+        self.assertTrue(diff.is_node_changed(['interfaces', 'ethernet', 'eth1']))
+        self.assertTrue(diff.is_node_changed('system name-server 198.51.100.53'))
+        self.assertTrue(diff.is_node_changed([]))
+        self.assertFalse(diff.is_node_changed('interfaces ethernet eth0 address'))
+        self.assertFalse(diff.is_node_changed('system host-name'))
+        self.assertFalse(diff.is_node_changed('service snmp'))
+
+    def test_relative_to_level(self):
+        diff = ConfigDiff(FakeConfig(level=['interfaces', 'ethernet']))
+        self.assertTrue(diff.is_node_changed('eth2'))
+        self.assertFalse(diff.is_node_changed('eth0 address'))
+
+        changes = diff.get_changes('eth1')
+        self.assertEqual(changes['added'], [])
+        self.assertCountEqual(changes['removed'], [(['address'], ['dhcp']), (['disable'], [])])
+        self.assertEqual(diff.get_changes('eth0')['modified'], [(['mtu'], (['1500'], ['9000']))])
+
+    def test_everything_changed_outside_session(self):
+        diff = ConfigDiff(FakeConfig(in_session=False))
+        self.assertTrue(diff.is_node_changed('system host-name'))
+        self.assertTrue(diff.is_node_changed('service snmp'))
+        self.assertIn((['host-name'], ['vyos']), diff.get_changes('system')['added'])
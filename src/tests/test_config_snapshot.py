@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import vyos.configsnapshot as snapshot
+
+
+class TestConfigSnapshot(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.changes = os.path.join(self.tmp.name, 'changes')
+        self.active = os.path.join(self.tmp.name, 'active')
+        os.makedirs(os.path.join(self.changes, 'system'))
+        os.makedirs(os.path.join(self.active, 'system'))
+        self.env = {'VYATTA_CHANGES_ONLY_DIR': self.changes,
+                    'VYATTA_ACTIVE_CONFIGURATION_DIR': self.active}
+        dirs = {'config_snapshot': os.path.join(self.tmp.name, 'snapshots')}
+        self.patcher = mock.patch.dict(snapshot.directories, dirs)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def test_no_session(self):
+        self.assertIsNone(snapshot.key({}))
+
+    def test_disabled(self):
+        self.env['VYOS_CONFIG_SNAPSHOT'] = 'off'
+        self.assertIsNone(snapshot.key(self.env))
+
+    def test_key_is_stable(self):
+        self.assertEqual(snapshot.key(self.env), snapshot.key(self.env))
+
+    def test_key_changes_with_session(self):
+        before = snapshot.key(self.env)
+        os.makedirs(os.path.join(self.changes, 'system', 'host-name'))
+        self.assertNotEqual(before, snapshot.key(self.env))
+
+    def test_store_load(self):
+        key = snapshot.key(self.env)
+        snapshot.store(key, 'running', 'session')
+        self.assertEqual(snapshot.load(key), {'running': 'running', 'session': 'session'})
+
+    def test_store_is_private(self):
+        key = snapshot.key(self.env)
+        snapshot.store(key, 'running', 'session')
+        snapshot_dir = snapshot.directories['config_snapshot']
+        self.assertEqual(os.stat(snapshot_dir).st_mode & 0o777, 0o750)
+        for name in os.listdir(snapshot_dir):
+            self.assertEqual(os.stat(os.path.join(snapshot_dir, name)).st_mode & 0o777, 0o640)
+
+    def test_store_removes_old_generations(self):
+        old_key = snapshot.key(self.env)
+        snapshot.store(old_key, 'running', 'session')
+        os.makedirs(os.path.join(self.changes, 'system', 'host-name'))
+        new_key = snapshot.key(self.env)
+        snapshot.store(new_key, 'running', 'session2')
+        self.assertIsNone(snapshot.load(old_key))
+        self.assertEqual(snapshot.load(new_key)['session'], 'session2')
+
+    def test_active_generation_changes_with_commit(self):
+        node = os.path.join(self.active, 'system', 'host-name')
+        os.makedirs(node)
+        with open(os.path.join(node, 'node.val'), 'w') as f:
+            f.write('vyos\n')
+        before = snapshot.active_generation(self.active)
+        self.assertEqual(before, snapshot.active_generation(self.active))
+
+        with open(os.path.join(node, 'node.val'), 'w') as f:
+            f.write('r1\n')
+        os.utime(os.path.join(node, 'node.val'), ns=(0, 0))
+        self.assertNotEqual(before, snapshot.active_generation(self.active))
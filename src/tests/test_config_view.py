@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+from unittest import TestCase
+
+from vyos.config import ConfigView
+
+
+class TestConfigView(TestCase):
+    def setUp(self):
+        base = ['interfaces', 'ethernet', 'eth0']
+        session = {
+            'address': ['192.0.2.1/24', '2001:db8::1/64'],
+            'description': 'uplink',
+            'disable-link-detect': {},
+            'ip': {'arp-cache-timeout': '60'},
+            'vif': {'10': {'address': '198.51.100.1/24'}, '20': {}}
+        }
+        running = {
+            'address': '192.0.2.1/24',
+            'vif': {'10': {}, '30': {}}
+        }
+        self.view = ConfigView(base, session, running)
+
+    def test_exists(self):
+        self.assertTrue(self.view.exists('description'))
+        self.assertTrue(self.view.exists('disable-link-detect'))
+        self.assertTrue(self.view.exists(['ip', 'arp-cache-timeout']))
+        self.assertTrue(self.view.exists(['ip arp-cache-timeout']))
+        self.assertFalse(self.view.exists('mtu'))
+
+    def test_exists_value(self):
+        self.assertTrue(self.view.exists('address 192.0.2.1/24'))
+        self.assertTrue(self.view.exists('description uplink'))
+        self.assertFalse(self.view.exists('address 192.0.2.2/24'))
+
+    def test_return_value(self):
+        self.assertEqual(self.view.return_value('description'), 'uplink')
+        self.assertEqual(self.view.return_value('ip arp-cache-timeout'), '60')
+        self.assertEqual(self.view.return_value('mtu', '1500'), '1500')
+        self.assertIsNone(self.view.return_value('disable-link-detect'))
+
+    def test_return_values(self):
+        self.assertEqual(self.view.return_values('address'),
+                         ['192.0.2.1/24', '2001:db8::1/64'])
+        self.assertEqual(self.view.return_effective_values('address'), ['192.0.2.1/24'])
+        self.assertEqual(self.view.return_values('mac'), [])
+
+    def test_list_nodes(self):
+        self.assertEqual(self.view.list_nodes('vif'), ['10', '20'])
+        self.assertEqual(self.view.list_effective_nodes('vif'), ['10', '30'])
+        self.assertEqual(self.view.list_nodes('vif-s'), [])
+
+    def test_level(self):
+        self.view.set_level(['interfaces', 'ethernet', 'eth0', 'vif', '10'])
+        self.assertEqual(self.view.get_level()[-2], 'vif')
+        self.assertEqual(self.view.return_value('address'), '198.51.100.1/24')
+        self.assertTrue(self.view.exists_effective([]))
+
+    def test_outside_of_view(self):
+        with self.assertRaises(ValueError):
+            self.view.set_level('system')
+            self.view.exists('host-name')
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import os
+import json
+import tempfile
+import threading
+import importlib.util
+from importlib.machinery import SourceFileLoader
+from unittest import TestCase, mock
+
+import zmq
+
+from vyos import configd_client
+from vyos.configtree import ConfigTree
+from vyos.configtree import ConfigTreeError
+
+DAEMON = os.path.join(os.path.dirname(__file__), '..', 'services', 'vyos-configd')
+
+RUNNING = 'system {\n    host-name vyos\n}\n'
+SESSION = 'system {\n    host-name router\n    name-server 192.0.2.1\n}\n'
+
+
+def load_daemon():
+    loader = SourceFileLoader('vyos_configd', DAEMON)
+    module = importlib.util.module_from_spec(importlib.util.spec_from_loader('vyos_configd', loader))
+    loader.exec_module(module)
+    return module
+
+
+class TestConfigd(TestCase):
+    """ Round trips between RemoteConfigTree and the request handler of vyos-configd """
+    def setUp(self):
+        self.daemon = load_daemon()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        path = 'ipc://' + os.path.join(self.tmp.name, 'configd.sock')
+
+        context = zmq.Context.instance()
+        self.server = context.socket(zmq.REP)
+        self.server.bind(path)
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+        patcher = mock.patch.object(configd_client, 'SOCKET_PATH', path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = configd_client.Client()
+        self.loads = 0
+
+    def tearDown(self):
+        self.client._communicate({'op': 'stop', 'key': ''})
+        self.thread.join()
+        self.server.close()
+
+    def serve(self):
+        while True:
+            message = self.server.recv().decode()
+            # sent by tearDown, the daemon has no such request
+            if json.loads(message)['op'] == 'stop':
+                self.server.send(b'{"data": null}')
+                return
+            self.server.send(json.dumps(self.daemon.handle_request(message)).encode())
+
+    def loader(self):
+        self.loads += 1
+        return RUNNING, SESSION
+
+    def tree(self, name):
+        return configd_client.RemoteConfigTree(self.client, 'key-1', name, self.loader)
+
+    def test_query(self):
+        session = self.tree('session')
+        # the daemon does not know the snapshot yet, the tree loads it
+        self.assertTrue(session.exists(['system', 'name-server']))
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(session.return_value(['system', 'host-name']), 'router')
+        self.assertEqual(self.tree('running').return_value(['system', 'host-name']), 'vyos')
+        self.assertEqual(self.loads, 1)
+        self.assertRaises(ConfigTreeError, session.list_nodes, ['interfaces'])
+
+    def test_to_commands(self):
+        running = self.tree('running')
+        self.assertEqual(running.to_commands(), ConfigTree(RUNNING).to_commands())
+        self.assertEqual(running.to_string(), ConfigTree(RUNNING).to_string())
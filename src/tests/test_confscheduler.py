@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from vyos import confscheduler
+from vyos.confscheduler import Job
+
+
+def handler(path, script, priority=None, tag=False, detached=False, depends=[]):
+    return {'path': path.split(), 'script': script, 'tag': tag,
+            'priority': priority, 'detached': detached, 'depends': depends}
+
+
+class FakeConfig(object):
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def exists(self, path):
+        return ' '.join(path) in self.nodes
+
+    def list_nodes(self, path):
+        return self.nodes[' '.join(path)]
+
+
+class TestConfScheduler(TestCase):
+    def setUp(self):
+        self.handlers = [
+            handler('interfaces ethernet', 'interfaces-ethernet.py', 318, tag=True, detached=True),
+            handler('service ntp', 'ntp.py', 400, detached=True),
+            handler('service snmp', 'snmp.py', 980, detached=True),
+            handler('service dns forwarding', 'dns_forwarding.py', 950, detached=True,
+                    depends=['system name-server']),
+            handler('system name-server', 'host_name.py'),
+            handler('system ipv6', 'system-ipv6.py'),
+        ]
+        self.config = FakeConfig({
+            'interfaces ethernet': ['eth1', 'eth0'],
+            'service ntp': [],
+            'service snmp': [],
+            'service dns forwarding': [],
+            'system name-server': [],
+        })
+
+    def jobs(self):
+        return {job.name: job for job in confscheduler.plan(self.handlers, self.config)}
+
+    def test_plan(self):
+        names = [job.name for job in confscheduler.plan(self.handlers, self.config)]
+        self.assertEqual(names, ['interfaces-ethernet.py@eth0', 'interfaces-ethernet.py@eth1',
+                                 'ntp.py', 'dns_forwarding.py', 'snmp.py', 'host_name.py'])
+
+    def test_dependencies(self):
+        jobs = self.jobs()
+        deps = confscheduler.dependencies(list(jobs.values()))
+        eth0, eth1 = jobs['interfaces-ethernet.py@eth0'], jobs['interfaces-ethernet.py@eth1']
+        self.assertEqual(deps[eth0], set())
+        self.assertEqual(deps[eth1], {eth0})
+        # services follow the interfaces, not each other
+        self.assertEqual(deps[jobs['ntp.py']], {eth1})
+        self.assertEqual(deps[jobs['snmp.py']], {eth1})
+        self.assertEqual(deps[jobs['dns_forwarding.py']], {eth1, jobs['host_name.py']})
+
+    def test_job_name(self):
+        job = Job(handler('interfaces ethernet', 'interfaces-ethernet.py', tag=True), 'a/b%c')
+        self.assertEqual(job.name, 'interfaces-ethernet.py@a%2Fb%25c')
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = os.path.join(tmp, 'log')
+            for script in ['interfaces-ethernet.py', 'ntp.py', 'snmp.py',
+                           'dns_forwarding.py', 'host_name.py']:
+                status = 1 if script == 'host_name.py' else 0
+                path = os.path.join(tmp, script)
+                with open(path, 'w') as f:
+                    f.write('#!/bin/sh\n'
+                            f'echo "{script}$VYOS_TAGNODE_VALUE" >> {log}\n'
+                            f'echo "$VYOS_COMMIT_ID" >> {log}.commit\n'
+                            f'echo ran {script}\n'
+                            f'exit {status}\n')
+                os.chmod(path, 0o755)
+
+            with mock.patch.dict(confscheduler.directories, {'conf_mode': tmp}):
+                jobs = confscheduler.run(confscheduler.plan(self.handlers, self.config))
+
+            with open(log) as f:
+                ran = f.read().split()
+            self.assertEqual(ran, ['interfaces-ethernet.pyeth0', 'interfaces-ethernet.pyeth1',
+                                   'ntp.py', 'snmp.py', 'host_name.py'])
+            self.assertEqual([job.name for job in jobs if job.status], ['host_name.py'])
+            with open(log + '.commit') as f:
+                self.assertEqual(set(f.read().split()), {f'boot-{confscheduler.process_id()}'})
+
+            # the commit runs the failed script and what depends on it
+            results = os.path.join(tmp, 'results')
+            confscheduler.save_results(jobs, results)
+            self.assertEqual(sorted(os.listdir(results)),
+                             ['.owner', 'interfaces-ethernet.py@eth0', 'interfaces-ethernet.py@eth1',
+                              'ntp.py', 'snmp.py'])
+            with open(os.path.join(results, 'ntp.py')) as f:
+                self.assertEqual(f.read(), 'ran ntp.py\n')
+            self.assertEqual(os.stat(results).st_mode & 0o777, 0o700)
+            with open(os.path.join(results, confscheduler.owner_file)) as f:
+                self.assertEqual(f.read(), confscheduler.process_id())
+            # results left by another run are not used
+            self.assertRaises(FileExistsError, confscheduler.save_results, jobs, results)
+            confscheduler.clear_results(results)
+            self.assertFalse(os.path.exists(results))
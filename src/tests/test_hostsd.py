@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import os
+import json
+import tempfile
+import importlib.util
+from importlib.machinery import SourceFileLoader
+from unittest import TestCase
+
+DAEMON = os.path.join(os.path.dirname(__file__), '..', 'services', 'vyos-hostsd')
+
+
+def load_daemon():
+    loader = SourceFileLoader('vyos_hostsd', DAEMON)
+    module = importlib.util.module_from_spec(importlib.util.spec_from_loader('vyos_hostsd', loader))
+    loader.exec_module(module)
+    return module
+
+
+class TestHostsd(TestCase):
+    def setUp(self):
+        self.daemon = load_daemon()
+        self.daemon.logger.disabled = True
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def request(self, msg):
+        return self.daemon.handle_message(json.dumps(msg))
+
+    def test_batch(self):
+        result, changed = self.request({'op': 'batch', 'data': [
+            {'type': 'name_servers', 'op': 'add', 'tag': 'static', 'data': ['192.0.2.1']},
+            {'type': 'name_servers', 'op': 'get', 'tag': 'static'},
+        ]})
+        self.assertEqual(result, [None, ['192.0.2.1']])
+        self.assertTrue(changed)
+
+        result, changed = self.request({'type': 'name_servers', 'op': 'get', 'tag': 'static'})
+        self.assertEqual(result, ['192.0.2.1'])
+        self.assertFalse(changed)
+
+    def test_failed_batch_is_not_applied(self):
+        self.request({'type': 'name_servers', 'op': 'add', 'tag': 'static', 'data': ['192.0.2.1']})
+        state = json.loads(json.dumps(self.daemon.STATE))
+
+        with self.assertRaises(ValueError):
+            self.request({'op': 'batch', 'data': [
+                {'type': 'name_servers', 'op': 'delete', 'tag': 'static'},
+                {'type': 'hosts', 'op': 'add', 'tag': 'static', 'data': [{'host': 'router', 'address': '192.0.2.2', 'aliases': []}]},
+                {'type': 'bogus', 'op': 'add', 'tag': 'static', 'data': []},
+            ]})
+        self.assertEqual(self.daemon.STATE, state)
+
+    def test_write_if_changed(self):
+        path = os.path.join(self.tmp.name, 'hosts')
+        self.assertTrue(self.daemon.write_if_changed(path, 'one\n'))
+        self.assertFalse(self.daemon.write_if_changed(path, 'one\n'))
+
+        # the file is compared as it is on disk, not as it was last written
+        with open(path, 'w') as f:
+            f.write('edited\n')
+        self.assertTrue(self.daemon.write_if_changed(path, 'one\n'))
+        with open(path) as f:
+            self.assertEqual(f.read(), 'one\n')
+
+        os.unlink(path)
+        self.assertTrue(self.daemon.write_if_changed(path, 'one\n'))
+        self.assertTrue(os.path.exists(path))
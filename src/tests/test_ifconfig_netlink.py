@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import socket
+import struct
+from unittest import TestCase
+from unittest import mock
+
+from vyos.ifconfig import netlink
+
+
+class TestNetlink(TestCase):
+    def setUp(self):
+        self.requests = []
+        patches = [
+            mock.patch('vyos.ifconfig.netlink._request',
+                       lambda kind, payload, flags=0: self.requests.append((kind, payload, flags))),
+            mock.patch('vyos.ifconfig.netlink.socket.if_nametoindex', lambda name: 7),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_attributes_are_aligned(self):
+        attr = netlink._attr(netlink.IFLA_IFNAME, 'eth0.10')
+        self.assertEqual(attr, struct.pack('=HH', 12, netlink.IFLA_IFNAME) + b'eth0.10\0')
+        attr = netlink._attr(netlink.IFLA_IFNAME, 'eth0')
+        self.assertEqual(len(attr), 12)
+        self.assertEqual(struct.unpack_from('=H', attr)[0], 9)
+
+    def test_add_vlan(self):
+        netlink.add_vlan('eth0', 'eth0.10', 10, '802.1ad', egress_qos='1:2')
+        kind, payload, flags = self.requests[0]
+        self.assertEqual(kind, netlink.RTM_NEWLINK)
+        self.assertEqual(flags, netlink.NLM_F_CREATE | netlink.NLM_F_EXCL)
+        # A new interface has no index yet
+        self.assertEqual(netlink._ifinfomsg.unpack_from(payload)[2], 0)
+        self.assertIn(netlink._attr(netlink.IFLA_LINK, struct.pack('=I', 7)), payload)
+        self.assertIn(netlink._attr(netlink.IFLA_VLAN_PROTOCOL, b'\x88\xa8'), payload)
+        self.assertIn(struct.pack('=II', 1, 2), payload)
+
+    def test_addr(self):
+        netlink.add_addr('eth0', '2001:db8::1/64')
+        kind, payload, _ = self.requests[0]
+        self.assertEqual(kind, netlink.RTM_NEWADDR)
+        family, prefixlen, _, _, index = netlink._ifaddrmsg.unpack_from(payload)
+        self.assertEqual((family, prefixlen, index), (socket.AF_INET6, 64, 7))
+        self.assertIn(netlink._attr(netlink.IFA_LOCAL, socket.inet_pton(socket.AF_INET6, '2001:db8::1')), payload)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import os
+import tempfile
+from unittest import TestCase
+from unittest import mock
+
+from vyos import validate
+from vyos.validate import AddressSnapshot
+
+from vyos.ifconfig import Interface
+
+
+class TestInterfaceApply(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        base = self.tmpdir.name
+
+        class FakeIf(Interface):
+            _sysfs_get = {
+                'alias': {'location': base + '/{ifname}.alias'},
+                'mtu': {'location': base + '/{ifname}.mtu'},
+            }
+            _sysfs_set = {
+                'alias': {
+                    'convert': lambda name: name if name else '\0',
+                    'location': base + '/{ifname}.alias',
+                },
+                'mtu': {'location': base + '/{ifname}.mtu'},
+                'arp_cache_tmo': {
+                    'convert': lambda tmo: (int(tmo) * 1000),
+                    'location': base + '/{ifname}.tmo',
+                },
+                'link_detect': {'location': base + '/{ifname}.missing'},
+            }
+
+        # skip __init__, there is no such interface in sysfs
+        self.intf = FakeIf.__new__(FakeIf)
+        self.intf.config = {'ifname': 'eth0'}
+        self.intf.debug = ''
+        self.intf.netlink = False
+
+        self.write('alias', '')
+        self.write('mtu', '1500')
+        self.write('tmo', '30000')
+
+    def write(self, name, value):
+        with open(os.path.join(self.tmpdir.name, f'eth0.{name}'), 'w') as f:
+            f.write(value + '\n')
+
+    def read(self, name):
+        with open(os.path.join(self.tmpdir.name, f'eth0.{name}'), 'r') as f:
+            return f.read()
+
+    def test_get_state(self):
+        state = self.intf.get_state(['mtu', 'arp_cache_tmo', 'link_detect'])
+        self.assertEqual(state, {'mtu': '1500', 'arp_cache_tmo': '30000', 'link_detect': None})
+
+    def test_unchanged_state_is_not_written(self):
+        state = {'alias': '', 'mtu': 1500, 'arp_cache_tmo': 30}
+        self.assertEqual(self.intf.apply(state), {})
+        self.assertEqual(self.read('mtu'), '1500\n')
+
+    def test_only_changes_are_written(self):
+        changed = self.intf.apply({'alias': 'uplink', 'mtu': 1500, 'arp_cache_tmo': 40})
+        self.assertEqual(changed, {'alias': ('', 'uplink'), 'arp_cache_tmo': ('30000', 40)})
+        self.assertEqual(self.read('alias'), 'uplink')
+        self.assertEqual(self.read('tmo'), '40000')
+        self.assertEqual(self.read('mtu'), '1500\n')
+
+    def test_unsupported_settings_are_not_reported(self):
+        self.assertEqual(self.intf.apply({'link_detect': 1}), {})
+
+    def test_stale_address_is_added(self):
+        self.intf._addr = []
+        snapshot = AddressSnapshot([('eth0', '2001:db8::1/64')])
+        with mock.patch.object(validate, '_address_snapshot', snapshot), \
+             mock.patch.object(self.intf, 'set_interface') as set_interface, \
+             mock.patch('vyos.ifconfig.netlink.get_addrs', return_value=[]):
+            # the kernel dropped the address when the MTU went below 1280
+            self.intf.add_addr('2001:db8::1/64')
+        set_interface.assert_called_once_with('add_addr', '2001:db8::1/64')
+        self.assertTrue(snapshot.is_intf_addr_assigned('eth0', '2001:db8::1/64'))
+
+    def test_mtu_change_refreshes_addresses(self):
+        snapshot = AddressSnapshot([('eth0', '2001:db8::1/64'), ('eth0', '192.0.2.1/24')])
+        with mock.patch.object(validate, '_address_snapshot', snapshot), \
+             mock.patch('vyos.ifconfig.netlink.get_addrs',
+                        return_value=[('eth0', '192.0.2.1/24')]) as get_addrs:
+            self.intf.apply({'mtu': 1200})
+        get_addrs.assert_called_once_with('eth0')
+        self.assertFalse(snapshot.is_addr_assigned('2001:db8::1'))
+        self.assertTrue(snapshot.is_addr_assigned('192.0.2.1'))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import socket
+import struct
+from unittest import TestCase
+
+from vyos.ifconfig import netlink
+from vyos.ifconfig import stats
+
+
+def counters(rx_bytes, tx_bytes, rx_packets, tx_packets):
+    return {'rx_bytes': rx_bytes, 'tx_bytes': tx_bytes,
+            'rx_packets': rx_packets, 'tx_packets': tx_packets}
+
+
+class TestStats(TestCase):
+    def test_link_stats_are_decoded(self):
+        values = list(range(1, 25))
+        body = netlink._ifinfomsg.pack(socket.AF_UNSPEC, 0, 2, 0, 0)
+        body += netlink._attr(netlink.IFLA_IFNAME, 'eth0')
+        body += netlink._attr(netlink.IFLA_STATS64, struct.pack('=24Q', *values))
+
+        ifname, counters = netlink._link_stats(body)
+        self.assertEqual(ifname, 'eth0')
+        self.assertEqual(counters['rx_packets'], 1)
+        self.assertEqual(counters['rx_bytes'], 3)
+        self.assertEqual(counters['rx_over_errors'], 12)
+        self.assertEqual(counters['rx_nohandler'], 24)
+
+    def test_rates(self):
+        first = stats.Sample({'eth0': counters(1000, 2000, 10, 20),
+                              'eth1': counters(500, 500, 5, 5)}, timestamp=10.0)
+        second = stats.Sample({'eth0': counters(3000, 2000, 30, 20),
+                               'eth1': counters(100, 500, 1, 5),
+                               'eth2': counters(100, 100, 1, 1)}, timestamp=12.0)
+
+        rates = stats.rates(first, second)
+        self.assertEqual(rates['eth0'], {'rx_bps': 8000.0, 'tx_bps': 0.0, 'rx_pps': 10.0, 'tx_pps': 0.0})
+        # eth1 was re-created, eth2 is new
+        self.assertEqual(rates['eth1']['rx_bps'], 400.0)
+        self.assertNotIn('eth2', rates)
+
+        with self.assertRaises(ValueError):
+            stats.rates(second, second)
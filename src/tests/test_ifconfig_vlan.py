@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+from unittest import TestCase
+from unittest import mock
+
+from vyos import ConfigError
+from vyos import ifconfig_vlan
+
+
+class FakeIf(object):
+    def __init__(self, ifname, log, fail=[]):
+        self.config = {'ifname': ifname}
+        self.log = log
+        self.fail = fail
+
+    def add_vlan(self, vlan_id, ethertype='', ingress_qos='', egress_qos=''):
+        ifname = f'{self.config["ifname"]}.{vlan_id}'
+        if ifname in self.fail:
+            raise OSError(f'failed to create {ifname}')
+        self.log.append(('add', ifname))
+        return FakeIf(ifname, self.log, self.fail)
+
+    def del_vlan(self, vlan_id):
+        self.log.append(('del', f'{self.config["ifname"]}.{vlan_id}'))
+
+
+def vif(vlan_id, **kargs):
+    return dict(id=str(vlan_id), **kargs)
+
+
+class TestApplyVlans(TestCase):
+    def setUp(self):
+        self.log = []
+        patch = mock.patch('vyos.ifconfig_vlan.apply_vlan_config',
+                           lambda vlan, config: {'mtu': ('1500', config['id'])})
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def config(self):
+        return {
+            'vif_s': [vif(100, ethertype='802.1ad', vif_c_remove=['5'],
+                          vif_c=[vif(10), vif(20)])],
+            'vif_s_remove': ['200'],
+            'vif': [vif(i) for i in range(1, 20)],
+            'vif_remove': ['30'],
+        }
+
+    def test_parents_before_children(self):
+        changes = ifconfig_vlan.apply_vlans(FakeIf('eth0', self.log), self.config(), workers=4)
+
+        self.assertEqual(len(changes), 19 + 1 + 2)
+        self.assertEqual(changes['eth0.100.20'], {'mtu': ('1500', '20')})
+        # removals first, service VLAN before its client VLANs
+        self.assertEqual(set(self.log[:2]), {('del', 'eth0.200'), ('del', 'eth0.30')})
+        parent = self.log.index(('add', 'eth0.100'))
+        self.assertLess(parent, self.log.index(('del', 'eth0.100.5')))
+        self.assertLess(parent, self.log.index(('add', 'eth0.100.10')))
+        self.assertLess(parent, self.log.index(('add', 'eth0.100.20')))
+
+    def test_serial(self):
+        changes = ifconfig_vlan.apply_vlans(FakeIf('eth0', self.log), self.config(), workers=1)
+        self.assertEqual(len(changes), 22)
+
+    def test_errors_are_aggregated(self):
+        intf = FakeIf('eth0', self.log, fail=['eth0.3', 'eth0.100'])
+        with self.assertRaises(ConfigError) as e:
+            ifconfig_vlan.apply_vlans(intf, self.config(), workers=4)
+
+        message = str(e.exception)
+        self.assertIn('eth0.3: failed to create eth0.3', message)
+        self.assertIn('eth0.100: failed to create eth0.100', message)
+        # all other VLANs are still set up, the client VLANs of
+        # the failed service VLAN are skipped
+        self.assertEqual(len([l for l in self.log if l[0] == 'add']), 18)
+        self.assertNotIn(('add', 'eth0.100.10'), self.log)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import os
+import sys
+import tempfile
+from unittest import TestCase, mock
+
+import vyos.migrator
+from vyos.configtree import ConfigTree
+
+# in-process script, renames the host
+IN_PROCESS = '''
+def migrate(config):
+    config.set(['system', 'host-name'], value='{0}', replace=True)
+'''
+
+# old style script, works on the file when run
+SUBPROCESS = '''#!{0}
+import sys
+with open(sys.argv[1]) as f:
+    config = f.read()
+with open(sys.argv[1], 'w') as f:
+    f.write(config.replace('{1}', '{2}'))
+'''
+
+
+class TestMigrator(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        dirs = {'migrate': os.path.join(self.tmp.name, 'migrate'),
+                'config': self.tmp.name}
+        patch = mock.patch.dict(vyos.defaults.directories, dirs)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        self.config_file = os.path.join(self.tmp.name, 'config.boot')
+        with open(self.config_file, 'w') as f:
+            f.write('system {\n    host-name vyos\n}\n')
+
+    def script(self, component, name, source, executable=False):
+        path = os.path.join(self.tmp.name, 'migrate', component, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(source)
+        if executable:
+            os.chmod(path, 0o755)
+
+    def host_name(self):
+        with open(self.config_file) as f:
+            return ConfigTree(f.read()).return_value(['system', 'host-name'])
+
+    def test_chain(self):
+        self.script('system', '0-to-1', IN_PROCESS.format('one'))
+        self.script('system', '1-to-2', SUBPROCESS.format(sys.executable, 'one', 'two'),
+                    executable=True)
+        self.script('system', '2-to-3', IN_PROCESS.format('three'))
+        # no 3-to-4, nothing to migrate
+        self.script('system', '4-to-5', IN_PROCESS.format('five'))
+
+        migrator = vyos.migrator.Migrator(self.config_file)
+        written = []
+        write_config = migrator.write_config
+        with mock.patch.object(migrator, 'write_config',
+                               lambda config: written.append(1) or write_config(config)):
+            versions = migrator.run_migration_scripts({'system': 0}, {'system': 5})
+
+        self.assertEqual(versions, {'system': 5})
+        self.assertEqual(self.host_name(), 'five')
+        # before the old style script and at the end
+        self.assertEqual(len(written), 2)
+
+    def test_no_entry_point(self):
+        self.script('system', '0-to-1', SUBPROCESS.format(sys.executable, 'vyos', 'one'))
+        path = os.path.join(self.tmp.name, 'migrate', 'system', '0-to-1')
+        self.assertIsNone(vyos.migrator.load_migrate_function(path))
+
+    def test_migrate_file(self):
+        self.script('system', '0-to-1', IN_PROCESS.format('one'))
+        path = os.path.join(self.tmp.name, 'migrate', 'system', '0-to-1')
+        vyos.migrator.migrate_file(self.config_file,
+                                   vyos.migrator.load_migrate_function(path))
+        self.assertEqual(self.host_name(), 'one')
+
+    def test_migrate_file_unchanged(self):
+        os.utime(self.config_file, (0, 0))
+        vyos.migrator.migrate_file(self.config_file, lambda config: None)
+        self.assertEqual(os.stat(self.config_file).st_mtime, 0)
+        self.assertEqual(self.host_name(), 'vyos')
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import os
+import json
+from unittest import TestCase
+from unittest import mock
+
+from vyos import configtree
+from vyos.configtree import ConfigTreeError
+from vyos.pyconfigtree import PyConfigTree
+
+
+class TestPyConfigTree(TestCase):
+    def setUp(self):
+        with open('tests/data/config.valid', 'r') as f:
+            self.config = PyConfigTree(f.read())
+
+    def test_round_trip(self):
+        config_string = self.config.to_string()
+        self.assertEqual(PyConfigTree(config_string).to_string(), config_string)
+        self.assertIn('// Trailing comment', config_string)
+
+    def test_json_ast(self):
+        tree = PyConfigTree.from_json_ast(self.config.to_json_ast())
+        self.assertEqual(tree.to_json(), self.config.to_json())
+        self.assertTrue(tree.is_tag(["top-level-tag-node"]))
+
+    def test_to_json(self):
+        config = json.loads(self.config.to_json())
+        self.assertEqual(config['top-level-leaf-node'], 'foo')
+        self.assertEqual(config['top-level-valueless-node'], {})
+        self.assertEqual(config['top-level-tag-node']['bar'],
+                         {'top-level-tag-node-child': 'another-value'})
+
+    def test_multi_values(self):
+        path = ["normal-node", "normal-node-child", "multi-node"]
+        self.config.set(path, value="value2", replace=False)
+        self.assertEqual(self.config.return_values(path), ["value1", "value2"])
+        self.config.delete_value(path, "value1")
+        self.assertEqual(self.config.return_values(path), ["value2"])
+
+    def test_return_value_errors(self):
+        with self.assertRaises(ConfigTreeError):
+            self.config.return_value(["top-level-valueless-node"])
+        with self.assertRaises(ConfigTreeError):
+            self.config.return_value(["no-such-node"])
+
+    def test_delete(self):
+        self.config.delete(["top-level-tag-node", "foo"])
+        self.assertFalse(self.config.exists(["top-level-tag-node", "foo", "top-level-tag-node-child"]))
+        self.assertEqual(self.config.list_nodes(["top-level-tag-node"]), ["bar"])
+
+    def test_rename_keeps_order(self):
+        self.config.rename(["top-level-tag-node", "foo"], "quux")
+        self.assertEqual(self.config.list_nodes(["top-level-tag-node"]), ["quux", "bar"])
+        self.assertTrue(self.config.exists(["top-level-tag-node", "quux", "top-level-tag-node-child"]))
+
+    def test_copy_is_independent(self):
+        self.config.copy(["top-level-tag-node", "bar"], ["top-level-tag-node", "baz"])
+        self.config.set(["top-level-tag-node", "baz", "top-level-tag-node-child"], value="new")
+        self.assertEqual(self.config.return_value(["top-level-tag-node", "bar", "top-level-tag-node-child"]),
+                         "another-value")
+
+    def test_quoting(self):
+        self.config.set(["system", "login", "banner"], value='say "hi" \\o/')
+        tree = PyConfigTree(self.config.to_string())
+        self.assertEqual(tree.return_value(["system", "login", "banner"]), 'say "hi" \\o/')
+
+    def test_syntax_error(self):
+        with self.assertRaises(ValueError):
+            PyConfigTree("interfaces {\n ethernet eth0 {\n}\n")
+
+    def test_backend(self):
+        with mock.patch.dict(os.environ, {'VYOS_CONFIGTREE': 'python'}):
+            self.assertTrue(configtree._use_python_backend())
+
+        # falling back silently would hide a broken installation
+        with mock.patch.dict(os.environ, {'VYOS_CONFIGTREE': ''}), \
+             mock.patch.object(configtree, 'LIBPATH', '/nonexistent/libvyosconfig.so.0'):
+            with self.assertWarns(RuntimeWarning):
+                self.assertTrue(configtree._use_python_backend())
+
+        with mock.patch.object(configtree, '_python_backend', True):
+            self.assertIsInstance(configtree.ConfigTree('system {\n}\n'), PyConfigTree)
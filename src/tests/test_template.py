@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import os
+import tempfile
+from unittest import TestCase
+
+import vyos.template
+from vyos.defaults import directories
+
+
+class TestTemplate(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        templates = os.path.join(self.tmp.name, 'templates')
+        os.makedirs(os.path.join(templates, 'test'))
+        with open(os.path.join(templates, 'test', 'list.tmpl'), 'w') as f:
+            f.write('{% for i in items %}\n{{ i }}\n{% endfor %}\n')
+
+        self.saved = dict(directories)
+        self.addCleanup(directories.update, self.saved)
+        directories['templates'] = templates
+        directories['templates_compiled'] = os.path.join(self.tmp.name, 'compiled')
+        self.reset()
+        self.addCleanup(self.reset)
+
+    def reset(self):
+        vyos.template._templates_env.clear()
+        for templates in vyos.template._templates_mem.values():
+            templates.clear()
+
+    def render(self, **kwargs):
+        destination = os.path.join(self.tmp.name, 'out')
+        changed = vyos.template.render(destination, 'test/list.tmpl', {'items': [1, 2]}, **kwargs)
+        with open(destination) as f:
+            return (changed, f.read())
+
+    def test_render_reports_changes(self):
+        self.assertEqual(self.render(), (True, '\n1\n\n2\n'))
+        self.assertEqual(self.render(), (False, '\n1\n\n2\n'))
+        self.assertEqual(self.render(trim_blocks=True), (True, '1\n2\n'))
+
+    def test_compiled_templates(self):
+        vyos.template.compile_templates(directories['templates_compiled'])
+        # The bundle is used even when the template folder is gone
+        os.unlink(os.path.join(directories['templates'], 'test', 'list.tmpl'))
+        self.assertEqual(self.render(), (True, '\n1\n\n2\n'))
+        self.assertEqual(self.render(trim_blocks=True, formatter=str.strip), (True, '1\n2'))
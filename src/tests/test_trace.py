@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import os
+import json
+import tempfile
+from unittest import TestCase, mock
+
+from vyos import ConfigError
+from vyos import trace
+from vyos.util import call
+
+
+class TestTrace(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.file = os.path.join(self.tmp.name, 'trace.log')
+        patches = [
+            mock.patch.dict(os.environ, {'VYOS_COMMIT_TRACE': self.file}),
+            mock.patch.object(trace, '_file', None),
+            mock.patch.object(trace, '_script', None),
+            mock.patch('atexit.register'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def spans(self):
+        with open(self.file) as f:
+            return [json.loads(line) for line in f]
+
+    def test_spans(self):
+        # nothing is recorded before the first phase
+        with trace.span('template.j2', kind='render'):
+            pass
+        call('true')
+        self.assertFalse(trace.active())
+
+        with trace.span('apply'):
+            call('true')
+        with self.assertRaises(ConfigError):
+            with trace.span('verify'):
+                raise ConfigError('invalid')
+        trace._end_script()
+
+        spans = [(s['kind'], s['name'], s.get('error')) for s in self.spans()]
+        self.assertEqual(spans, [('command', 'true', None),
+                                 ('phase', 'apply', None),
+                                 ('phase', 'verify', 'ConfigError'),
+                                 ('script', spans[-1][1], 'ConfigError')])
+
+    def test_run_phases(self):
+        calls = []
+        trace.run_phases(lambda: 'config', verify=calls.append, apply=calls.append)
+        self.assertEqual(calls, ['config', 'config'])
+        self.assertEqual([s['name'] for s in self.spans()], ['get_config', 'verify', 'apply'])
+
+    def test_private(self):
+        os.environ.pop('VYOS_COMMAND_DEBUG', None)
+        with trace.span('generate'):
+            call('true s3cret')
+        self.assertNotIn('s3cret', open(self.file).read())
+        self.assertEqual([s['name'] for s in self.spans()], ['true', 'generate'])
+        self.assertEqual(os.stat(self.file).st_mode & 0o777, 0o640)
+
+    def test_disabled(self):
+        with mock.patch.dict(os.environ, {'VYOS_COMMIT_TRACE': 'off'}):
+            with trace.span('apply'):
+                pass
+        self.assertFalse(trace.active())
+        self.assertFalse(os.path.exists(self.file))
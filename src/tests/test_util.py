@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import os
+import json
+import stat
+import tempfile
+from unittest import TestCase
+from unittest import skipUnless
+from unittest import mock
+
+import vyos.util
+from vyos.util import write_file
+from vyos.util import DEVNULL
+from vyos.util import popen
+from vyos.util import _split_command
+from vyos.util import Batch
+
+
+class TestWriteFile(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'test.conf')
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_replace_keeps_mode(self):
+        write_file(self.path, 'old')
+        os.chmod(self.path, 0o640)
+        inode = os.stat(self.path).st_ino
+
+        write_file(self.path, 'new')
+        self.assertEqual(self.read(self.path), 'new')
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o640)
+        # The old file was replaced, not rewritten
+        self.assertNotEqual(os.stat(self.path).st_ino, inode)
+        # No temporary files are left behind
+        self.assertEqual(os.listdir(self.tmp.name), ['test.conf'])
+
+    def test_symlink_is_followed(self):
+        link = os.path.join(self.tmp.name, 'link.conf')
+        write_file(self.path, 'old')
+        os.symlink(self.path, link)
+
+        write_file(link, 'new')
+        self.assertTrue(os.path.islink(link))
+        self.assertEqual(self.read(self.path), 'new')
+
+    def sticky_dir(self):
+        sticky = os.path.join(self.tmp.name, 'tmp')
+        os.mkdir(sticky)
+        os.chmod(sticky, 0o1777)
+        return sticky
+
+    @skipUnless(os.geteuid() == 0, 'needs root to create files of other users')
+    def test_foreign_symlink_in_sticky_dir(self):
+        link = os.path.join(self.sticky_dir(), 'link.conf')
+        write_file(self.path, 'old')
+        os.symlink(self.path, link)
+        os.lchown(link, 65534, 65534)
+
+        with self.assertRaises(PermissionError):
+            write_file(link, 'new')
+        self.assertEqual(self.read(self.path), 'old')
+
+    @skipUnless(os.geteuid() == 0, 'needs root to create files of other users')
+    def test_foreign_file_in_sticky_dir(self):
+        path = os.path.join(self.sticky_dir(), 'test.conf')
+        write_file(path, 'old')
+        os.chown(path, 65534, 65534)
+        os.chmod(path, 0o666)
+
+        write_file(path, 'new', fsync='off')
+        self.assertEqual(self.read(path), 'new')
+        st = os.stat(path)
+        self.assertEqual(st.st_uid, os.geteuid())
+        self.assertEqual(stat.S_IMODE(st.st_mode), 0o666 & ~self.umask())
+
+    def umask(self):
+        umask = os.umask(0)
+        os.umask(umask)
+        return umask
+
+    def test_fsync_batch(self):
+        write_file(self.path, 'data', fsync='batch')
+        self.assertEqual(vyos.util._fsync_pending, [os.path.realpath(self.path)])
+        vyos.util._fsync_all()
+        self.assertEqual(vyos.util._fsync_pending, [])
+
+
+class TestCommandLog(TestCase):
+    def test_commands_are_logged(self):
+        with tempfile.NamedTemporaryFile('r') as log:
+            environ = {'VYOS_COMMAND_DEBUG': '1', 'VYOS_COMMAND_LOG': log.name}
+            with mock.patch.dict(os.environ, environ):
+                popen('echo hello')
+                popen('false')
+            records = [json.loads(line) for line in log]
+
+        self.assertEqual([r['command'] for r in records], ['echo hello', 'false'])
+        self.assertEqual([r['exit'] for r in records], [0, 1])
+        self.assertEqual(records[0]['output'], len('hello\n'))
+        self.assertIn('test_util.py', records[0]['caller'])
+
+    def test_log_is_private(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = os.path.join(tmp, 'commands.log')
+            link = os.path.join(tmp, 'link.log')
+            os.symlink(log, link)
+            environ = {'VYOS_COMMAND_DEBUG': '1', 'VYOS_COMMAND_LOG': link}
+            with mock.patch.dict(os.environ, environ):
+                popen('true')
+            self.assertFalse(os.path.exists(log))
+
+            environ['VYOS_COMMAND_LOG'] = log
+            with mock.patch.dict(os.environ, environ):
+                popen('true')
+            self.assertEqual(os.stat(log).st_mode & 0o777, 0o600)
+
+    def test_nothing_is_logged_by_default(self):
+        with tempfile.NamedTemporaryFile('r') as log:
+            with mock.patch.dict(os.environ, {'VYOS_COMMAND_LOG': log.name}):
+                os.environ.pop('VYOS_COMMAND_DEBUG', None)
+                popen('true')
+            self.assertEqual(log.read(), '')
+
+
+class TestPopen(TestCase):
+    def test_split_command(self):
+        self.assertEqual(_split_command('ip link show dev eth0'),
+                         ['ip', 'link', 'show', 'dev', 'eth0'])
+        self.assertEqual(_split_command('ip link set dev eth0 alias "a b"'),
+                         ['ip', 'link', 'set', 'dev', 'eth0', 'alias', 'a b'])
+        for command in ['ip link | grep eth0', 'echo $HOME', 'ls /tmp/*', 'sh -c true >/dev/null',
+                        'true; false', 'LANG=C ip link', 'echo "unbalanced']:
+            self.assertIsNone(_split_command(command), command)
+
+    def test_commands(self):
+        self.assertEqual(popen('echo "a  b"'), ('a  b', 0))
+        # arguments of a list are not interpreted
+        self.assertEqual(popen(['echo', '$HOME;', '*']), ('$HOME; *', 0))
+        self.assertEqual(popen('echo a b | tr a-z A-Z'), ('A B', 0))
+        # a missing program fails like it does with a shell
+        self.assertEqual(popen('/nonexistent/program -x', stderr=DEVNULL)[1], 127)
+
+
+class TestBatch(TestCase):
+    def test_parse(self):
+        self.assertEqual(Batch._parse(['ip', '-6', 'rule', 'del', 'pref', '0']),
+                         (('ip', ('-6', )), ['rule', 'del', 'pref', '0']))
+        self.assertEqual(Batch._parse(['ip6tables', '--table', 'mangle', '-N', 'X']),
+                         (('ip6tables', ), ('mangle', ['-N', 'X'])))
+        self.assertEqual(Batch._parse(['sysctl', '-wq', 'a.b=1', 'c.d=0']),
+                         (('sysctl', ), ['a.b=1', 'c.d=0']))
+        self.assertEqual(Batch._parse(['sysctl', 'a.b']), (None, None))
+        self.assertEqual(Batch._parse(['ip', '-n', 'ns', 'link']), (None, None))
+
+    def test_failing_command_is_reported(self):
+        with self.assertRaises(OSError) as e:
+            with Batch() as batch:
+                batch.add('ip link show dev lo')
+                batch.add(['ip', 'link', 'show', 'dev', 'nosuch0'])
+                batch.add('ip link show dev lo')
+
+        message = str(e.exception)
+        self.assertIn('failed to run command: ip link show dev nosuch0', message)
+        self.assertIn('test_util.py', message)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+from vyos import validate
+from vyos.validate import AddressSnapshot
+
+
+class TestAddressSnapshot(TestCase):
+    def setUp(self):
+        self.snapshot = AddressSnapshot([
+            ('lo', '127.0.0.1/8'),
+            ('eth0', '192.0.2.1/24'),
+            ('eth0', '198.51.100.1/24'),
+            ('eth1', '203.0.113.1/25'),
+            ('eth2', '203.0.113.1/25'),
+            ('lo', '::1/128'),
+            ('eth0', '2001:db8::1/64'),
+            ('eth0', 'fe80::1/64'),
+        ])
+
+    def test_address_lookup(self):
+        self.assertEqual(self.snapshot.get_interfaces('192.0.2.1'), ['eth0'])
+        self.assertEqual(self.snapshot.get_interfaces('203.0.113.1/25'), ['eth1', 'eth2'])
+        self.assertEqual(self.snapshot.get_interfaces('203.0.113.1/24'), [])
+        self.assertEqual(self.snapshot.get_interfaces('2001:db8:0::0001/64'), ['eth0'])
+        self.assertEqual(self.snapshot.get_interfaces('fe80::1%eth0'), ['eth0'])
+        self.assertEqual(self.snapshot.get_interfaces('dhcp'), [])
+
+        self.assertTrue(self.snapshot.is_intf_addr_assigned('eth0', '198.51.100.1/24'))
+        self.assertFalse(self.snapshot.is_intf_addr_assigned('eth1', '198.51.100.1/24'))
+        self.assertTrue(self.snapshot.is_addr_assigned('::1'))
+        self.assertFalse(self.snapshot.is_addr_assigned('192.0.2.2'))
+
+    def test_subnet_connected(self):
+        self.assertTrue(self.snapshot.is_subnet_connected('192.0.2.0/24'))
+        self.assertTrue(self.snapshot.is_subnet_connected('198.51.100.0/30'))
+        self.assertFalse(self.snapshot.is_subnet_connected('192.0.3.0/24'))
+        self.assertTrue(self.snapshot.is_subnet_connected('2001:db8::/32'))
+        self.assertFalse(self.snapshot.is_subnet_connected('2001:db9::/32'))
+
+        # only the first address of the family on eth0 is primary
+        self.assertTrue(self.snapshot.is_subnet_connected('192.0.2.0/24', primary=True))
+        self.assertFalse(self.snapshot.is_subnet_connected('198.51.100.0/24', primary=True))
+
+    def test_updates(self):
+        self.snapshot.add('eth3', '10.0.0.1/8')
+        self.assertTrue(self.snapshot.is_subnet_connected('10.0.0.0/16'))
+
+        # the secondary address becomes primary
+        self.snapshot.remove('eth0', '192.0.2.1/24')
+        self.assertFalse(self.snapshot.is_addr_assigned('192.0.2.1'))
+        self.assertFalse(self.snapshot.is_subnet_connected('192.0.2.0/24'))
+        self.assertTrue(self.snapshot.is_subnet_connected('198.51.100.0/24', primary=True))
+
+        self.snapshot.remove_interface('eth0')
+        self.assertFalse(self.snapshot.is_addr_assigned('2001:db8::1'))
+        self.assertFalse(self.snapshot.is_subnet_connected('198.51.100.0/24'))
+        self.assertEqual(self.snapshot.get_interfaces('203.0.113.1'), ['eth1', 'eth2'])
+
+    def test_refresh_interface(self):
+        self.snapshot.refresh_interface('eth0', ['198.51.100.1/24'])
+        self.assertFalse(self.snapshot.is_addr_assigned('192.0.2.1'))
+        self.assertFalse(self.snapshot.is_addr_assigned('2001:db8::1'))
+        self.assertTrue(self.snapshot.is_subnet_connected('198.51.100.0/24', primary=True))
+        self.assertTrue(self.snapshot.is_addr_assigned('203.0.113.1'))
+
+    def test_shared_between_threads(self):
+        def slow_snapshot():
+            time.sleep(0.05)
+            return AddressSnapshot([])
+
+        with mock.patch.object(validate, '_address_snapshot', None), \
+             mock.patch.object(validate, 'AddressSnapshot', slow_snapshot):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                snapshots = list(pool.map(lambda _: validate.get_address_snapshot(), range(4)))
+        self.assertEqual(len(set(map(id, snapshots))), 1)
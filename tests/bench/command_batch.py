@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+# Measures adding N addresses and N sysctl settings to an interface one
+# command at a time with vyos.util.cmd() and through a vyos.util.Batch,
+# in a scratch network namespace. Must be run as root from a source tree:
+#   sudo PYTHONPATH=python python3 tests/bench/command_batch.py 1000
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+NETNS = 'vyos-batch-bench'
+
+
+def commands(count):
+    for i in range(count):
+        yield f'ip addr add 10.{i // 250}.{i % 250}.1/32 dev bench0'
+        yield f'sysctl -wq net.ipv4.conf.bench0.arp_ignore={i % 2}'
+
+
+def bench(count, batched):
+    from vyos.util import cmd
+    from vyos.util import Batch
+
+    cmd('ip link add bench0 type bridge')
+    start = time.perf_counter()
+    if batched:
+        with Batch() as batch:
+            # addresses first, the sysctl settings as one sysctl call
+            for command in sorted(commands(count)):
+                batch.add(command)
+    else:
+        for command in commands(count):
+            cmd(command)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('count', type=int, nargs='?', default=1000)
+    parser.add_argument('--batched', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(bench(args.count, args.batched))
+        sys.exit(0)
+
+    if os.geteuid() != 0:
+        sys.exit('This benchmark must be run as root')
+
+    print(f'{args.count} addresses and {args.count} sysctl settings')
+    for batched in [False, True]:
+        subprocess.check_call(['ip', 'netns', 'add', NETNS])
+        try:
+            out = subprocess.check_output(['ip', 'netns', 'exec', NETNS, sys.executable, __file__,
+                                           str(args.count), '--child']
+                                          + (['--batched'] if batched else []))
+        finally:
+            subprocess.call(['ip', 'netns', 'del', NETNS])
+        elapsed = float(out.decode().strip().splitlines()[-1])
+        print(f'{"batch" if batched else "one by one":>10} {elapsed:>8.2f}s')
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+# Measures the startup cost of a conf_mode script, that is, the time
+# it takes to spawn an interpreter and construct vyos.config.Config,
+# with and without the shared config snapshot.
+#
+# Must be run on a VyOS system from within a config session, e.g.:
+#   vyos@vyos# sudo python3 /path/to/config_startup.py 50
+
+import os
+import sys
+import time
+import subprocess
+
+SCRIPT = 'from vyos.config import Config; Config()'
+
+
+def run(count, snapshot):
+    env = dict(os.environ)
+    env['VYOS_CONFIG_SNAPSHOT'] = 'on' if snapshot else 'off'
+    # Warm up: the first run with snapshots enabled creates the snapshot
+    subprocess.check_call([sys.executable, '-c', SCRIPT], env=env)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        subprocess.check_call([sys.executable, '-c', SCRIPT], env=env)
+    return (time.perf_counter() - start) / count
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    if not os.environ.get('VYATTA_CHANGES_ONLY_DIR'):
+        sys.exit('This benchmark must be run from within a config session')
+
+    before = run(count, snapshot=False)
+    after = run(count, snapshot=True)
+    print(f'runs per mode:      {count}')
+    print(f'without snapshot:   {before * 1000:.1f} ms/script')
+    print(f'with snapshot:      {after * 1000:.1f} ms/script')
+    print(f'speedup:            {before / after:.2f}x')
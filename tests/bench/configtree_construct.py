@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+# Measures the construction cost of small config trees, as built e.g.
+# for every showConfig request of the HTTP API. With libvyosconfig installed,
+# it compares the shared library binding against loading the library and
+# setting up its prototypes for every tree, like ConfigTree used to do.
+#
+#   PYTHONPATH=python python3 tests/bench/configtree_construct.py 1000
+
+import os
+import sys
+import time
+
+import vyos.configtree
+import vyos.pyconfigtree
+from vyos.configtree import ConfigTree
+
+CONFIG = """
+system {
+    host-name vyos
+    name-server 192.0.2.1
+}
+"""
+
+
+def measure(count, function):
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    return (time.perf_counter() - start) / count
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    print(f'trees: {count}')
+    if os.path.exists(vyos.configtree.LIBPATH):
+        def unshared():
+            vyos.configtree._libraries.clear()
+            ConfigTree(CONFIG)
+        before = measure(count, unshared)
+        after = measure(count, lambda: ConfigTree(CONFIG))
+        print(f'per-tree binding:  {before * 1e6:.1f} us/tree')
+        print(f'shared binding:    {after * 1e6:.1f} us/tree')
+
+    native = measure(count, lambda: vyos.pyconfigtree.PyConfigTree(CONFIG))
+    print(f'pure Python tree:  {native * 1e6:.1f} us/tree')
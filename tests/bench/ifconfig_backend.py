@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+# Compares the iproute2 and netlink backends of vyos.ifconfig by creating
+# N interfaces, bringing them up, assigning an address to each, and removing
+# them again, in a scratch network namespace.
+#
+# Interfaces are dummy interfaces, or VLANs on a dummy parent with --vlan.
+# On kernels without the dummy or 8021q modules, --type bridge can be used.
+#
+# Must be run as root from a source tree, e.g.:
+#   sudo PYTHONPATH=python python3 tests/bench/ifconfig_backend.py 500 --vlan
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+NETNS = 'vyos-ifconfig-bench'
+
+
+def bench(count, kind, vlan):
+    # Imported in the namespace, after the backend has been selected
+    from vyos.ifconfig import Interface
+    from vyos.ifconfig import BridgeIf
+    from vyos.ifconfig import DummyIf
+    from vyos.ifconfig.vlan import VLAN
+
+    klass = {'dummy': DummyIf, 'bridge': BridgeIf}[kind]
+    timings = {}
+
+    start = time.perf_counter()
+    if vlan:
+        parent = VLAN.enable(type('BenchIf', (klass,), {}))('bench0', debug=False)
+        parent.set_admin_state('up')
+        interfaces = [parent.add_vlan(i) for i in range(1, count + 1)]
+    else:
+        interfaces = [klass(f'bench{i}', debug=False) for i in range(1, count + 1)]
+    timings['create'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i, interface in enumerate(interfaces):
+        interface.set_admin_state('up')
+        interface.add_addr(f'10.{i // 250}.{i % 250}.1/24')
+    timings['configure'] = time.perf_counter() - start
+
+    # The kernel removes the addresses with the interfaces, skip the
+    # DHCP client and address cleanup of remove() that doesn't depend
+    # on the backend
+    start = time.perf_counter()
+    for interface in interfaces:
+        interface._delete()
+    if vlan:
+        Interface('bench0', debug=False)._delete()
+    timings['remove'] = time.perf_counter() - start
+
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('count', type=int, nargs='?', default=100)
+    parser.add_argument('--type', choices=['dummy', 'bridge'], default='dummy')
+    parser.add_argument('--vlan', action='store_true', help='create VLANs on a single parent')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(repr(bench(args.count, args.type, args.vlan)))
+        sys.exit(0)
+
+    if os.geteuid() != 0:
+        sys.exit('This benchmark must be run as root')
+
+    results = {}
+    for backend in ['iproute2', 'netlink']:
+        subprocess.check_call(['ip', 'netns', 'add', NETNS])
+        try:
+            env = dict(os.environ, VYOS_IFCONFIG_BACKEND=backend)
+            out = subprocess.check_output(['ip', 'netns', 'exec', NETNS, sys.executable, __file__,
+                                           '--child', '--type', args.type, str(args.count)]
+                                          + (['--vlan'] if args.vlan else []), env=env)
+            results[backend] = eval(out.decode().strip().splitlines()[-1])
+        finally:
+            subprocess.call(['ip', 'netns', 'del', NETNS])
+
+    kind = f'{args.type} VLANs' if args.vlan else f'{args.type} interfaces'
+    print(f'{args.count} {kind}')
+    print(f'{"":12} {"iproute2":>10} {"netlink":>10}')
+    for phase in ['create', 'configure', 'remove']:
+        print(f'{phase:12} {results["iproute2"][phase]:>9.2f}s {results["netlink"][phase]:>9.2f}s')
+    total = {b: sum(r.values()) for b, r in results.items()}
+    print(f'{"total":12} {total["iproute2"]:>9.2f}s {total["netlink"]:>9.2f}s  ({total["iproute2"] / total["netlink"]:.1f}x)')
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+# Measures config migration with the scripts in src/migration-scripts on
+# synthetic configs of growing size. Each config has COUNT interfaces with
+# VLANs, DHCP pools and firewall rule sets in old syntax and a vyatta
+# version footer, so the VirtualMigrator converts the footer and the
+# Migrator runs every migration script.
+#
+# For each size the wall time of the whole migration, the slowest scripts
+# and the peak memory of the migrating process and of the largest script
+# run as a separate program are reported. Every size is migrated in a
+# process of its own so peak memory is not carried over.
+#
+# Run from a source tree, e.g.:
+#   PYTHONPATH=python python3 tests/bench/migration.py 100 500 2500
+#
+# --subprocess runs every script as a program, as before scripts could
+# be run in process, --keep leaves the migrated configs and logs behind.
+
+import os
+import re
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       '..', '..', 'src', 'migration-scripts')
+
+
+def script_versions():
+    # first and last version of each component covered by the scripts
+    versions = {}
+    for component in os.listdir(SCRIPTS):
+        steps = [tuple(map(int, name.split('-to-')))
+                 for name in os.listdir(os.path.join(SCRIPTS, component))
+                 if re.match(r'\d+-to-\d+$', name)]
+        if steps:
+            versions[component] = (min(s[0] for s in steps), max(s[1] for s in steps))
+    return versions
+
+
+def generate(count, versions):
+    interfaces = []
+    pools = []
+    rulesets = []
+    for i in range(count):
+        vifs = ''.join(f'        vif {v} {{\n'
+                       f'            address 10.{i % 250}.{v}.1/24\n'
+                       f'            description "vlan {v}"\n'
+                       f'        }}\n' for v in range(1, 5))
+        interfaces.append(f'    ethernet eth{i} {{\n'
+                          f'        address 172.{16 + i // 65536 % 16}.{i // 256 % 256}.{i % 256}/32\n'
+                          f'        description "port {i}"\n'
+                          f'        duplex auto\n'
+                          f'        ipv6 {{\n'
+                          f'            router-advert {{\n'
+                          f'                send-advert true\n'
+                          f'                max-interval 600\n'
+                          f'            }}\n'
+                          f'        }}\n'
+                          f'        speed auto\n'
+                          f'{vifs}'
+                          f'    }}\n')
+        pools.append(f'        shared-network-name POOL{i} {{\n'
+                     f'            subnet 10.{i % 250}.{i // 250 % 250}.0/24 {{\n'
+                     f'                default-router 10.{i % 250}.{i // 250 % 250}.1\n'
+                     f'                dns-server 10.{i % 250}.{i // 250 % 250}.1\n'
+                     f'                lease 86400\n'
+                     f'                start 10.{i % 250}.{i // 250 % 250}.100 {{\n'
+                     f'                    stop 10.{i % 250}.{i // 250 % 250}.200\n'
+                     f'                }}\n'
+                     f'            }}\n'
+                     f'        }}\n')
+        rules = ''.join(f'        rule {r} {{\n'
+                        f'            action accept\n'
+                        f'            destination {{\n'
+                        f'                port {1000 + r}\n'
+                        f'            }}\n'
+                        f'            protocol tcp\n'
+                        f'            source {{\n'
+                        f'                address 192.0.2.{r}\n'
+                        f'            }}\n'
+                        f'        }}\n' for r in range(1, 6))
+        rulesets.append(f'    name FW{i} {{\n'
+                        f'        default-action drop\n'
+                        f'{rules}'
+                        f'    }}\n')
+
+    footer = ':'.join(f'{c}@{v[0]}' for c, v in sorted(versions.items()))
+    return ('firewall {\n' + ''.join(rulesets) + '}\n'
+            'interfaces {\n' + ''.join(interfaces) +
+            '    loopback lo {\n    }\n'
+            '}\n'
+            'service {\n'
+            '    dhcp-server {\n' + ''.join(pools) + '    }\n'
+            '    ssh {\n'
+            '        allow-root\n'
+            '        port 22\n'
+            '    }\n'
+            '}\n'
+            'system {\n'
+            '    host-name vyos\n'
+            '    login {\n'
+            '        user vyos {\n'
+            '            authentication {\n'
+            '                encrypted-password "*"\n'
+            '            }\n'
+            '            level admin\n'
+            '        }\n'
+            '    }\n'
+            '    ntp {\n'
+            '        server 0.pool.ntp.org {\n'
+            '        }\n'
+            '    }\n'
+            '    options {\n'
+            '        reboot-on-panic true\n'
+            '    }\n'
+            '}\n'
+            '\n'
+            '/* Warning: Do not remove the following line. */\n'
+            f'/* === vyatta-config-version: "{footer}" === */\n'
+            '/* Release version: 1.1.8 */\n')
+
+
+def bench(count, workdir, run_subprocess):
+    import vyos.defaults
+    import vyos.migrator
+
+    versions = script_versions()
+    current = os.path.join(workdir, 'current')
+    os.makedirs(current)
+    for component, (first, last) in versions.items():
+        open(os.path.join(current, f'{component}@{last}'), 'w').close()
+    vyos.defaults.directories.update({'migrate': os.path.abspath(SCRIPTS),
+                                      'current': current,
+                                      'config': workdir})
+    vyos.defaults.version_file = os.path.join(workdir, 'component-versions.json')
+
+    if run_subprocess:
+        vyos.migrator.load_migrate_function = lambda script: None
+
+    config_file = os.path.join(workdir, 'config.boot')
+    with open(config_file, 'w') as f:
+        f.write(generate(count, versions))
+
+    result = {'size': os.path.getsize(config_file)}
+    start = time.perf_counter()
+    virtual = vyos.migrator.VirtualMigrator(config_file)
+    virtual.run()
+    result['virtual'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    migration = vyos.migrator.Migrator(config_file)
+    migration.run()
+    result['migrate'] = time.perf_counter() - start
+    result['scripts'] = migration.script_times()
+
+    # kilobytes on Linux
+    result['maxrss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result['maxrss_scripts'] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return result
+
+
+def report(count, result, top):
+    in_process = sum(1 for s in result['scripts'] if s[2])
+    print(f'{count} interfaces, {result["size"] / 1024:.0f} KiB config')
+    print(f'  virtual migration  {result["virtual"]:8.3f}s')
+    print(f'  migration          {result["migrate"]:8.3f}s  '
+          f'({len(result["scripts"])} scripts, {in_process} in process)')
+    print(f'  peak memory        {result["maxrss"] / 1024:8.1f} MiB migrator, '
+          f'{result["maxrss_scripts"] / 1024:.1f} MiB largest script')
+    print('  slowest scripts:')
+    for script, seconds, in_process in sorted(result['scripts'],
+                                              key=lambda s: s[1], reverse=True)[:top]:
+        mode = 'in-process' if in_process else 'subprocess'
+        print(f'  {seconds:17.3f}s  {mode:10}  {os.path.relpath(script, SCRIPTS)}')
+    print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('count', type=int, nargs='*', default=[100, 500, 2500],
+                        help='number of interfaces in the generated configs')
+    parser.add_argument('--subprocess', action='store_true',
+                        help='run every script as a separate program')
+    parser.add_argument('--top', type=int, default=10, help='slowest scripts to list')
+    parser.add_argument('--keep', action='store_true',
+                        help='keep the migrated configs and migration logs')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(repr(bench(args.count[0], args.child, args.subprocess)))
+        sys.exit(0)
+
+    # scripts run as programs need to find the vyos package as well
+    os.environ['PYTHONPATH'] = os.pathsep.join(
+        os.path.abspath(p) for p in os.environ.get('PYTHONPATH', '').split(os.pathsep) if p)
+
+    for count in args.count:
+        workdir = tempfile.mkdtemp(prefix=f'vyos-migration-{count}-')
+        out = subprocess.check_output([sys.executable, __file__, str(count), '--child', workdir]
+                                      + (['--subprocess'] if args.subprocess else []))
+        report(count, eval(out.decode().strip().splitlines()[-1]), args.top)
+        if args.keep:
+            print(f'  config and log kept in {workdir}\n')
+        else:
+            subprocess.call(['rm', '-rf', workdir])
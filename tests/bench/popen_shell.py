@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+# Measures N runs of the same command with vyos.util.cmd() through /bin/sh
+# (shell=True, what every command with a space used to do) and run directly,
+# given as a string and as a list of arguments, e.g.:
+#   PYTHONPATH=python python3 tests/bench/popen_shell.py 1000
+
+import time
+import argparse
+
+from vyos.util import cmd
+
+
+def bench(count, command, shell):
+    start = time.perf_counter()
+    for _ in range(count):
+        cmd(command, shell=shell)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('count', type=int, nargs='?', default=1000)
+    parser.add_argument('--command', default='ip link show')
+    args = parser.parse_args()
+
+    results = [
+        ('shell', bench(args.count, args.command, True)),
+        ('string', bench(args.count, args.command, None)),
+        ('list', bench(args.count, args.command.split(), None)),
+    ]
+
+    print(f'{args.count} x {args.command}')
+    for name, elapsed in results:
+        print(f'{name:>8} {elapsed:>8.2f}s {elapsed / args.count * 1000:>8.2f}ms/call')
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+# Measures the template part of the startup cost of dhcp_server.py, that is,
+# the time it takes a fresh interpreter to import vyos.template and render
+# the DHCP server config files, with templates loaded from data/templates
+# and from the precompiled bundle.
+#
+# Runs from a source tree, e.g.:
+#   PYTHONPATH=python python3 tests/bench/template_startup.py 50
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+SOURCE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+TEMPLATE_DIR = os.path.join(SOURCE_DIR, 'data', 'templates')
+
+SCRIPT = '''
+import sys
+import vyos.defaults
+vyos.defaults.directories['templates'] = sys.argv[1]
+vyos.defaults.directories['templates_compiled'] = sys.argv[2]
+
+from vyos.template import render
+
+subnet = {{
+    'address': '192.0.2.0', 'netmask': '255.255.255.0', 'lease': '86400',
+    'default_router': '192.0.2.1', 'dns_server': ['192.0.2.1'], 'domain_name': 'vyos.net',
+    'range': [{{'start': '192.0.2.100', 'stop': '192.0.2.199'}}],
+    'static_mapping': [{{'name': 'host{{0}}'.format(i), 'ip_address': '192.0.2.{{0}}'.format(i),
+                        'mac_address': '00:53:00:00:00:{{0:02x}}'.format(i), 'disabled': False}}
+                       for i in range(10, 60)],
+}}
+dhcp = {{
+    'lease_file': '/config/dhcpd.leases', 'disabled': False, 'ddns_enable': False,
+    'global_parameters': [], 'hostfile_update': False, 'host_decl_name': False,
+    'static_route': False, 'wpad': False,
+    'shared_network': [{{'name': 'LAN', 'authoritative': True, 'disabled': False,
+                        'network_parameters': [], 'subnet': [subnet]}}],
+}}
+render('{out}/dhcpd.conf', 'dhcp-server/dhcpd.conf.tmpl', dhcp,
+       formatter=lambda config_text: config_text.replace("&quot;",'"'))
+render('{out}/isc-dhcpv4-server', 'dhcp-server/daemon.tmpl', dhcp)
+'''
+
+
+def timed(args):
+    start = time.perf_counter()
+    subprocess.check_call(args)
+    return time.perf_counter() - start
+
+
+def run(count, script, modes):
+    results = {name: 0.0 for name in modes}
+    for bundle_dir in modes.values():
+        # Warm up the page cache and byte-compile caches
+        subprocess.check_call([sys.executable, '-c', script, TEMPLATE_DIR, bundle_dir])
+
+    # Interleave the modes so that they see the same system noise
+    for _ in range(count):
+        for name, bundle_dir in modes.items():
+            results[name] += timed([sys.executable, '-c', script, TEMPLATE_DIR, bundle_dir])
+    return {name: total / count for name, total in results.items()}
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bundle_dir = os.path.join(tmp_dir, 'templates-compiled')
+        subprocess.check_call([os.path.join(SOURCE_DIR, 'scripts', 'build-compiled-templates'),
+                               TEMPLATE_DIR, bundle_dir], stdout=subprocess.DEVNULL)
+        modes = {'templates': os.path.join(tmp_dir, 'none'), 'bundle': bundle_dir}
+        results = run(count, SCRIPT.format(out=tmp_dir), modes)
+
+    before = results['templates']
+    after = results['bundle']
+    print(f'runs per mode:      {count}')
+    print(f'from templates:     {before * 1000:.1f} ms/script')
+    print(f'from bundle:        {after * 1000:.1f} ms/script')
+    print(f'saved:              {(before - after) * 1000:.1f} ms/script')
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+# Measures vyos.ifconfig_vlan.apply_vlans() with N VLAN interfaces on one
+# parent, serially and with worker pools of different sizes, each in a
+# scratch network namespace. Every VLAN gets the default VLAN config and
+# an address (unless --no-address), then the same config is applied
+# a second time.
+#
+# On kernels without the 8021q module, --macvlan creates macvlan interfaces
+# named like VLANs instead, the configuration work done is the same.
+#
+# Must be run as root from a source tree, e.g.:
+#   sudo PYTHONPATH=python python3 tests/bench/vlan_apply.py 2000
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+NETNS = 'vyos-vlan-bench'
+
+
+def vif_config(vlan_id, addresses):
+    # what vyos.configdict.vlan_to_dict() returns for a VLAN with an address
+    return {
+        'id': str(vlan_id),
+        'address': addresses,
+        'address_remove': [],
+        'description': '',
+        'dhcp_client_id': '',
+        'dhcp_hostname': '',
+        'dhcp_vendor_class_id': '',
+        'dhcpv6_prm_only': False,
+        'dhcpv6_temporary': False,
+        'disable': False,
+        'disable_link_detect': 1,
+        'egress_qos': '',
+        'egress_qos_changed': False,
+        'ip_disable_arp_filter': 1,
+        'ip_enable_arp_accept': 0,
+        'ip_enable_arp_announce': 0,
+        'ip_enable_arp_ignore': 0,
+        'ip_proxy_arp': 0,
+        'ipv6_autoconf': 0,
+        'ipv6_forwarding': 1,
+        'ipv6_dup_addr_detect': 1,
+        'ingress_qos': '',
+        'ingress_qos_changed': False,
+        'mac': '',
+        'mtu': 1500,
+        'vrf': ''
+    }
+
+
+def bench(count, workers, macvlan, address):
+    from vyos.ifconfig import BridgeIf
+    from vyos.ifconfig.vlan import VLAN
+    from vyos.ifconfig_vlan import apply_vlans
+
+    ParentIf = VLAN.enable(type('BenchIf', (BridgeIf,), {}))
+    if macvlan:
+        def add_vlan(self, vlan_id, ethertype='', ingress_qos='', egress_qos=''):
+            ifname = f'{self.config["ifname"]}.{vlan_id}'
+            if not os.path.exists(f'/sys/class/net/{ifname}'):
+                self._cmd(f'ip link add link {self.config["ifname"]} name {ifname} type macvlan')
+            return self.__class__(ifname)
+        ParentIf.add_vlan = add_vlan
+
+    parent = ParentIf('bench0', debug=False)
+    parent.set_admin_state('up')
+
+    config = {
+        'vif': [vif_config(i, [f'10.{i // 250}.{i % 250}.1/24'] if address else [])
+                for i in range(1, count + 1)],
+        'vif_remove': [],
+        'vif_s': [],
+        'vif_s_remove': [],
+    }
+
+    timings = {}
+    start = time.perf_counter()
+    apply_vlans(parent, config, workers=workers)
+    timings['create'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    apply_vlans(parent, config, workers=workers)
+    timings['reapply'] = time.perf_counter() - start
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('count', type=int, nargs='?', default=2000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--macvlan', action='store_true',
+                        help='create macvlan interfaces instead of VLANs')
+    parser.add_argument('--no-address', action='store_true',
+                        help='do not assign an address to the VLANs')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(repr(bench(args.count, args.workers[0], args.macvlan, not args.no_address)))
+        sys.exit(0)
+
+    if os.geteuid() != 0:
+        sys.exit('This benchmark must be run as root')
+
+    results = {}
+    for workers in args.workers:
+        subprocess.check_call(['ip', 'netns', 'add', NETNS])
+        try:
+            out = subprocess.check_output(['ip', 'netns', 'exec', NETNS, sys.executable, __file__,
+                                           str(args.count), '--child', '--workers', str(workers)]
+                                          + (['--macvlan'] if args.macvlan else [])
+                                          + (['--no-address'] if args.no_address else []))
+            results[workers] = eval(out.decode().strip().splitlines()[-1])
+        finally:
+            subprocess.call(['ip', 'netns', 'del', NETNS])
+
+    kind = 'macvlan interfaces' if args.macvlan else 'VLANs'
+    print(f'{args.count} {kind}')
+    print(f'{"workers":>8} {"create":>10} {"reapply":>10}')
+    for workers, timings in results.items():
+        print(f'{workers:>8} {timings["create"]:>9.2f}s {timings["reapply"]:>9.2f}s')
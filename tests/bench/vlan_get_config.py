@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2020 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+
+# Compares the VLAN part of interfaces-ethernet.py get_config() done with
+# per-node Config lookups against the same code run on a bulk ConfigView.
+#
+#   PYTHONPATH=python python3 tests/bench/vlan_get_config.py 1000
+
+import sys
+import time
+
+from vyos.config import Config
+from vyos.configdict import vlan_to_dict
+
+BASE = ['interfaces', 'ethernet', 'eth0']
+
+
+class BenchConfig(Config):
+    """ Config built from a string instead of the running system """
+    def __init__(self, config_text):
+        self.__text = config_text
+        super().__init__()
+
+    def _read_configs(self):
+        return (self.__text, self.__text)
+
+
+def make_config(count):
+    vifs = []
+    for vlan in range(1, count + 1):
+        vifs.append(f"""
+            vif {vlan} {{
+                address 10.{vlan // 256}.{vlan % 256}.1/24
+                description "customer {vlan}"
+                ip {{
+                    enable-proxy-arp
+                }}
+                mtu 1500
+            }}""")
+    return 'interfaces {\n    ethernet eth0 {\n' + ''.join(vifs) + '\n    }\n}\n'
+
+
+def get_vifs(conf):
+    vifs = []
+    for vif in conf.list_nodes(BASE + ['vif']):
+        conf.set_level(BASE + ['vif', vif])
+        vifs.append(vlan_to_dict(conf))
+        conf.set_level([])
+    return vifs
+
+
+def measure(function):
+    start = time.perf_counter()
+    result = function()
+    return (time.perf_counter() - start, result)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    conf = BenchConfig(make_config(count))
+
+    per_node, old = measure(lambda: get_vifs(conf))
+    bulk, new = measure(lambda: get_vifs(conf.get_config_view([])))
+    assert old == new
+
+    print(f'VLAN sub-interfaces: {count}')
+    print(f'per-node lookups:    {per_node * 1000:.1f} ms')
+    print(f'bulk config view:    {bulk * 1000:.1f} ms')
+    print(f'speedup:             {per_node / bulk:.2f}x')